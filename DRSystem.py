@@ -4,22 +4,57 @@
     ACTION: Performs as a Document Retrieval System.
     OPTIONS:
         -h : print this help message
-        -d <filename> : name of the source document collection file.(default value is documents.txt)
-        -q <filename> : name of the source query file.(default value is queries.txt)
+        -d <filename> : name of the source document collection file, or of a directory of collection files. Files ending in .gz, .bz2 or .xz are decompressed while they are read.(default value is documents.txt)
+        -q <filename> : name of the source query file, which can be compressed as the collection.(default value is queries.txt)
         -s <filename> : name of the stopwords list file.(default value is stop_list.txt)
         -t : flag option to determine whether stemming is applied or not.
         -w <weight_type> : specify the weight_type - binary, frequency, tf.idf. (default value is td.idf)
-        -i <filename> : name of the index file.
+        -i <filename> : name of the index file.(the index is written in binary format)
+        -x <filename> : name of the file to which the index is also exported in text format.
+        -z <codec> : specify the codec of the postings lists in the index - raw, vbyte, gamma.(default value is vbyte)
+        -p : flag option to determine whether the final weight of each posting is also stored in the index.
+        -I : flag option to determine whether an impact-ordered index is built for the weighting type and the queries are ranked score-at-a-time from it.
+        -b <count> : count of postings scored per query in score-at-a-time ranking.(default value is 0, no limit)
+        -T <milliseconds> : time after which score-at-a-time ranking of a query stops.(default value is 0, no limit)
+        -l : flag option to determine whether token positions are recorded when the index is built and the phrase ("w1 w2") and proximity ("w1 w2"~N) clauses of the queries are matched against them. Documents that match the clauses are ranked first, and the rest of the ranking is filled without the clauses.
         -r <filename> : name of the result output file.
+        -n <count> : count of documents written per query in the result file.(default value is 10)
+        -o : flag option to determine whether the match score of each document is also written in the result file.
         -S <query_id> : indicates single query.
         -C <query_string>  : indicates custom query.
+        -N <count> : count of results shown in console for single and custom query, with their titles and snippets.(default value is 10)
+        -k <count> : retrieve only the top <count> documents of each query using MaxScore pruning.(default is exhaustive ranking)
+        -j <count> : count of worker processes that tokenize the document collection, rank the queries of the query file or rank the shards in parallel.(default value is 1)
+        -P <count> : partition the documents into <count> shard files when the index is built, and rank the queries on the shards in worker processes.(-i option is needed the first time)
+        -a <filename> : name of a document collection file or directory whose documents are added to the index as a new segment.(-i option then only names the index to update)
+        -R <doc_ids> : comma separated document ids that are deleted from the index.
+        -m : flag option to determine whether all segments of the index are merged into one.
+        -c <count> : keep the rankings of up to <count> queries in a result cache that is saved next to the index.(default value is 0, no cache)
+        -D <port> : serve queries on a local TCP port (or on stdin/stdout if <port> is -) after loading the index once.
+        --profile : print the wall time and peak memory of each phase and the counters of the work done on stderr.
+        --profile-file <filename> : write the profile report in a JSON file instead.
+        --profile-ranking <filename> : capture a cProfile profile of the ranking phase in <filename>.(it is also summarized on stderr with --profile)
+        -e <engine> : specify the ranking engine - python, sparse. sparse scores the whole query batch with numpy/scipy.(default value is python)
 --------------------------------------------------------------------------------
 """
 
-import getopt, sys, re, math, string
+import getopt, sys, os, math, heapq, bisect, itertools, collections, multiprocessing
 from read_documents import ReadDocuments
 from read_documents import ReadIndexFile
-from nltk.stem import PorterStemmer
+from binary_index import IsBinaryIndexFile, ReadBinaryIndexFile, WriteBinaryIndexFile
+from postings_codec import CODECS, DEFAULT_CODEC
+from sparse_ranking import SparseEngineAvailable, SparseDocumentRanking, BuildTermDocumentMatrix
+from document_store import DocumentStorePath, IsDocumentStore, DocumentStoreWriter, ReadDocumentStore, Title, Snippet
+from impact_index import IsImpactIndex, WriteImpactIndex, ReadImpactIndex, ImpactRanking
+from phase_profiler import PhaseProfiler
+from positional_index import IsPositionalIndex, PositionalIndexWriter, ReadPositionalIndex, ParseQuery, MatchClauses
+from query_server import Serve
+from sharded_index import IsShardedIndex, ReadShardManifest, WriteShards, RemoveShards, MergeRankings
+from segments import IsSegmentedIndex, ReadSegmentedIndex, AddSegment, DeleteDocuments, MergeSegments, RemoveSegments
+from result_cache import IndexGeneration, ResultCache
+from stem_cache import StemCache
+from term_dictionary import TermDictionary, CollectionIndex, DocumentVectors
+from tokenizer import Tokenizer
 
 #########################################################################################################################################################################################
 
@@ -28,23 +63,64 @@ from nltk.stem import PorterStemmer
 doc_file_name       =       'documents.txt'         #       Name of document collection file.
 qry_file_name       =       'queries.txt'           #       Name of query file.
 stop_list_name      =       'stop_list.txt'         #       Name of stopword list file.
-index_file_name     =       'index.txt'             #       Name of index file.
+index_file_name     =       'index.bin'             #       Name of index file.
+text_index_name     =       ''                      #       Name of text index file to which the index is exported.     (Empty means that the index is not exported)
 result_file_name    =       'result.txt'            #       Name of result output file.
+add_file_name       =       ''                      #       Name of document collection file whose documents are added to the index.     (Empty means that no document is added)
 
 ##########      Variables that are used to store global, document, query tokens.        ##########
 
 stop_words          =       {}                      #       Dictionary variable to store the stopwords.                                                                                     (Each element of this list is a stop word)
-doc_tkn_idx         =       []                      #       (Abbreviation of document_token_index)Index list to store the number of terms that are contained in the relevant document.      (Each element of this list is a term of documents.)
-qry_tkn_idx         =       []                      #       (Abbreviation of query_token_index)Index list to store the number of terms that are contained in the relevant query.            (Each element of this list is a term of queries.)
-colct_tkn_idx       =       {}                      #       (Abbreviation of collection_token_index)Index dictionary to store the number of documents that contains the relevant term.      (Each element of this dictionary is a term of documents.)
+term_dictionary     =       TermDictionary()        #       Dictionary variable to map each term of documents and queries to an integer id.
+doc_tkn_idx         =       DocumentVectors(term_dictionary)    #       (Abbreviation of document_token_index)Index list to store the number of terms that are contained in the relevant document.      (Each element of this list is a vector of term ids and frequencies.)
+qry_tkn_idx         =       DocumentVectors(term_dictionary)    #       (Abbreviation of query_token_index)Index list to store the number of terms that are contained in the relevant query.            (Each element of this list is a vector of term ids and frequencies.)
+colct_tkn_idx       =       CollectionIndex(term_dictionary)    #       (Abbreviation of collection_token_index)Index dictionary to store the number of documents that contains the relevant term.      (Each element of this array is the document frequency of a term id.)
+inv_tkn_idx         =       {}                      #       (Abbreviation of inverted_token_index)Index dictionary to store the postings list of the relevant term.                           (Each posting is a (document index, term frequency) pair.)
+
+##########      Variables that are used to store the precomputed weights.        ##########
+
+idf_weights         =       {}                      #       Dictionary variable to store the squared idf weight of each term.                                                           (Each element of this dictionary is log(1 + N / df) ^ 2)
+doc_norms           =       {}                      #       Dictionary variable to store the list of document magnitudes of each weighting type.                                      (Each element of this dictionary is a list ordered by document index)
+posting_weights     =       {}                      #       Dictionary variable to store the list of final weights of the postings of each term.                                      (Each element of this list is log(1 + tf) * idf weight)
+deleted_doc_ids     =       set()                   #       Set variable to store the ids of the documents deleted from a segmented index.
+positions_writer    =       None                    #       Variable to collect the token positions of the documents while they are tokenized.     (None means that positions are not recorded)
+store_writer        =       None                    #       Variable to collect where each document is in its collection file while it is tokenized.     (None means that the document store is not written)
+positional_index    =       None                    #       Variable to read the token positions of the index.     (None means that the clauses of the queries are not matched)
+document_store      =       None                    #       Variable to read the text of the documents shown in console.     (None means that only document ids are shown)
+impact_index        =       None                    #       Variable to read the impact-ordered index.     (None means that the queries are not ranked score-at-a-time)
+qry_clauses         =       {}                      #       Dictionary variable to store the phrase and proximity clauses of each query that has any.     (Each element of this dictionary is a list of (window, list of (offset, term)))
+term_upper_bounds   =       {}                      #       Dictionary variable to store the upper bound score of each term for top-k retrieval.                                      (Each element of this dictionary is a dictionary of a weighting type)
 
 
 stemming            =       False                   #       Variable to determine whether stemming is applied or not.
+stem_cache          =       StemCache()             #       Variable to store the stem of each lowercased token. It is saved next to the index file.
+profiler            =       PhaseProfiler()         #       Variable to measure the phases of the run and count the work done. It measures nothing unless --profile option is set.
+result_cache        =       None                    #       Variable to store the rankings of recent queries. It is saved next to the index file.     (None means that the result cache is not used)
 index_reuse         =       True                    #       Variable to determine whether index file is reused or not.
 stop_list_use       =       False                   #       Variable to determine whether the stopword list is reused or not.
-sorted_doc_ids      =       []                      #       Variable to store the ranked document ids.
+weights_store       =       False                   #       Variable to determine whether the posting weights are stored in the index or not.
+positions_use       =       False                   #       Variable to determine whether token positions are recorded and the phrase and proximity clauses are matched or not.
+impact_use          =       False                   #       Variable to determine whether the impact-ordered index is built and used or not.
+impact_budget       =       0                       #       Variable to store the count of postings scored per query in score-at-a-time ranking.     (0 means no limit)
+impact_deadline     =       0                       #       Variable to store the milliseconds after which score-at-a-time ranking of a query stops.     (0 means no limit)
+result_depth        =       10                      #       Variable to store the count of documents written per query in the result file.
+score_output        =       False                   #       Variable to determine whether the match scores are written in the result file or not.
 document_count      =       0                       #       Variable to store the document count contained in the collection.
 weighting_type      =       'tf.idf'                #       Variable to identify the weighting_type     (tf.idf or frequency or binary)
+ranking_engine      =       'python'                #       Variable to identify the ranking engine     (python or sparse)
+postings_codec      =       DEFAULT_CODEC           #       Variable to identify the codec of the postings lists in the index file     (raw or vbyte or gamma)
+worker_count        =       1                       #       Variable to store the count of worker processes that tokenize the document collection or rank the queries.
+shard_count         =       0                       #       Variable to store the count of shards of the index.     (0 means that the index is not partitioned)
+QUERY_BATCH_SIZE    =       16                      #       Count of queries that are ranked at once. A worker process ranks them on a shard.
+rank_depth          =       0                       #       Variable to store the count of documents of each ranking that a worker process returns.     (0 means whole rankings)
+open_shards         =       {}                      #       Dictionary variable to store the index views of each shard opened by a worker process.
+SERIAL_SHARD_SIZE   =       1024                    #       Count of documents tokenized at once when the collection is tokenized serially.
+PARALLEL_SHARD_SIZE =       256                     #       Count of documents tokenized at once by a worker process when the collection is tokenized in parallel.
+delete_doc_ids      =       []                      #       Variable to store the ids of the documents to delete from the index.
+segments_merge      =       False                   #       Variable to determine whether the segments of the index are merged or not.
+profile_name        =       ''                      #       Name of profile report file.     (Empty means that the run is not profiled, - means stderr)
+ranking_profile_name =      ''                      #       Name of cProfile output file of the ranking phase.     (Empty means that the ranking phase is not captured)
+server_address      =       ''                      #       Variable to store the port on which queries are served.     (Empty means that the server mode is not used, - means stdin/stdout)
 
 ##########      Variables that are used to handle single query and custom query        ##########
 
@@ -55,6 +131,8 @@ query_type          =       FILE_QUERY              #       query_type is set to
 query_index         =       0                       #       Variable to store the index of single query.
 query_string        =       ''                      #       Variable to store the user defined custom query.
 show_count          =       10                      #       Variable to store the count of result to be shown in console.
+top_k               =       0                       #       Variable to store the count of documents retrieved per query in top-k mode.   (0 means that all documents are ranked exhaustively)
+cache_capacity      =       0                       #       Variable to store the count of rankings kept in the result cache.   (0 means that the result cache is not used)
 
 
 #########################################################################################################################################################################################
@@ -73,7 +151,7 @@ def ReadStopWords(path):
             word = word.split('\n')[0];
             stop_words[word] = 1
 
-##########      Function that is used to write index file.        ##########
+##########      Function that is used to write index file in text format.        ##########
 
 ### Input   :   path: filename(including or not path) of the index file
 def WriteIndexFile(path):
@@ -105,11 +183,11 @@ def WriteIndexFile(path):
 
         f.write('<document>\n')
 
-        for token in token_list:
+        for token, frequency in token_list.items():
 
             f.write(token)
             f.write(' ')
-            f.write(str(token_list[token]))
+            f.write(str(frequency))
             f.write('\n')
 
         f.write('</document>\n')
@@ -120,39 +198,31 @@ def WriteIndexFile(path):
 
         f.write('<query>\n')
 
-        for token in token_list:
+        for token, frequency in token_list.items():
 
             f.write(token)
             f.write(' ')
-            f.write(str(token_list[token]))
+            f.write(str(frequency))
             f.write('\n')
 
         f.write('</query>\n')
 
     f.close()
 
-##########      Function that is used to write result file.        ##########
+##########      Function that is used to write the ranking of a query in the result file.        ##########
 
-### Input   :   path: filename(including or not path) of the result outputfile list
-def WriteResultFile(path):
+### Input   :   f: result output file
+###             query_index: index of the query
+###             match_scores: list of [match_score, document id] in descending order
+def WriteResult(f, query_index, match_scores):
 
-    f = open(path, 'w')
-
-    query_index = 0
-
-    for query in qry_tkn_idx:
-
-        for ranking in range(0, 10):
-
-            f.write(str(query_index + 1))
-            f.write(' ')
-            f.write(str(sorted_doc_ids[query_index][ranking][1]))
-            f.write('\n')
+    for match_score, doc_id in match_scores[:result_depth]:
 
-        query_index += 1
-
-    f.close()
+        if score_output == True:                            ###     if -o option is set in command line then the match score is the third column.
+            f.write('%d %d %r\n' % (query_index + 1, doc_id, match_score))
 
+        else:
+            f.write('%d %d\n' % (query_index + 1, doc_id))
 
 ##########      Function that is used to analyse command line options.        ##########
 
@@ -160,20 +230,20 @@ def WriteResultFile(path):
 def AnalyseCommandLine():
 
     try:
-        opts, args = getopt.getopt(sys.argv[1:], "d:q:s:tw:i:r:h:S:C:N:")
+        opts, args = getopt.getopt(sys.argv[1:], "d:q:s:tw:i:x:z:plIb:T:r:n:oh:S:C:N:k:e:j:P:a:R:mD:c:", ["profile", "profile-file=", "profile-ranking="])
 
     except getopt.GetoptError as err:
         sys.exit(2)
 
     for opt, arg in opts:
 
-        global doc_file_name, qry_file_name, stop_list_name, stop_list_use, index_reuse, result_file_name, stemming, weighting_type, query_type, query_index, query_string, show_count
+        global doc_file_name, qry_file_name, stop_list_name, stop_list_use, index_reuse, index_file_name, text_index_name, weights_store, positions_use, impact_use, impact_budget, impact_deadline, result_file_name, result_depth, score_output, stemming, weighting_type, query_type, query_index, query_string, show_count, top_k, ranking_engine, worker_count, add_file_name, delete_doc_ids, segments_merge, server_address, cache_capacity, postings_codec, shard_count, profile_name, ranking_profile_name
 
         if opt in ("-d"):               ### Document file option
             doc_file_name = arg
 
-        elif opt in ("-a"):
-            print(arg)
+        elif opt in ("-a"):             ### Document addition option
+            add_file_name = arg
 
         elif opt in ("-q"):             ### Query file option
             qry_file_name = arg
@@ -200,12 +270,63 @@ def AnalyseCommandLine():
             index_reuse = False
             index_file_name = arg
 
+        elif opt in ("-x"):             ### Text index export option
+            text_index_name = arg
+
+        elif opt in ("-z"):             ### Postings codec option
+
+            postings_codec = arg
+
+            if postings_codec not in CODECS:
+
+                print ("\nNo such postings codec : Only \"raw\", \"vbyte\", \"gamma\" are required.")
+                exit(1)
+
+        elif opt in ("-p"):             ### Posting weights storing option
+            weights_store = True
+
+        elif opt in ("-l"):             ### Positions option
+            positions_use = True
+
+        elif opt in ("-I"):             ### Impact-ordered index option
+            impact_use = True
+
+        elif opt in ("-b"):             ### Score-at-a-time budget option
+
+            impact_budget = (int)(arg)
+
+            if impact_budget < 0:
+
+                print ("\nPostings budget must not be negative.")
+                exit(1)
+
+        elif opt in ("-T"):             ### Score-at-a-time deadline option
+
+            impact_deadline = (float)(arg)
+
+            if impact_deadline < 0:
+
+                print ("\nDeadline must not be negative.")
+                exit(1)
+
         elif opt in ("-h"):             ### Showing help option
             printHelp()
 
         elif opt in ("-r"):             ### Result output file option
             result_file_name = arg
 
+        elif opt in ("-n"):             ### Result depth option
+
+            result_depth = (int)(arg)
+
+            if result_depth < 1:
+
+                print ("\nResult depth must be a positive integer.")
+                exit(1)
+
+        elif opt in ("-o"):             ### Score output option
+            score_output = True
+
         elif opt in ("-S"):                     ### Query type setting option (this option indicates both single query and custom query)
 
             query_type = SINGLE_QUERY
@@ -220,6 +341,74 @@ def AnalyseCommandLine():
 
             show_count = (int)(arg)
 
+        elif opt in ("-k"):             ### Top-k retrieval option
+
+            top_k = (int)(arg)
+
+            if top_k < 1:
+
+                print ("\nTop-k count must be a positive integer.")
+                exit(1)
+
+        elif opt in ("-j"):             ### Worker count option
+
+            worker_count = (int)(arg)
+
+            if worker_count < 1:
+
+                print ("\nWorker count must be a positive integer.")
+                exit(1)
+
+        elif opt in ("-P"):             ### Shard count option
+
+            shard_count = (int)(arg)
+
+            if shard_count < 1:
+
+                print ("\nShard count must be a positive integer.")
+                exit(1)
+
+        elif opt in ("-R"):             ### Document deletion option
+            delete_doc_ids = [(int)(doc_id) for doc_id in arg.split(',')]
+
+        elif opt in ("-m"):             ### Segment merge option
+            segments_merge = True
+
+        elif opt in ("-D"):             ### Query server option
+            server_address = arg
+
+        elif opt in ("-c"):             ### Result cache option
+
+            cache_capacity = (int)(arg)
+
+            if cache_capacity < 0:
+
+                print ("\nResult cache size must not be negative.")
+                exit(1)
+
+        elif opt == "--profile":        ### Profiling option
+            profile_name = '-'
+
+        elif opt == "--profile-file":   ### Profile report file option
+            profile_name = arg
+
+        elif opt == "--profile-ranking":    ### Ranking phase cProfile option
+            ranking_profile_name = arg
+
+        elif opt in ("-e"):             ### Ranking engine option
+
+            ranking_engine = arg
+
+            if ranking_engine != 'python' and ranking_engine != 'sparse':
+
+                print ("\nNo such ranking engine : Only \"python\", \"sparse\" are required.")
+                exit(1)
+
+            if ranking_engine == 'sparse' and not SparseEngineAvailable():
+
+                print ("\nThe sparse ranking engine requires numpy and scipy.")
+                exit(1)
+
         else:
             assert False, "unhandled option"
 
@@ -230,221 +419,1165 @@ def printHelp():
         print (help)
         exit()
 
+##########      Function that is used to add the postings of a document to the inverted index.       ##########
+
+### Input   :   doc_index: index of the document in doc_tkn_idx
+###             token_list: dictionary of the terms contained in the document and their frequencies
+def AddPostings(doc_index, token_list):
+
+    global inv_tkn_idx
+
+    for token, frequency in token_list.items():
+
+        if token not in inv_tkn_idx:
+            inv_tkn_idx[token] = []
+
+        inv_tkn_idx[token].append((doc_index, frequency))         ###     Postings are appended in document order, so each postings list is sorted by document index.
+
+##########      Function that is used to build the inverted index from the document index.       ##########
+
+def BuildInvertedIndex():
+
+    global inv_tkn_idx
+
+    inv_tkn_idx = {}
+
+    doc_index = 0
+
+    for token_list in doc_tkn_idx:
+
+        AddPostings(doc_index, token_list)
+        doc_index += 1
+
+##########      Function that is used to precompute the idf weights and the document magnitudes.       ##########
+
+def ComputeWeights():
+
+    global idf_weights, doc_norms
+
+    idf_weights     =       {}
+    doc_norms       =       {'binary': [], 'frequency': [], 'tf.idf': []}
+
+    idf             =       {}                              ###     log(1 + N / df) of each term is calculated once for all documents.
+    posting_count   =       0
+
+    for token in colct_tkn_idx:
+
+        idf[token] = math.log(1 + document_count / colct_tkn_idx[token])
+        idf_weights[token] = math.pow(idf[token], 2)
+
+    ###     For each document in the collection, the magnitude of each document vector is calculated according to vector space model.
+
+    for token_list in doc_tkn_idx:
+
+        binary_magnitude        =       0                   ###     All document vectors are represented as binary vector.
+        frequency_magnitude     =       0                   ###     All document vectors are calculated according to the frequency of a term.
+        tfidf_magnitude         =       0                   ###     All document vectors are represented according to tf.idf method.
+
+        for token, frequency in token_list.items():
+
+            binary_magnitude += 1
+            frequency_magnitude += frequency
+            tfidf_magnitude += math.pow(math.log(1 + frequency) * idf[token], 2)
+
+        posting_count += binary_magnitude
+
+        doc_norms['binary'].append(math.sqrt(binary_magnitude))
+        doc_norms['frequency'].append(math.sqrt(frequency_magnitude))
+        doc_norms['tf.idf'].append(math.sqrt(tfidf_magnitude))
+
+    if profiler.enabled:
+        profiler.Count('log_calls_avoided', posting_count - len(idf))
+
+##########      Function that is used to get the final weights of the postings of a term.       ##########
+
+### Input   :   token: term contained in the inverted index
+### Output  :   list of log(1 + tf) * idf weight of each posting. It is calculated once and kept when the index does not store it.
+def PostingWeights(token):
+
+    global posting_weights
+
+    if token not in posting_weights:
+
+        idf_weight = idf_weights[token]
+        posting_weights[token] = [math.log(1 + frequency) * idf_weight for doc_index, frequency in StreamPostings(token)]
+
+    elif profiler.enabled:                                  ###     Weights that are stored or already calculated save one log call per posting.
+        profiler.Count('log_calls_avoided', len(posting_weights[token]))
+
+    return posting_weights[token]
+
+##########      Function that is used to read the postings of a term one at a time.       ##########
+
+### Input   :   token: term contained in the inverted index
+### Output  :   iterator of (document index, term frequency) in document order. Postings of an index on disk are decoded as they are read, so the list is not held.
+def StreamPostings(token):
+
+    if isinstance(inv_tkn_idx, dict):
+        return iter(inv_tkn_idx[token])
+
+    return inv_tkn_idx.Stream(token)
+
 ##########      Function that is used to tokenize document and query.       ##########
 
 def Tokenize():
 
     global          doc_file_name, qry_file_name, stemming
-    global          colct_tkn_idx, doc_tkn_idx, qry_tkn_idx
+    global          colct_tkn_idx, doc_tkn_idx, qry_tkn_idx, positions_writer, store_writer
 
-    stemmer         =   PorterStemmer()
-    documents       =   ReadDocuments(doc_file_name)
+    if positions_use == True:                               ###     if -l option is set in command line then the positions of the terms of each document are recorded.
+        positions_writer = PositionalIndexWriter()
 
-    ###     Tokenize all documents in collection.
+    store_writer = DocumentStoreWriter(index_file_name)     ###     Byte offset of each document in the collection file is recorded for the document store.
 
-    for doc in documents:
+    ###     Tokenize all documents in collection. Shards are read from the collection only when they are tokenized, so the collection is never held in memory.
 
-        global document_count
+    documents       =   DocumentTexts(doc_file_name)
+    shard_size      =   PARALLEL_SHARD_SIZE if worker_count > 1 else SERIAL_SHARD_SIZE
+    shards          =   iter(lambda: list(itertools.islice(documents, shard_size)), [])
 
-        token_list = {}
+    if worker_count > 1:                                    ###     worker_count > 1 means that -j option is set in command line and shards are tokenized in a process pool.
+
+        with multiprocessing.Pool(worker_count, InitTokenizeWorker, (stop_words, stemming, stem_cache.stems, positions_use)) as pool:
+
+            pending = collections.deque()                   ###     Shards being tokenized, in document order. imap would read the whole collection into its task queue.
+
+            for shard in shards:
+
+                pending.append(pool.apply_async(TokenizeShard, (shard,)))
+
+                if len(pending) >= worker_count * 2:        ###     Twice as many shards as workers keep the workers busy while the oldest shard is merged.
+                    MergeTokenizedShard(pending.popleft().get())
+
+            while pending:
+                MergeTokenizedShard(pending.popleft().get())
+
+    else:
+
+        for shard in shards:
+            MergeTokenizedShard(TokenizeShard(shard))
+
+    TokenizeQueries()
+
+##########      Function that is used to read the documents of a collection for tokenizing.       ##########
+
+### Input   :   collection_path: filename(including or not path) of the collection file or directory
+### Output  :   iterator of the text of each document. Each document is recorded in the document store as it is read, so the collection is read once.
+def DocumentTexts(collection_path):
+
+    for doc in ReadDocuments(collection_path):
+
+        if store_writer is not None:
+            store_writer.Add(doc)
+
+        yield doc.text
+
+##########      Function that is used to merge a tokenized shard in the index.       ##########
+
+### Input   :   result: (token_lists, shard_colct_tkn_idx, stems, shard_positions) returned by TokenizeShard
+def MergeTokenizedShard(result):
+
+    token_lists, shard_colct_tkn_idx, stems, shard_positions = result
+
+    MergeShard(token_lists, shard_colct_tkn_idx, shard_positions)
+    stem_cache.Update(stems)                                ###     Stems found by the workers are kept in the stem cache.
+
+##########      Function that is used to set the tokenizing options of a worker process.       ##########
+
+def InitTokenizeWorker(worker_stop_words, worker_stemming, worker_stems, worker_positions_use):
+
+    global stop_words, stemming, stem_cache, positions_use
+
+    stop_words      =   worker_stop_words
+    stemming        =   worker_stemming
+    stem_cache      =   StemCache(worker_stems)
+    positions_use   =   worker_positions_use
+
+##########      Function that is used to tokenize a shard of documents.       ##########
+
+### Input   :   shard: list of documents. Each document is its text.
+### Output  :   (list of term frequency dictionary of each document, dictionary of document frequency of each term in the shard, dictionary of stems added while tokenizing,
+###             list of dictionary of the positions of each term of each document, which is empty unless -l option is set)
+def TokenizeShard(shard):
+
+    tokenizer           =   GetTokenizer()
+    token_lists         =   []
+    shard_colct_tkn_idx =   {}
+    shard_positions     =   []
+
+    for text in shard:
+
+        if positions_use == True:                           ###     Term frequencies are the lengths of the positions lists.
+
+            positions = tokenizer.Positions(text)
+            shard_positions.append(positions)
+            token_list = dict([(token, len(positions[token])) for token in positions])
+
+        else:
+            token_list = tokenizer.TokenList(text)          ###     Each document is tokenized as a whole text.
+
+        for token in token_list:                            ###     Count of documents that contains each term is calculated.
+
+            if token not in shard_colct_tkn_idx:
+                shard_colct_tkn_idx[token] = 1
+
+            elif token in shard_colct_tkn_idx:
+                shard_colct_tkn_idx[token] = shard_colct_tkn_idx[token] + 1
+
+        token_lists.append(token_list)
+
+    return token_lists, shard_colct_tkn_idx, stem_cache.TakeAdded(), shard_positions
+
+##########      Function that is used to merge a tokenized shard into the index.       ##########
+
+### Input   :   token_lists: list of term frequency dictionary of each document in the shard
+###             shard_colct_tkn_idx: dictionary of document frequency of each term in the shard
+###             shard_positions: list of dictionary of the positions of each term of each document in the shard
+def MergeShard(token_lists, shard_colct_tkn_idx, shard_positions):
+
+    global colct_tkn_idx, doc_tkn_idx, document_count
+
+    for token in shard_colct_tkn_idx:                       ###     Shards are merged in order, so term ids are given in the same order as a serial build.
+        colct_tkn_idx.Add(token, shard_colct_tkn_idx[token])
+
+    for doc_index in range(len(token_lists)):
+
+        token_list = token_lists[doc_index]
         document_count += 1
 
-        for line in doc.lines:
+        if positions_writer is not None:
+            positions_writer.Add(len(doc_tkn_idx), shard_positions[doc_index])
 
-            tokens = re.split('\-|\,|\&|\ |\"|\(|\)|\:|\;|\=|\/|\?\|\~|\`|\!|\@|\#|\$|\^|\*|\[|\]|\{|\}|\'|\<|\>|\/|\\n|\.', line)      ###     Each line is splitted by special characters.(Simple method)
+        AddPostings(len(doc_tkn_idx), token_list)
+        doc_tkn_idx.Append(token_list)                      ###     Document vector is stored as term ids and frequencies.
 
-            for token in tokens:
+    if profiler.enabled:
 
-                if (token != None) and (token != ''):
+        profiler.Count('documents_tokenized', len(token_lists))
+        profiler.Count('tokens_indexed', sum([sum(token_list.values()) for token_list in token_lists]))
 
-                    token = token.lower()                   ###     All character in tokens are lowercased.
+##########      Function that is used to read the text of each query.       ##########
 
-                    if stemming == True:                    ###     if stemming == True(that is -s option is set in command line) then stemming is performed.
-                        token = stemmer.stem(token)
+### Output  :   iterator of the text of each query in the query set, of the single query or of the custom query
+def QueryTexts():
 
-                    if token not in stop_words:
+    if query_type == CUSTOM_QUERY:                          ###     Means that we get query from command line.
 
-                        if token not in token_list:         ###     If the term is not registed before then it is registed.
+        yield query_string
+        return
 
-                            token_list[token] = 1
+    for doc in ReadDocuments(qry_file_name):                ###     Means that we get query not from command line.
 
-                            if token not in colct_tkn_idx:      ###     Count of documents that contains each term is calculated.
-                                colct_tkn_idx[token] = 1
+        if query_type == SINGLE_QUERY and doc.docid != query_index:     ###     This if statement is called only when query_type is SINGLE_QUERY
+            continue                                                    ###             The purpose of this statement is to ignore other queries in case of SINGLE_QUERY
 
-                            elif token in colct_tkn_idx:
-                                colct_tkn_idx[token] = colct_tkn_idx[token] + 1
+        yield doc.text
 
-                        elif token in token_list:           ###     If the term is registed before then the count is increased.
-                            token_list[token] = token_list[token] + 1
+##########      Function that is used to tokenize query.       ##########
 
-        doc_tkn_idx.append(token_list)
+def TokenizeQueries():
 
-    ###     Tokenize all queries in query set.
+    global          qry_tkn_idx
 
-    if query_type != CUSTOM_QUERY:                          ###     Means that we get query not from command line.
+    ###     Tokenize all queries in query set. User defined custom query is tokenized in the same way as documents.
 
-        documents = ReadDocuments(qry_file_name)
+    for text in QueryTexts():
 
-        for doc in documents:
+        if positions_use == True:                           ###     if -l option is set in command line then the clauses are kept apart, and their proximity operators are not terms.
 
-            if query_type == SINGLE_QUERY and doc.docid != query_index:     ###     This if statement is called only when query_type is SINGLE_QUERY
-                continue                                                    ###             The purpose of this statement is to ignore other queries in case of SINGLE_QUERY
+            text, clauses = ParseQuery(text, GetTokenizer())
 
-            token_list = {}
+            if len(clauses) > 0:
+                qry_clauses[len(qry_tkn_idx)] = clauses
 
-            query = ''
+        qry_tkn_idx.Append(GetTokenList(text))
 
-            for line in doc.lines:
-                query = query + line
+##########      Function that is used to read the phrase and proximity clauses of the queries whose vectors are stored in the index.       ##########
 
-            tokens = re.split('\-|\,|\&|\ |\"|\(|\)|\:|\;|\=|\/|\?\|\~|\`|\!|\@|\#|\$|\^|\*|\[|\]|\{|\}|\'|\<|\>|\/|\\n|\.', query)      ###     Each line is splitted by special characters.(Simple method)
-            token_list = GetTokenList(tokens)
-            qry_tkn_idx.append(token_list)
+def ReadQueryClauses():
 
-    elif query_type == CUSTOM_QUERY:
+    qry_index = 0
+
+    for text in QueryTexts():
+
+        clauses = ParseQuery(text, GetTokenizer())[1]
+
+        if len(clauses) > 0:
+            qry_clauses[qry_index] = clauses
+
+        qry_index += 1
+
+##########      Function that is used to get the tokenizer of the current options.       ##########
 
-        token_list  = {}
-        tokens      = re.split('\-|\,|\&|\ |\"|\(|\)|\:|\;|\=|\/|\?\|\~|\`|\!|\@|\#|\$|\^|\*|\[|\]|\{|\}|\'|\<|\>|\/|\\n|\.', query_string)      ###     User defined custom query is splitted by special characters.(Simple method)
-        token_list  = GetTokenList(tokens)
+def GetTokenizer():
 
-        qry_tkn_idx.append(token_list)
+    if stemming == True:                            ###     if stemming == True(that is -t option is set in command line) then stemming is performed.
+        return Tokenizer(stop_words, stem_cache.Stem)
+
+    return Tokenizer(stop_words)
 
 ##########      Function that is used to get token information from string       ##########
 
-def GetTokenList(tokens):
+### Input   :   text: string of a query
+### Output  :   dictionary of the terms contained in the text and their frequencies
+def GetTokenList(text):
 
-    stemmer         =       PorterStemmer()
-    token_list      =       {}
+    return GetTokenizer().TokenList(text)
 
-    for token in tokens:
 
-        if (token != None) and (token != ''):
+##########      Function that is used to retrieve the top-k documents of a query with MaxScore pruning.       ##########
 
-            token = token.lower();                      ###     All character in tokens are lowercased.
+### Input   :   qry_token_list: dictionary of the terms contained in the query and their frequencies
+###             qry_magnitude: magnitude of the query vector
+###             doc_magnitudes: list of the magnitudes of the document vectors
+###             term_upper_bounds: dictionary that caches the upper bound score of each term
+###             count: count of documents retrieved
+### Output  :   list of [match_score, document id] of the top-k documents in descending order. It is the same as the head of the exhaustive ranking.
+def TopKRanking(qry_token_list, qry_magnitude, doc_magnitudes, term_upper_bounds, count):
 
-            if stemming == True:                        ###     if stemming == True(that is -s option is set in command line) then stemming is performed.
-                token = stemmer.stem(token)
+    terms           =       []
 
-            if token not in stop_words:
+    for token in qry_token_list:
 
-                if token not in token_list:             ###     If the term is not registed before then it is registed.
-                    token_list[token] = 1
+        if token in inv_tkn_idx:
 
-                elif token in token_list:               ###     If the term is registed before then the count is increased.
-                    token_list[token] = token_list[token] + 1
+            terms.append(token)
 
-    return token_list
+            if token not in term_upper_bounds:          ###     Upper bound of a term is the maximum length-normalized contribution among its postings.
 
+                upper_bound = 0
 
-##########      Function that is used to rank documents.       ##########
+                for (doc_index, frequency), weight in zip(StreamPostings(token), PostingWeights(token)):
+                    upper_bound = max(upper_bound, weight / doc_magnitudes[doc_index])
 
-def DocumentRanking():
+                term_upper_bounds[token] = upper_bound
 
-    global doc_tkn_idx, qry_tkn_idx, colct_tkn_idx
+    ###     Terms are sorted by upper bound in ascending order. The first terms are non-essential once the sum of their upper bounds cannot reach the threshold.
 
-    doc_magnitudes      =       []
-    qry_magnitudes      =       []
+    terms.sort(key = lambda token: term_upper_bounds[token])
 
-    ###     For each document in the collection, the magnitude of each document vector is calculated according to vector space model.
+    postings            =       [inv_tkn_idx[token] for token in terms]
+    weights             =       [PostingWeights(token) for token in terms]
+    cursors             =       [0] * len(terms)
+    bound_sums          =       []
+    bound_sum           =       0
 
-    for token_list in doc_tkn_idx:
+    for token in terms:
 
-        doc_magnitude = 0
+        bound_sum += term_upper_bounds[token] / qry_magnitude * (1 + 1e-9)     ###     Bounds are slightly enlarged so that floating point rounding never prunes a document wrongly.
+        bound_sums.append(bound_sum)
 
-        for token in token_list:
+    top_scores          =       []                              ###     Min-heap of (match_score, document id) that keeps the best count documents.
+    threshold           =       -1                              ###     Score of the worst document in the heap once the heap is full.
+    first_essential     =       0                               ###     Terms before this index are non-essential.
+    candidate_count     =       0                               ###     Counts of the work done, which are reported by the profiler.
+    pruned_count        =       0
+    posting_count       =       0
 
-            if weighting_type       ==      'binary':                  ###     Weighting_type == 'binary' means that all document and query vectors are represented as binary vector.
-                doc_magnitude += 1
+    while True:
 
-            elif weighting_type     ==      'frequency':             ###     Weighting_type == 'frequency' means that all document and query vectors are calculated according to the frequency of a term.
-                doc_magnitude += token_list[token]
+        ###     The next candidate is the smallest document index among the cursors of the essential terms.
 
-            elif weighting_type     ==      'tf.idf':                ###     Weighting_type == 'tf.idf' means that all document and query vectors are represented according to tf.idf method.
-                doc_magnitude += math.pow(math.log(1 + token_list[token]) * math.log(1 + document_count / colct_tkn_idx[token]), 2)
+        candidate = -1
 
-        doc_magnitudes.append(math.sqrt(doc_magnitude))
+        for i in range(first_essential, len(terms)):
 
-    ###     For each query in the queryset, the magnitude of each query vector is calculated according to vector space model.
+            if cursors[i] < len(postings[i]) and (candidate < 0 or postings[i][cursors[i]][0] < candidate):
+                candidate = postings[i][cursors[i]][0]
 
-    for token_list in qry_tkn_idx:
-        qry_magnitude = 0
+        if candidate < 0:
+            break
 
-        for token in token_list:
-            if (token in colct_tkn_idx):
+        candidate_count += 1
 
-                if weighting_type == 'binary' or weighting_type == 'frequency':     ###     'binary' and 'frequency' are the same for query vector.
-                    qry_magnitude += 1
+        contributions   =       {}
+        doc_magnitude   =       doc_magnitudes[candidate]
+        partial_score   =       0
 
-                elif weighting_type == 'tf.idf':                                    ###     query vector is calculated according to tf.idf method.
-                    qry_magnitude += math.pow(math.log(1 + document_count / colct_tkn_idx[token]), 2)
+        for i in range(first_essential, len(terms)):
 
-        qry_magnitudes.append(math.sqrt(qry_magnitude))
+            if cursors[i] < len(postings[i]) and postings[i][cursors[i]][0] == candidate:
 
-    ###     For each query and for each document cosine similarity is calculated.
+                contributions[terms[i]] = weights[i][cursors[i]]
+                partial_score += contributions[terms[i]] / doc_magnitude / qry_magnitude
+                cursors[i] += 1
 
-    qry_index = 0
+        ###     Non-essential terms are looked up from the largest upper bound, and the document is skipped as soon as it cannot reach the threshold.
 
-    for qry_token_list in qry_tkn_idx:
+        pruned = False
 
-        doc_index       =       0
-        match_scores    =       []
+        for i in range(first_essential - 1, -1, -1):
 
-        for doc_token_list in doc_tkn_idx:
+            if partial_score * (1 + 1e-9) + bound_sums[i] < threshold:
+                pruned = True
+                break
 
-            match_score = 0
+            cursors[i] = bisect.bisect_left(postings[i], (candidate,), cursors[i])
 
-            for token in qry_token_list:
+            if cursors[i] < len(postings[i]) and postings[i][cursors[i]][0] == candidate:
 
-                if token in doc_token_list:
-                    match_score += math.log(1 + doc_token_list[token]) * math.pow(math.log(1 + document_count / colct_tkn_idx[token]), 2)   ###     Cosine similarity calculation.
+                contributions[terms[i]] = weights[i][cursors[i]]
+                partial_score += contributions[terms[i]] / doc_magnitude / qry_magnitude
 
-            match_score /= doc_magnitudes[doc_index] * qry_magnitudes[qry_index]        ###     similarity is length-normalized
-            match_scores.append([match_score, doc_index + 1])
-            doc_index += 1
+        posting_count += len(contributions)
 
-        match_scores.sort()
-        match_scores.reverse()
-        sorted_doc_ids.append(match_scores)
-        qry_index += 1
+        if pruned:
+
+            pruned_count += 1
+            continue
+
+        ###     Match score is calculated in query term order exactly as the exhaustive ranking does.
+
+        match_score = 0
+
+        for token in qry_token_list:
+
+            if token in contributions:
+                match_score += contributions[token]
+
+        match_score /= doc_magnitude * qry_magnitude
+
+        if len(top_scores) < count:
+            heapq.heappush(top_scores, (match_score, candidate + 1))
+
+        elif (match_score, candidate + 1) > top_scores[0]:
+            heapq.heapreplace(top_scores, (match_score, candidate + 1))
+
+        if len(top_scores) == count:
+
+            threshold = top_scores[0][0]
+
+            while first_essential < len(terms) and bound_sums[first_essential] < threshold:
+                first_essential += 1
+
+    if profiler.enabled:
+
+        profiler.Count('queries_ranked')
+        profiler.Count('postings_scored', posting_count)
+        profiler.Count('documents_scored', candidate_count - pruned_count)
+        profiler.Count('documents_pruned', pruned_count)
+
+    match_scores = [[match_score, doc_id] for match_score, doc_id in top_scores]
+    match_scores.sort()
+    match_scores.reverse()
+
+    ###     If less than count documents contain a query term, no document was pruned and zero score documents are added in descending document id order.
+
+    matched_doc_ids = set([doc_id for match_score, doc_id in top_scores])
+    doc_id = len(doc_tkn_idx)
+
+    while len(match_scores) < count and doc_id > 0:
+
+        if doc_id not in matched_doc_ids and doc_id not in deleted_doc_ids:
+            match_scores.append([0.0, doc_id])
+
+        doc_id -= 1
+
+    return match_scores
+
+
+##########      Function that is used to calculate the magnitude of a query vector.       ##########
+
+### Input   :   token_list: dictionary of the terms contained in the query and their frequencies
+### Output  :   magnitude of the query vector according to vector space model
+def QueryMagnitude(token_list):
+
+    qry_magnitude = 0
+
+    for token in token_list:
+        if (token in colct_tkn_idx):
+
+            if weighting_type == 'binary' or weighting_type == 'frequency':     ###     'binary' and 'frequency' are the same for query vector.
+                qry_magnitude += 1
+
+            elif weighting_type == 'tf.idf':                                    ###     query vector is calculated according to tf.idf method.
+                qry_magnitude += idf_weights[token]
+
+                if profiler.enabled:                                            ###     Squared idf weights are precomputed, so no log or pow call is made per query term.
+                    profiler.Count('pow_calls_avoided')
+
+    return math.sqrt(qry_magnitude)
+
+##########      Function that is used to rank documents for a query.       ##########
+
+### Input   :   qry_token_list: dictionary of the terms contained in the query and their frequencies
+###             qry_magnitude: magnitude of the query vector
+###             count: count of documents retrieved. (0 means that all documents are ranked exhaustively)
+###             clauses: list of the phrase and proximity clauses of the query (None means that the query has none)
+### Output  :   list of [match_score, document id] in descending order
+def RankQuery(qry_token_list, qry_magnitude, count, clauses = None):
+
+    doc_magnitudes = doc_norms[weighting_type]                  ###     Magnitudes of the document vectors are precomputed when indexing.
+
+    if clauses:                                                 ###     The documents that match every clause of the query are ranked first.
+
+        match_scores = ClauseRanking(qry_token_list, qry_magnitude, doc_magnitudes, MatchClauses(positional_index, clauses), count)
+
+        if count > 0 and len(match_scores) >= count:
+            return match_scores
+
+        ###     Quoted text is often a title rather than a phrase, so the rest of the ranking is filled from the ranking without the clauses.
+
+        matched = set([doc_id for match_score, doc_id in match_scores])
+        unfiltered = RankQuery(qry_token_list, qry_magnitude, count + len(matched) if count > 0 else 0)
+        match_scores.extend([[match_score, doc_id] for match_score, doc_id in unfiltered if doc_id not in matched])
+
+        if count > 0:
+            return match_scores[:count]
+
+        return match_scores
+
+    if impact_index is not None:                                ###     if -I option is set in command line then the postings are scored from the highest impact down until the budget runs out.
+
+        match_scores, posting_count = ImpactRanking(impact_index, qry_token_list, qry_magnitude, count, impact_budget, impact_deadline)
+
+        if profiler.enabled:
+
+            profiler.Count('queries_ranked')
+            profiler.Count('postings_scored', posting_count)
+            profiler.Count('documents_scored', len(match_scores))
+
+        return match_scores
+
+    if count > 0:                                               ###     count > 0 means that only the top-k documents are retrieved.
+
+        if weighting_type not in term_upper_bounds:
+            term_upper_bounds[weighting_type] = {}
+
+        return TopKRanking(qry_token_list, qry_magnitude, doc_magnitudes, term_upper_bounds[weighting_type], count)
+
+    ###     Cosine similarity is accumulated term-at-a-time by walking only the postings of the query terms.
+
+    accumulators    =       {}                                  ###     Partial match score of each document that contains at least one query term.
+    posting_count   =       0
+
+    for token in qry_token_list:
+
+        if token in inv_tkn_idx:
+
+            weights = PostingWeights(token)
+            posting_count += len(weights)
+
+            for (doc_index, frequency), weight in zip(StreamPostings(token), weights):
+
+                if doc_index not in accumulators:
+                    accumulators[doc_index] = 0
+
+                accumulators[doc_index] += weight               ###     Cosine similarity calculation.
+
+    if profiler.enabled:
+
+        profiler.Count('queries_ranked')
+        profiler.Count('postings_scored', posting_count)
+        profiler.Count('documents_scored', len(accumulators))
+
+    match_scores    =       []
+
+    for doc_index in accumulators:
+
+        match_score = accumulators[doc_index] / (doc_magnitudes[doc_index] * qry_magnitude)        ###     similarity is length-normalized
+        match_scores.append([match_score, doc_index + 1])
+
+    match_scores.sort()
+    match_scores.reverse()
+
+    ###     Documents that contain no query term have zero score. They are ranked after the matched documents in descending document id order as before.
+
+    match_scores.extend([[0.0, doc_index + 1] for doc_index in range(len(doc_tkn_idx) - 1, -1, -1) if doc_index not in accumulators and doc_index + 1 not in deleted_doc_ids])
+
+    return match_scores
+
+##########      Function that is used to rank the documents that match the clauses of a query.       ##########
+
+### Input   :   qry_token_list: dictionary of the terms contained in the query and their frequencies
+###             qry_magnitude: magnitude of the query vector
+###             doc_magnitudes: list of the magnitudes of the document vectors
+###             documents: set of the indexes of the documents that match the clauses
+###             count: count of documents retrieved. (0 means that all matched documents are ranked)
+### Output  :   list of [match_score, document id] in descending order
+def ClauseRanking(qry_token_list, qry_magnitude, doc_magnitudes, documents, count):
+
+    accumulators = dict([(doc_index, 0) for doc_index in documents if doc_index + 1 not in deleted_doc_ids])
+
+    for token in qry_token_list:
+
+        if token in inv_tkn_idx:
+
+            for (doc_index, frequency), weight in zip(StreamPostings(token), PostingWeights(token)):
+
+                if doc_index in accumulators:
+                    accumulators[doc_index] += weight           ###     Cosine similarity calculation, as in RankQuery().
+
+    match_scores = [[accumulators[doc_index] / (doc_magnitudes[doc_index] * qry_magnitude), doc_index + 1] for doc_index in accumulators]
+    match_scores.sort()
+    match_scores.reverse()
+
+    if count > 0:
+        return match_scores[:count]
+
+    return match_scores
+
+##########      Function that is used to rank documents for a query string.       ##########
+
+### Input   :   text: string of a query
+### Output  :   list of [match_score, document id] of the top show_count documents in descending order
+def RankQueryString(text):
+
+    clauses = None
+
+    if positional_index is not None:                            ###     The clauses of the query are matched against the positions. Rankings of such queries are not cached.
+        text, clauses = ParseQuery(text, GetTokenizer())
+
+    token_list = GetTokenList(text)
+
+    if not token_list and not clauses:                          ###     A request without any term matches no document.
+        return []
+
+    if result_cache is None or clauses or impact_index is not None:
+        return RankQuery(token_list, QueryMagnitude(token_list), show_count, clauses)
+
+    key = result_cache.Key(token_list, weighting_type, show_count)
+    match_scores = result_cache.Get(key)                        ###     A query that normalizes to a cached query is answered without ranking.
+
+    if match_scores is None:
+
+        match_scores = RankQuery(token_list, QueryMagnitude(token_list), show_count)
+        result_cache.Put(key, match_scores)
+
+    return match_scores
+
+##########      Function that is used to rank the queries one batch at a time.       ##########
+
+### Input   :   depth: count of documents kept in the ranking of each query (0 means that whole rankings are kept)
+### Output  :   iterator of (query index, list of [match_score, document id] in descending order) in query order.
+###             Only the rankings of one batch of queries are held at a time, so the memory does not grow with the count of queries.
+def RankQueries(depth):
+
+    cache_count     =   top_k if top_k > 0 else -depth      ###     Exhaustive rankings cut at a depth are cached apart from whole rankings, under the negative depth.
+    pool            =   None
+    query_pool      =   None
+    matrix          =   None
+    batches         =   (LookupBatch(range(start, min(start + QUERY_BATCH_SIZE, len(qry_tkn_idx))), cache_count) for start in range(0, len(qry_tkn_idx), QUERY_BATCH_SIZE))
+
+    if shard_count > 0:                                         ###     shard_count > 0 means that -P option is set in command line. Worker processes are started once for the whole query stream.
+
+        shards = ReadShardManifest(index_file_name)
+        pool = multiprocessing.Pool(worker_count if worker_count > 1 else len(shards), InitRankWorker, (weighting_type, top_k, depth))
+
+    elif ranking_engine == 'sparse':                            ###     ranking_engine == 'sparse' means that each batch is scored with one sparse matrix product. The term-document matrix is built once.
+        matrix = BuildTermDocumentMatrix(inv_tkn_idx, PostingWeights, doc_norms[weighting_type])
+
+    elif worker_count > 1 and len(qry_tkn_idx) > QUERY_BATCH_SIZE and 'fork' in multiprocessing.get_all_start_methods():
+
+        ###     worker_count > 1 means that -j option is set in command line and the batches are ranked in a process pool. Forked workers share the loaded index
+        ###     with this process copy-on-write, and a binary index is mapped by every process from the same page cache, so the index is loaded only once.
+
+        query_pool = multiprocessing.get_context('fork').Pool(worker_count)
+        batches = list(batches)                                 ###     Result cache is read here, as the pool reads its tasks in another thread.
+        ranked_batches = query_pool.imap(RankBatch, [(missed, depth) for batch, keys, rankings, missed in batches if len(missed) > 0])
+
+    try:
+
+        for batch, keys, rankings, missed in batches:
+
+            ###     For each query in the batch, the magnitude of each query vector is calculated according to vector space model.
+
+            qry_magnitudes = [QueryMagnitude(qry_tkn_idx[qry_index]) for qry_index in missed] if query_pool is None else []
+
+            if len(missed) == 0:
+                missed_rankings = []
+
+            elif query_pool is not None:                        ###     Batches are ranked in parallel and gathered in query order, so the results are the same as the serial ranking.
+                missed_rankings = next(ranked_batches)
+
+            elif pool is not None:
+                missed_rankings = ShardedDocumentRanking([qry_tkn_idx[qry_index] for qry_index in missed], qry_magnitudes, shards, pool)
+
+            elif matrix is not None:
+                missed_rankings = SparseDocumentRanking([qry_tkn_idx[qry_index] for qry_index in missed], inv_tkn_idx, PostingWeights, doc_norms[weighting_type], qry_magnitudes, top_k if top_k > 0 else depth if depth > 0 else len(doc_tkn_idx), deleted_doc_ids, matrix = matrix)
+
+            else:                                               ###     For each query, documents are ranked exhaustively or, if -k option is set in command line, only the top-k documents are retrieved.
+                missed_rankings = (RankQuery(qry_tkn_idx[qry_index], qry_magnitude, top_k, qry_clauses.get(qry_index)) for qry_index, qry_magnitude in zip(missed, qry_magnitudes))
+
+            for qry_index, match_scores in zip(missed, missed_rankings):
+
+                rankings[qry_index] = match_scores[:depth] if depth > 0 else match_scores       ###     An exhaustive ranking is cut before the next query is ranked.
+
+                if qry_index in keys:
+                    result_cache.Put(keys[qry_index], rankings[qry_index])
+
+            for qry_index in batch:
+                yield qry_index, rankings.pop(qry_index)
+
+    finally:
+
+        if pool is not None:
+            pool.terminate()
+
+        if query_pool is not None:
+            query_pool.terminate()
+
+##########      Function that is used to find the rankings of a batch of queries in the result cache.       ##########
+
+### Input   :   batch: range of the indexes of the queries
+###             cache_count: count of documents of the cached rankings
+### Output  :   (batch, dictionary of cache key of each query, dictionary of cached ranking of each query, list of the indexes of the queries to rank)
+def LookupBatch(batch, cache_count):
+
+    keys        =   {}
+    rankings    =   {}
+
+    ###     Rankings of the queries that are found in the result cache are reused. Only the other queries are ranked. Queries with clauses and score-at-a-time
+    ###     rankings, which depend on the budget and the deadline, are never cached.
+
+    if result_cache is not None and impact_index is None:
+
+        for qry_index in batch:
+
+            if qry_index in qry_clauses:
+                continue
+
+            keys[qry_index] = result_cache.Key(qry_tkn_idx[qry_index], weighting_type, cache_count)
+            rankings[qry_index] = result_cache.Get(keys[qry_index])
+
+    return batch, keys, rankings, [qry_index for qry_index in batch if rankings.get(qry_index) is None]
+
+##########      Function that is used to rank a batch of queries in a forked worker process.       ##########
+
+### Input   :   task: (list of the indexes of the queries, count of documents kept in each ranking)
+### Output  :   list of [match_score, document id] lists of each query in descending order
+def RankBatch(task):
+
+    qry_indexes, depth = task
+    rankings = []
+
+    for qry_index in qry_indexes:
+
+        match_scores = RankQuery(qry_tkn_idx[qry_index], QueryMagnitude(qry_tkn_idx[qry_index]), top_k, qry_clauses.get(qry_index))
+        rankings.append(match_scores[:depth] if depth > 0 else match_scores)     ###     Rankings are cut before they are sent back to the main process.
+
+    return rankings
+
+##########      Function that is used to rank queries on the shards of the index.       ##########
+
+### Input   :   queries: list of term frequency dictionary of each query
+###             qry_magnitudes: list of the magnitudes of the query vectors, calculated with the statistics of the whole collection
+###             shards: list of [shard file path, index of its first document, count of its documents]
+###             pool: process pool whose workers rank the shards
+### Output  :   list of [match_score, document id] lists of each query in descending order, the same as the rankings of the single index
+def ShardedDocumentRanking(queries, qry_magnitudes, shards, pool):
+
+    queries     =   [dict(token_list.items()) for token_list in queries]            ###     Query vectors are sent to the workers as plain dictionaries.
+    batches     =   [list(zip(queries[start:start + QUERY_BATCH_SIZE], qry_magnitudes[start:start + QUERY_BATCH_SIZE])) for start in range(0, len(queries), QUERY_BATCH_SIZE)]
+    tasks       =   [(path, base, batch) for path, base, count in shards for batch in batches]
+    results     =   pool.map(RankShard, tasks)                  ###     Each task ranks a batch of queries on one shard.
+
+    ###     Rankings of each shard are gathered in query order and merged into the ranking of the whole collection.
+
+    shard_rankings = [[] for shard in shards]
+
+    for task_index in range(len(tasks)):
+        shard_rankings[task_index // len(batches)].extend(results[task_index])
+
+    return [MergeRankings([rankings[qry_index] for rankings in shard_rankings], top_k) for qry_index in range(len(queries))]
+
+##########      Function that is used to set the ranking options of a worker process.       ##########
+
+def InitRankWorker(worker_weighting_type, worker_top_k, worker_depth):
+
+    global weighting_type, top_k, rank_depth
+
+    weighting_type  =   worker_weighting_type
+    top_k           =   worker_top_k
+    rank_depth      =   worker_depth
+
+##########      Function that is used to rank a batch of queries on a shard.       ##########
+
+### Input   :   task: (shard file path, index of the first document of the shard, list of (term frequency dictionary, magnitude) of each query)
+### Output  :   list of [match_score, document id] lists of each query in descending order, with the document ids of the whole collection
+def RankShard(task):
+
+    global inv_tkn_idx, idf_weights, doc_norms, posting_weights, doc_tkn_idx, deleted_doc_ids, term_upper_bounds
+
+    path, base, queries = task
+
+    if path not in open_shards:                                 ###     A shard is opened once per worker process and its weight caches are kept with it.
+
+        index = ReadBinaryIndexFile(path)
+        open_shards[path] = (index.ReadInvertedIndex(), index.ReadIdfWeights(), index.ReadDocumentNorms(), index.ReadPostingWeights(), index.ReadDocumentIndex(), {})
+
+    ###     The shard becomes the index of this process, so the queries are ranked by the same code as the single index.
+
+    inv_tkn_idx, idf_weights, doc_norms, posting_weights, doc_tkn_idx, term_upper_bounds = open_shards[path]
+    deleted_doc_ids = set()
+
+    ###     The top documents of the whole collection are among the top documents of each shard, so a shard ranking is cut at the depth.
+
+    rankings = [RankQuery(token_list, qry_magnitude, top_k) for token_list, qry_magnitude in queries]
+
+    return [[[match_score, base + doc_id] for match_score, doc_id in (match_scores[:rank_depth] if rank_depth > 0 else match_scores)] for match_scores in rankings]
+
+
+##########      Function that is used to update the segments of the index.       ##########
+
+def UpdateIndex():
+
+    global store_writer
+
+    if not IsSegmentedIndex(index_file_name) and not IsBinaryIndexFile(index_file_name):
+
+        print ("\nOnly a binary index can be updated : rebuild the index with -i option.")
+        exit(1)
+
+    if add_file_name != '':                                     ###     Added documents are tokenized in the same way as indexing and written in a new segment.
+
+        if IsDocumentStore(index_file_name):                    ###     Added documents are recorded in the document store after the documents already in it.
+
+            store = OpenDocumentStore()
+
+            if store is not None:
+
+                store_writer = DocumentStoreWriter(index_file_name, store)
+                store.Close()
+
+        tokenizer   = GetTokenizer()
+        token_lists = [tokenizer.TokenList(text) for text in DocumentTexts(add_file_name)]
+
+        if len(token_lists) > 0:
+
+            doc_ids = AddSegment(index_file_name, token_lists)
+            print ('Added documents :', doc_ids[0], '-', doc_ids[-1])
+
+            if store_writer is not None:                        ###     Only the records of the added documents are new, so the collections already in the store are not read.
+                store_writer.Write()
+
+            elif IsDocumentStore(index_file_name):              ###     A stale store can not be extended, so it is removed until the index is rebuilt.
+                os.remove(DocumentStorePath(index_file_name))
+
+    if len(delete_doc_ids) > 0:                                 ###     Deleted documents are marked with tombstones.
+
+        DeleteDocuments(index_file_name, delete_doc_ids)
+        print ('Deleted documents :', ','.join([str(doc_id) for doc_id in delete_doc_ids]))
+
+    if segments_merge == True:                                  ###     Segments are compacted into one segment.
+        MergeSegments(index_file_name)
+
+
+##########      Function that is used to save the result cache and report its counters.       ##########
+
+def SaveResultCache():
+
+    if result_cache is None:
+        return
+
+    result_cache.Save(index_file_name + '.results')
+
+    print ('Result cache : %d hits, %d misses' % (result_cache.hits, result_cache.misses), file = sys.stderr)
+
+
+##########      Function that is used to read an existing index.       ##########
+
+def LoadIndex():
+
+    global colct_tkn_idx, doc_tkn_idx, qry_tkn_idx, inv_tkn_idx, idf_weights, doc_norms, posting_weights, deleted_doc_ids, document_count
+
+    if IsSegmentedIndex(index_file_name):                   ###     Segmented index is read as one index over all live segments.
+        index       = ReadSegmentedIndex(index_file_name)
+
+    elif IsBinaryIndexFile(index_file_name):                ###     Binary index is opened through mmap and its sections are read on demand.
+        index       = ReadBinaryIndexFile(index_file_name)
+
+    else:                                                   ###     Text index is parsed from the beginning.
+        index       = ReadIndexFile(index_file_name)
+
+    with profiler.Phase('ReadIndexFile'):                   ###     Text index is scanned here. Sections of a binary index are mapped and read on demand.
+
+        if query_type == FILE_QUERY and server_address == '':   ###     Stored query vectors are read only for the query file.
+            index.Load(['documentcount', 'collection', 'document', 'query'])
+
+        else:                                               ###     Single and custom query are tokenized in the same way as indexing, so stored query vectors are not loaded.
+            index.Load(['documentcount', 'collection', 'document'])
+
+    colct_tkn_idx   = index.ReadCollectionIndex()             ###             Read collection index.
+    doc_tkn_idx     = index.ReadDocumentIndex()                 ###             Read document index.
+    document_count  = (int)(index.ReadDocumentCount())       ###             Read document count that is contained in collection file.
+
+    if server_address == '' and query_type == FILE_QUERY:   ###     Queries of the server mode are tokenized when they are received.
+
+        qry_tkn_idx = index.ReadQueryIndex()                    ###             Read Query index.
+
+        if positions_use == True:                           ###             and the clauses of the queries, which are not stored.
+            ReadQueryClauses()
+
+    elif server_address == '':
+        TokenizeQueries()
+
+    if isinstance(index, ReadBinaryIndexFile) or isinstance(index, ReadSegmentedIndex):
+
+        inv_tkn_idx     = index.ReadInvertedIndex()         ###             Read inverted index.
+        idf_weights     = index.ReadIdfWeights()            ###             Read precomputed idf weights.
+        doc_norms       = index.ReadDocumentNorms()         ###             Read precomputed document magnitudes.
+        posting_weights = index.ReadPostingWeights()        ###             Read precomputed posting weights if they are stored.
+
+        if isinstance(index, ReadSegmentedIndex):
+            deleted_doc_ids = index.ReadDeletedDocuments()  ###             Read the tombstones of the deleted documents.
+
+    else:
+
+        with profiler.Phase('BuildInvertedIndex'):
+            BuildInvertedIndex()                            ###             Build the inverted index from the document index.
+
+        with profiler.Phase('ComputeWeights'):
+            ComputeWeights()                                ###             and calculate the weights that the text index does not store.
+
+##########      Function that is used to build the index from the document collection and write it on disk.       ##########
+
+def BuildIndex():
+
+    with profiler.Phase('Tokenize'):
+        Tokenize()                                          ###     Tokenizing is performed to configure index data structure.
+
+    with profiler.Phase('ComputeWeights'):
+        ComputeWeights()                                    ###             Idf weights and document magnitudes are precomputed.
+
+    if weights_store == True:                               ###     if -p option is set in command line then the weights of all postings are precomputed.
+
+        for token in inv_tkn_idx:
+            PostingWeights(token)
+
+    RemoveSegments(index_file_name)                         ###             Segments of a previous index are removed before it is rebuilt.
+    RemoveShards(index_file_name)                           ###             and so are its shards.
+
+    with profiler.Phase('WriteDocumentStore'):
+        store_writer.Write()                                ###     Byte offset of each document in the collection file was recorded while tokenizing.
+
+    with profiler.Phase('WriteBinaryIndexFile'):
+        WriteBinaryIndexFile(index_file_name, document_count, colct_tkn_idx, doc_tkn_idx, qry_tkn_idx, inv_tkn_idx, idf_weights, doc_norms, posting_weights if weights_store else None, postings_codec)      ###             and index is written in the file on disk.
+
+    if shard_count > 0:                                     ###     if -P option is set in command line then the documents are also partitioned into shard files.
+
+        with profiler.Phase('WriteShards'):
+            WriteShards(index_file_name, shard_count, doc_tkn_idx, idf_weights, doc_norms, weights_store, postings_codec)
+
+    if impact_use == True:                                  ###     if -I option is set in command line then the impact-ordered index of the weighting type is written next to the index.
+
+        with profiler.Phase('WriteImpactIndex'):
+            WriteImpactIndex(index_file_name, inv_tkn_idx, PostingWeights, doc_norms[weighting_type], weighting_type)
+
+    if positions_use == True:                               ###     if -l option is set in command line then the positions are written next to the index.
+
+        with profiler.Phase('WritePositions'):
+            positions_writer.Write(index_file_name)
+
+
+##########      Function that is used to open the document store of the index.       ##########
+
+### Output  :   ReadDocumentStore of the index, or None if the index has no usable document store
+###             The store only adds titles and snippets, so a missing or stale store is reported and results are shown by their ids only.
+def OpenDocumentStore():
+
+    if not IsDocumentStore(index_file_name):
+
+        print ('Warning : the index has no document store, only document ids are shown.', file = sys.stderr)
+        return None
+
+    try:
+        return ReadDocumentStore(index_file_name)
+
+    except Exception as error:
+
+        print ('Warning : the document store is not used, only document ids are shown. (%s)' % error, file = sys.stderr)
+        return None
+
+##########      Function that is used to show a result in console.       ##########
+
+### Input   :   qry_index: index of the query
+###             doc_id: id of the document
+def ShowResult(qry_index, doc_id):
+
+    document = document_store.Document(doc_id - 1) if document_store is not None else None
+
+    if document is None:                                    ###     Documents that are not in the document store are shown by their ids only.
+
+        print (qry_index + 1, ':', doc_id)
+        return
+
+    docid, text = document
+    tokenizer = GetTokenizer()
+    terms = set(qry_tkn_idx[qry_index])
+
+    print (qry_index + 1, ':', doc_id, ':', Title(text))
+    print ('       ', Snippet(text, lambda word: any([token in terms for token in tokenizer.TokenList(word)])))
+
+
+##########      Function that is used to write the profile report.       ##########
+
+def WriteProfile():
+
+    if not profiler.enabled:
+        return
+
+    profiler.Count('tokens_stemmed', stem_cache.computed)
+    profiler.Write(profile_name)
+
+    if ranking_profile_name != '' and profile_name == '-':     ###     The most expensive functions of the ranking phase are also shown.
+
+        import pstats
+        pstats.Stats(ranking_profile_name, stream = sys.stderr).sort_stats('cumulative').print_stats(15)
 
 
 ##########      Main Function       ##########
 
 def main():
 
-    global colct_tkn_idx, doc_tkn_idx,  qry_tkn_idx, document_count, query_type
+    global index_reuse, result_cache, positional_index, impact_index, document_store
 
     AnalyseCommandLine()                                        ###     First, analyze command line.
 
+    if profile_name != '':                                      ###     if --profile or --profile-file option is set in command line then the phases are measured.
+        profiler.Enable()
+
     if stop_list_use == True:                                   ###     stop_list_use == True means that stop_list is used and -s option is set in command line.
-        ReadStopWords(stop_list_name)                           ###     if -s option is set in command line read stopwords from stopword list file.
+
+        with profiler.Phase('ReadStopWords'):
+            ReadStopWords(stop_list_name)                       ###     if -s option is set in command line read stopwords from stopword list file.
+
+    if stemming == True:                                        ###     Stems of known tokens are read from the stem cache next to the index file.
+        stem_cache.Load(index_file_name + '.stems')
+
+    if positions_use == True and (add_file_name != '' or len(delete_doc_ids) > 0 or segments_merge == True):
+
+        print ("\nPositions are not kept in segments : rebuild the index with -i and -l options after updating it.")
+        exit(1)
+
+    if impact_use == True and (add_file_name != '' or len(delete_doc_ids) > 0 or segments_merge == True):
+
+        print ("\nImpacts are not kept in segments : rebuild the index with -i and -I options after updating it.")
+        exit(1)
+
+    if impact_use == True and (shard_count > 0 or ranking_engine == 'sparse'):
+
+        print ("\nScore-at-a-time ranking reads the impact-ordered index : -I option can not be used with -P option or the sparse engine.")
+        exit(1)
+
+    if positions_use == True and (shard_count > 0 or ranking_engine == 'sparse'):
+
+        print ("\nClauses are matched by the python engine on the whole index : -l option can not be used with -P option or the sparse engine.")
+        exit(1)
+
+    if add_file_name != '' or len(delete_doc_ids) > 0 or segments_merge == True:
+
+        index_reuse = True                                      ###     Index update options always reuse the index. -i option only names the index to update.
+
+        with profiler.Phase('UpdateIndex'):
+            UpdateIndex()                                       ###     if -a, -R or -m option is set in command line then the index is updated before it is reused.
+
+    if index_reuse == True and shard_count > 0 and not IsShardedIndex(index_file_name):
+
+        print ("\nThe index has no shards : build the index with -i and -P options.")
+        exit(1)
+
+    if index_reuse == True and positions_use == True and not IsPositionalIndex(index_file_name):
+
+        print ("\nThe index has no positions : build the index with -i and -l options.")
+        exit(1)
+
+    if index_reuse == True and impact_use == True and not IsImpactIndex(index_file_name):
+
+        print ("\nThe index has no impacts : build the index with -i and -I options.")
+        exit(1)
+
+    if shard_count > 0 and ranking_engine == 'sparse':
+
+        print ("\nShards are ranked by the python engine : -P option can not be used with the sparse engine.")
+        exit(1)
 
     if index_reuse == True:                                     ###     index_reuse == True means that index is reused and -i option is set in command line.
 
-        index           = ReadIndexFile(index_file_name)                  ###     if -i option is set in command line
-        colct_tkn_idx   = index.ReadCollectionIndex()             ###             Read collection index.
-        doc_tkn_idx     = index.ReadDocumentIndex()                 ###             Read document index.
-        qry_tkn_idx     = index.ReadQueryIndex()                    ###             Read Query index.
-        document_count  = (int)(index.ReadDocumentCount())       ###             Read document count that is contained in collection file.
+        with profiler.Phase('LoadIndex'):
+            LoadIndex()
 
-    else:
-        Tokenize()                                              ###     if -i option is unset in command line then tokenizing is performed to configure index data structure.
-        WriteIndexFile(index_file_name)                         ###             and index is written in the file on disk.
+    else:                                                       ###     if -i option is set in command line then the index is built.
+
+        with profiler.Phase('BuildIndex'):
+            BuildIndex()
+
+    if positions_use == True:                                   ###     Positions are read through mmap, so that only the postings of the clause terms are decoded.
+        positional_index = ReadPositionalIndex(index_file_name)
+
+    if impact_use == True:                                      ###     Impact-ordered index is read through mmap too.
+
+        impact_index = ReadImpactIndex(index_file_name)
+
+        if impact_index.weighting_type != weighting_type:
+
+            print ("\nThe impacts are computed for %s weighting : rebuild the index with -i, -I and -w %s options." % (impact_index.weighting_type, weighting_type))
+            exit(1)
+
+    if stemming == True:                                        ###     Stems found while tokenizing documents and queries are saved for later runs.
+        stem_cache.Save(index_file_name + '.stems')
+
+    if text_index_name != '':                                   ###     if -x option is set in command line then the index is also exported in text format.
+
+        with profiler.Phase('WriteIndexFile'):
+            WriteIndexFile(text_index_name)
+
+    if query_type != FILE_QUERY:                                ###     Titles and snippets of the results of single and custom query are read through the document store.
+        document_store = OpenDocumentStore()
+
+    if cache_capacity > 0:                                      ###     if -c option is set in command line then the rankings cached for the same index are read.
+
+        result_cache = ResultCache(cache_capacity, IndexGeneration(index_file_name))
+        result_cache.Load(index_file_name + '.results')
+
+    if server_address != '':                                    ###     if -D option is set in command line then queries are served until the server is stopped.
+
+        with profiler.Phase('Serve'):
+            Serve(server_address, RankQueryString)
+
+        if stemming == True:
+            stem_cache.Save(index_file_name + '.stems')
+
+        SaveResultCache()
+        WriteProfile()
+
+        return
+
+    if ranking_profile_name != '':                              ###     if --profile-ranking option is set in command line then the ranking phase is captured by cProfile.
+
+        import cProfile
+        ranking_profile = cProfile.Profile()
+        ranking_profile.enable()
+
+    ###     Ranking is performed one query at a time, and the documents relevant to each query are written in the result file to perform performance evaluation
+    ###     as soon as the query is ranked. Only the documents written or shown are kept of each ranking.
+
+    depth = result_depth if query_type == FILE_QUERY else max(result_depth, show_count)
+
+    with profiler.Phase('DocumentRanking'):
+
+        f = open(result_file_name, 'w')
+
+        for qry_index, match_scores in RankQueries(depth):
+
+            WriteResult(f, qry_index, match_scores)
+            f.flush()                                           ###     Results of a query are available before the whole query set is ranked.
 
-    DocumentRanking()                                           ###     Ranking is performed.
-    WriteResultFile(result_file_name)                           ###     Finally the list of document ids relevant to each query is written in a file to perform performance evaluation.
+            if query_type != FILE_QUERY:
 
-    if query_type != FILE_QUERY:
+                for match_score, doc_id in match_scores[:show_count]:
+                    ShowResult(qry_index, doc_id)
 
-        query_index = 0
+        f.close()
 
-        for query in qry_tkn_idx:
+    if ranking_profile_name != '':
 
-            for ranking in range(0, show_count):
+        ranking_profile.disable()
+        ranking_profile.dump_stats(ranking_profile_name)
 
-                print (query_index + 1, ':', sorted_doc_ids[query_index][ranking][1])
+    SaveResultCache()
 
-            query_index += 1
+    WriteProfile()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+"""\
+--------------------------------------------------------------------------------
+    USE: python <PROGNAME> (options)
+    ACTION: Measures the trade-off of score-at-a-time ranking on an impact-ordered
+            index. For each postings budget, it ranks the query set, and reports
+            the postings scored per query, the query latency percentiles, the
+            overlap with the exact top documents and the precision, recall and
+            interpolated precision computed by eval_ir_my.py. The first rows are
+            the exact ranking, exhaustive and with MaxScore top-k pruning. Each
+            configuration is ranked once to warm up before it is timed.
+    OPTIONS:
+        -h : print this help message
+        -i <filename> : name of the index file, built with -I option of DRSystem.(default value is index.bin)
+        -s <filename> : name of the stopwords list file.(default value is stop_list.txt)
+        -t : flag option to determine whether stemming is applied or not.
+        -w <weight_type> : weighting type the impacts were computed for.(default value is tf.idf)
+        -b <budgets> : comma separated counts of postings scored per query.(default value is 0,4000,2000,1000,500,250, 0 means no limit)
+        -T <milliseconds> : deadline of each query.(default value is 0, no limit)
+        -g <filename> : name of the gold standard file.(default value is cacm_gold_std.txt)
+        -n <count> : count of documents retrieved per query.(default value is 10)
+--------------------------------------------------------------------------------
+"""
+
+import getopt, sys, os, time, tempfile
+from types import SimpleNamespace
+import DRSystem
+from impact_index import ReadImpactIndex, ImpactRanking
+from eval_ir_my import Key, Response, Score
+
+##########      Functions that are used to rank a query in each configuration.        ##########
+
+### Output  :   (ranking, count of postings scored). Exact rankings are exhaustive and cut to the depth, as DRSystem writes the result file,
+###             so every posting of the query terms is scored.
+def ExactRanking(token_list, qry_magnitude, depth):
+
+    ranking = DRSystem.RankQuery(token_list, qry_magnitude, 0)[:depth]
+
+    return ranking, sum([len(DRSystem.inv_tkn_idx[token]) for token in token_list if token in DRSystem.inv_tkn_idx])
+
+### Output  :   (ranking, None). The top documents are the same as the exact ones, and MaxScore does not report the postings it skips.
+def MaxScoreRanking(token_list, qry_magnitude, depth):
+
+    return DRSystem.RankQuery(token_list, qry_magnitude, depth), None
+
+##########      Function that is used to rank the query set and measure it.        ##########
+
+### Input   :   rank: function that returns (ranking, count of postings scored or None) of a query
+### Output  :   (list of rankings of each query, list of latencies in seconds, count of postings scored or None)
+###             The query set is ranked once untimed to warm up the caches, then once timed.
+def RankQuerySet(rank):
+
+    for timed in (False, True):
+
+        rankings        =   []
+        latencies       =   []
+        posting_count   =   0
+
+        for token_list in DRSystem.qry_tkn_idx:
+
+            qry_magnitude = DRSystem.QueryMagnitude(token_list)
+
+            start = time.perf_counter()
+            ranking, count = rank(token_list, qry_magnitude)
+            latencies.append(time.perf_counter() - start)
+
+            rankings.append(ranking)
+            posting_count = posting_count + count if count is not None and posting_count is not None else None
+
+    return rankings, latencies, posting_count
+
+##########      Function that is used to evaluate rankings with eval_ir_my.py.        ##########
+
+### Output  :   (precision, recall, interpolated precision averaged over the recall points)
+def Evaluate(rankings, gold_name):
+
+    with tempfile.NamedTemporaryFile('w', suffix = '.txt', delete = False) as f:
+
+        for qry_index in range(len(rankings)):
+            for match_score, doc_id in rankings[qry_index]:
+                f.write('%d %d\n' % (qry_index + 1, doc_id))
+
+    try:
+
+        config = SimpleNamespace(keyfile = gold_name, responsefile = f.name, response_limit = None, interp_points = 10, query_print = False, print_flat = True)
+        key = Key(config)
+        response = Response(config, key)
+        score = Score(config, key, response)
+
+    finally:
+        os.remove(f.name)
+
+    precision = score.total_relevant_retrieved / score.total_retrieved if score.total_retrieved > 0 else 0.0
+    recall = score.total_relevant_retrieved / score.total_relevant if score.total_relevant > 0 else 0.0
+
+    return precision, recall, sum(score.global_interpolation_points) / len(score.global_interpolation_points)
+
+def Percentile(values, percent):
+
+    values = sorted(values)
+
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+def main():
+
+    index_name      =   'index.bin'
+    stop_list_name  =   'stop_list.txt'
+    stemming        =   False
+    weighting_type  =   'tf.idf'
+    budgets         =   [0, 4000, 2000, 1000, 500, 250]
+    deadline        =   0
+    gold_name       =   'cacm_gold_std.txt'
+    depth           =   10
+
+    opts, args = getopt.getopt(sys.argv[1:], "hi:s:tw:b:T:g:n:")
+
+    for opt, arg in opts:
+
+        if opt == '-h':
+            print (__doc__.replace('<PROGNAME>', sys.argv[0], 1))
+            exit()
+
+        elif opt == '-i':
+            index_name = arg
+
+        elif opt == '-s':
+            stop_list_name = arg
+
+        elif opt == '-t':
+            stemming = True
+
+        elif opt == '-w':
+            weighting_type = arg
+
+        elif opt == '-b':
+            budgets = [int(budget) for budget in arg.split(',')]
+
+        elif opt == '-T':
+            deadline = float(arg)
+
+        elif opt == '-g':
+            gold_name = arg
+
+        elif opt == '-n':
+            depth = int(arg)
+
+    sys.argv = ['DRSystem.py', '-s', stop_list_name, '-w', weighting_type] + (['-t'] if stemming else [])
+    DRSystem.AnalyseCommandLine()
+    DRSystem.index_file_name = index_name
+    DRSystem.ReadStopWords(stop_list_name)
+
+    if stemming:
+        DRSystem.stem_cache.Load(index_name + '.stems')
+
+    DRSystem.LoadIndex()
+
+    impact_index = ReadImpactIndex(index_name)
+
+    if impact_index.weighting_type != weighting_type:
+
+        print ("\nThe impacts are computed for %s weighting : set it with -w option." % impact_index.weighting_type)
+        exit(1)
+
+    exact_rankings, latencies, posting_count = RankQuerySet(lambda token_list, qry_magnitude: ExactRanking(token_list, qry_magnitude, depth))
+    exact_documents = [set([doc_id for match_score, doc_id in ranking]) for ranking in exact_rankings]
+    query_count = len(exact_rankings)
+
+    print ('%-10s %12s %10s %10s %10s %10s %10s %10s' % ('budget', 'postings/q', 'p50 ms', 'p99 ms', 'overlap', 'precision', 'recall', 'int. prec'))
+
+    rows = [('exact', exact_rankings, latencies, posting_count)]
+    rows.append(('maxscore',) + RankQuerySet(lambda token_list, qry_magnitude: MaxScoreRanking(token_list, qry_magnitude, depth)))
+
+    for budget in budgets:
+
+        rankings, latencies, posting_count = RankQuerySet(lambda token_list, qry_magnitude: ImpactRanking(impact_index, token_list, qry_magnitude, depth, budget, deadline))
+        rows.append((str(budget) if budget > 0 else 'all', rankings, latencies, posting_count))
+
+    for name, rankings, latencies, posting_count in rows:
+
+        overlap = sum([len(exact_documents[qry_index] & set([doc_id for match_score, doc_id in rankings[qry_index]])) for qry_index in range(query_count)])
+        overlap /= max(1, sum([len(documents) for documents in exact_documents]))
+        precision, recall, interpolated = Evaluate(rankings, gold_name)
+
+        postings = '%12.1f' % (posting_count / query_count) if posting_count is not None else '%12s' % '-'
+
+        print ('%-10s %s %10.3f %10.3f %10.3f %10.3f %10.3f %10.3f' % (name, postings, 1000 * Percentile(latencies, 50), 1000 * Percentile(latencies, 99), overlap, precision, recall, interpolated))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""\
+--------------------------------------------------------------------------------
+    USE: python <PROGNAME> (options)
+    ACTION: Measures the size and the decoding throughput (postings per second)
+            of each postings codec of the binary index.
+    OPTIONS:
+        -h : print this help message
+        -d <filename> : name of the source document collection file.(default value is documents.txt)
+        -s <filename> : name of the stopwords list file.(default value is no stopword list)
+        -t : flag option to determine whether stemming is applied or not.
+        -n <count> : count of repetitions. The best time is reported.(default value is 3)
+--------------------------------------------------------------------------------
+"""
+
+import getopt, sys, time
+from read_documents import ReadDocuments
+from stem_cache import StemCache
+from tokenizer import Tokenizer
+from postings_codec import CODECS, EncodePostings, DecodePostings
+
+##########      Function that builds the postings lists of the collection as BuildInvertedIndex() does.        ##########
+
+def InvertedIndex(documents, tokenizer):
+
+    inv_tkn_idx = {}
+
+    for doc_index in range(len(documents)):
+
+        for token, frequency in tokenizer.TokenList(documents[doc_index]).items():
+
+            if token not in inv_tkn_idx:
+                inv_tkn_idx[token] = []
+
+            inv_tkn_idx[token].append((doc_index, frequency))
+
+    return inv_tkn_idx
+
+##########      Function that returns the best time of decoding all postings lists with a codec.        ##########
+
+def Measure(codec, encoded, repeat):
+
+    best_time   =   None
+    result      =   None
+
+    for i in range(repeat):
+
+        start = time.perf_counter()
+        result = [DecodePostings(codec, data, count) for data, count in encoded]
+        elapsed = time.perf_counter() - start
+
+        if best_time is None or elapsed < best_time:
+            best_time = elapsed
+
+    return best_time, result
+
+def main():
+
+    doc_file_name   =   'documents.txt'
+    stop_words      =   {}
+    stemming        =   False
+    repeat          =   3
+
+    opts, args = getopt.getopt(sys.argv[1:], "hd:s:tn:")
+
+    for opt, arg in opts:
+
+        if opt == '-h':
+            print (__doc__.replace('<PROGNAME>', sys.argv[0], 1))
+            exit()
+
+        elif opt == '-d':
+            doc_file_name = arg
+
+        elif opt == '-s':
+
+            with open(arg) as input_fs:
+                for word in input_fs:
+                    stop_words[word.split('\n')[0]] = 1
+
+        elif opt == '-t':
+            stemming = True
+
+        elif opt == '-n':
+            repeat = int(arg)
+
+    documents       =   [doc.text for doc in ReadDocuments(doc_file_name)]
+    tokenizer       =   Tokenizer(stop_words, StemCache().Stem if stemming else None)
+    inv_tkn_idx     =   InvertedIndex(documents, tokenizer)
+    postings        =   [inv_tkn_idx[token] for token in inv_tkn_idx]
+    posting_count   =   sum([len(token_postings) for token_postings in postings])
+
+    print ('terms       : %d' % len(postings))
+    print ('postings    : %d' % posting_count)
+    print ('%-8s %12s %12s %10s %16s' % ('codec', 'bytes', 'bits/post', 'decode s', 'postings/s'))
+
+    for codec in CODECS:
+
+        encoded = [(EncodePostings(codec, token_postings), len(token_postings)) for token_postings in postings]
+        size = sum([len(data) for data, count in encoded])
+        decode_time, decoded = Measure(codec, encoded, repeat)
+
+        if [list(token_postings) for token_postings in decoded] != [list(token_postings) for token_postings in postings]:
+            print ('ERROR: the %s codec does not decode the postings it encoded' % codec)
+            exit(1)
+
+        print ('%-8s %12d %12.2f %10.3f %16.0f' % (codec, size, 8.0 * size / posting_count, decode_time, posting_count / decode_time))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""\
+--------------------------------------------------------------------------------
+    USE: python <PROGNAME> (options)
+    ACTION: Benchmarks DRSystem on synthetic CACM-like collections. For each scale
+            and for stemming off and on, it measures the index build time, the
+            text index export and load time, and the peak memory. For each
+            weighting type, it measures the index load time, the query latency
+            percentiles, the query throughput and the peak memory. Each
+            measurement runs in its own process. Results are written in JSON.
+    OPTIONS:
+        -h : print this help message
+        -x <scales> : comma separated sizes of the collections as multiples of CACM, e.g. 1,10,100.(default value is 1)
+        -w <weight_types> : comma separated weighting types.(default value is binary,frequency,tf.idf)
+        -k <count> : count of documents retrieved per query.(default value is 0, exhaustive ranking)
+        -n <count> : count of times the query set is ranked.(default value is 3)
+        -D <directory> : directory of the generated collections and indexes.(default value is bench_data)
+        -o <filename> : name of the JSON result file.(default value is bench_results.json)
+        -c <filename> : name of a JSON baseline file. Results are compared with it and regressions are reported.
+        -R <filename> : name of a JSON result file that is compared with the baseline instead of running the benchmark.
+        -l <percent> : slowdown or memory growth over the baseline that is reported as a regression.(default value is 10)
+--------------------------------------------------------------------------------
+"""
+
+import getopt, sys, os, json, time, platform, subprocess
+
+try:
+    import resource
+except ImportError:                                     ###     resource is only available on Unix. Peak memory is then not measured.
+    resource = None
+
+WEIGHTING_TYPES =   ('binary', 'frequency', 'tf.idf')
+NOISE_FLOOR_MS  =   1.0                                 ###     Time differences smaller than this are timer noise and never reported as regressions.
+
+###     Metrics that are compared with the baseline. True means that a larger value is better.
+
+METRICS         =   {
+                        'build_s': False,
+                        'text_export_s': False,
+                        'text_load_s': False,
+                        'load_s': False,
+                        'latency_p50_ms': False,
+                        'latency_p90_ms': False,
+                        'latency_p99_ms': False,
+                        'throughput_qps': True,
+                        'peak_rss_kb': False,
+                    }
+
+##########      Functions that are run in a measuring process.        ##########
+
+def PeakMemory():
+
+    if resource is None:
+        return None
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+### Input   :   values: list of numbers
+###             percent: percentile between 0 and 100
+### Output  :   nearest-rank percentile of the values
+def Percentile(values, percent):
+
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+
+    return values[int(rank) - 1]
+
+### Input   :   task: dictionary of the measurement (task, paths of the collection and index files, stemming, weighting type, ...)
+### Output  :   dictionary of the measured metrics
+def RunTask(task):
+
+    import DRSystem
+    from read_documents import ReadIndexFile
+
+    argv = ['DRSystem.py', '-d', task['documents'], '-q', task['queries'], '-s', task['stop_list'], '-w', task['weighting']]
+
+    if task['stemming']:
+        argv.append('-t')
+
+    if task['task'] == 'build':
+        argv.extend(['-i', task['index']])
+
+    sys.argv = argv
+    DRSystem.AnalyseCommandLine()
+    DRSystem.index_file_name = task['index']
+    DRSystem.ReadStopWords(DRSystem.stop_list_name)
+
+    result = {}
+
+    if task['task'] == 'build':
+
+        start = time.perf_counter()
+        DRSystem.BuildIndex()
+        result['build_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        DRSystem.WriteIndexFile(task['index'] + '.txt')
+        result['text_export_s'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ReadIndexFile(task['index'] + '.txt').Load()
+        result['text_load_s'] = time.perf_counter() - start
+
+        result['document_count'] = DRSystem.document_count
+        result['term_count'] = len(DRSystem.colct_tkn_idx)
+
+    else:
+
+        start = time.perf_counter()
+        DRSystem.LoadIndex()
+        result['load_s'] = time.perf_counter() - start
+
+        latencies = []
+
+        for i in range(task['repeat']):
+
+            for token_list in DRSystem.qry_tkn_idx:
+
+                start = time.perf_counter()
+                DRSystem.RankQuery(token_list, DRSystem.QueryMagnitude(token_list), task['top_k'])
+                latencies.append(time.perf_counter() - start)
+
+        result['query_count'] = len(latencies)
+        result['latency_p50_ms'] = 1000 * Percentile(latencies, 50)
+        result['latency_p90_ms'] = 1000 * Percentile(latencies, 90)
+        result['latency_p99_ms'] = 1000 * Percentile(latencies, 99)
+        result['throughput_qps'] = len(latencies) / sum(latencies)
+
+    result['peak_rss_kb'] = PeakMemory()
+
+    return result
+
+##########      Function that is used to run a measurement in a new process.        ##########
+
+def Measure(task):
+
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '-W', json.dumps(task)], stdout = subprocess.PIPE, check = True, universal_newlines = True).stdout
+    result = dict(task)
+    result.update(json.loads(output.strip().split('\n')[-1]))
+
+    return result
+
+##########      Function that is used to run the benchmark suite.        ##########
+
+def RunSuite(scales, weighting_types, top_k, repeat, directory):
+
+    from synthetic_corpus import GenerateCorpus
+
+    source      =   os.path.dirname(os.path.abspath(__file__))
+    results     =   []
+
+    for scale in scales:
+
+        corpus = os.path.join(directory, 'x%g' % scale)
+
+        if not os.path.exists(os.path.join(corpus, 'documents.txt')):           ###     Generated collections are kept and reused by later runs.
+
+            print ('Generating the x%g collection' % scale, file = sys.stderr)
+            GenerateCorpus(os.path.join(source, 'documents.txt'), os.path.join(source, 'queries.txt'), scale, corpus)
+
+        for stemming in (False, True):
+
+            base = {
+                'scale': scale,
+                'stemming': stemming,
+                'documents': os.path.join(corpus, 'documents.txt'),
+                'queries': os.path.join(corpus, 'queries.txt'),
+                'stop_list': os.path.join(source, 'stop_list.txt'),
+                'index': os.path.join(corpus, 'index-t.bin' if stemming else 'index.bin'),
+                'weighting': 'tf.idf',
+            }
+
+            print ('Building x%g stemming=%s' % (scale, stemming), file = sys.stderr)
+            results.append(Measure(dict(base, task = 'build')))
+
+            for weighting_type in weighting_types:
+
+                print ('Querying x%g stemming=%s %s' % (scale, stemming, weighting_type), file = sys.stderr)
+                results.append(Measure(dict(base, task = 'query', weighting = weighting_type, top_k = top_k, repeat = repeat)))
+
+    return results
+
+##########      Function that is used to compare results with a baseline.        ##########
+
+### Input   :   baseline: list of results of the baseline
+###             results: list of results to compare
+###             limit: ratio over which a worse value is reported as a regression
+### Output  :   count of regressions
+def Compare(baseline, results, limit):
+
+    def Key(result):
+        return (result['task'], result['scale'], result['stemming'], result['weighting'] if result['task'] == 'query' else '', result.get('top_k', 0))
+
+    baseline_results = dict([(Key(result), result) for result in baseline])
+    regressions = 0
+
+    print ('%-40s %-16s %14s %14s %9s' % ('measurement', 'metric', 'baseline', 'current', 'change'))
+
+    for result in results:
+
+        key = Key(result)
+
+        if key not in baseline_results:
+            continue
+
+        name = '%s x%g stemming=%s %s' % (key[0], key[1], key[2], key[3])
+
+        for metric in METRICS:
+
+            old, new = baseline_results[key].get(metric), result.get(metric)
+
+            if old is None or new is None or old == 0:
+                continue
+
+            change = new / old - 1
+            worse = -change if METRICS[metric] else change
+            flag = ''
+
+            if metric[-2:] == '_s':
+                difference_ms = 1000 * abs(new - old)
+
+            elif metric[-3:] == '_ms':
+                difference_ms = abs(new - old)
+
+            else:
+                difference_ms = None
+
+            if worse > limit and (difference_ms is None or difference_ms >= NOISE_FLOOR_MS):
+
+                flag = '  REGRESSION'
+                regressions += 1
+
+            print ('%-40s %-16s %14.4f %14.4f %+8.1f%%%s' % (name, metric, old, new, 100 * change, flag))
+
+    return regressions
+
+def main():
+
+    scales          =   [1]
+    weighting_types =   list(WEIGHTING_TYPES)
+    top_k           =   0
+    repeat          =   3
+    directory       =   'bench_data'
+    output_name     =   'bench_results.json'
+    baseline_name   =   ''
+    results_name    =   ''
+    limit           =   0.10
+
+    opts, args = getopt.getopt(sys.argv[1:], "hx:w:k:n:D:o:c:R:l:W:")
+
+    for opt, arg in opts:
+
+        if opt == '-h':
+            print (__doc__.replace('<PROGNAME>', sys.argv[0], 1))
+            exit()
+
+        elif opt == '-W':                               ###     Internal option of the measuring processes.
+            print (json.dumps(RunTask(json.loads(arg))))
+            return
+
+        elif opt == '-x':
+            scales = [float(scale) for scale in arg.split(',')]
+
+        elif opt == '-w':
+
+            weighting_types = arg.split(',')
+
+            for weighting_type in weighting_types:
+
+                if weighting_type not in WEIGHTING_TYPES:
+
+                    print ("\nNo such weighting type : Only \"binary\", \"frequency\", \"tf.idf\" are required.")
+                    exit(1)
+
+        elif opt == '-k':
+            top_k = int(arg)
+
+        elif opt == '-n':
+            repeat = int(arg)
+
+        elif opt == '-D':
+            directory = arg
+
+        elif opt == '-o':
+            output_name = arg
+
+        elif opt == '-c':
+            baseline_name = arg
+
+        elif opt == '-R':
+            results_name = arg
+
+        elif opt == '-l':
+            limit = float(arg) / 100
+
+    if results_name != '':
+
+        if baseline_name == '':
+
+            print ("\n-R option needs a baseline file : set it with -c option.")
+            exit(1)
+
+        with open(results_name) as input_fs:
+            results = json.load(input_fs)['results']
+
+    else:
+
+        results = RunSuite(scales, weighting_types, top_k, repeat, directory)
+
+        with open(output_name, 'w') as f:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent = 1)
+
+        print ('Results are written in', output_name, file = sys.stderr)
+
+    if baseline_name != '':
+
+        with open(baseline_name) as input_fs:
+            baseline = json.load(input_fs)['results']
+
+        regressions = Compare(baseline, results, limit)
+
+        print ('Regressions : %d' % regressions)
+
+        if regressions > 0:
+            exit(1)
+
+if __name__ == "__main__":
+    main()
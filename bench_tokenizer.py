@@ -0,0 +1,126 @@
+"""\
+--------------------------------------------------------------------------------
+    USE: python <PROGNAME> (options)
+    ACTION: Measures the tokenizing throughput (tokens per second) of the shared
+            Tokenizer against the previous line-by-line tokenizing code.
+    OPTIONS:
+        -h : print this help message
+        -d <filename> : name of the source document collection file.(default value is documents.txt)
+        -s <filename> : name of the stopwords list file.(default value is no stopword list)
+        -t : flag option to determine whether stemming is applied or not.
+        -n <count> : count of repetitions. The best time is reported.(default value is 3)
+--------------------------------------------------------------------------------
+"""
+
+import getopt, sys, re, time
+from read_documents import ReadDocuments
+from stem_cache import StemCache
+from tokenizer import Tokenizer, SEPARATORS
+
+##########      Function that tokenizes a document in the way Tokenize() did before the Tokenizer.        ##########
+
+def LegacyTokenList(lines, stop_words, stemmer):
+
+    token_list = {}
+
+    for line in lines:
+
+        tokens = re.split(SEPARATORS.pattern, line)              ###     The pattern string is looked up in the re cache for every line as before.
+
+        for token in tokens:
+
+            if (token != None) and (token != ''):
+
+                token = token.lower()
+
+                if stemmer is not None:
+                    token = stemmer.stem(token)
+
+                if token not in stop_words:
+
+                    if token not in token_list:
+                        token_list[token] = 1
+
+                    elif token in token_list:
+                        token_list[token] = token_list[token] + 1
+
+    return token_list
+
+##########      Function that returns the best time of a tokenizing function over the collection.        ##########
+
+def Measure(documents, tokenize, repeat):
+
+    best_time   =   None
+    result      =   None
+
+    for i in range(repeat):
+
+        start = time.perf_counter()
+        result = [tokenize(lines) for lines in documents]
+        elapsed = time.perf_counter() - start
+
+        if best_time is None or elapsed < best_time:
+            best_time = elapsed
+
+    return best_time, result
+
+def main():
+
+    doc_file_name   =   'documents.txt'
+    stop_words      =   {}
+    stemming        =   False
+    repeat          =   3
+
+    opts, args = getopt.getopt(sys.argv[1:], "hd:s:tn:")
+
+    for opt, arg in opts:
+
+        if opt == '-h':
+            print (__doc__.replace('<PROGNAME>', sys.argv[0], 1))
+            exit()
+
+        elif opt == '-d':
+            doc_file_name = arg
+
+        elif opt == '-s':
+
+            with open(arg) as input_fs:
+                for word in input_fs:
+                    stop_words[word.split('\n')[0]] = 1
+
+        elif opt == '-t':
+            stemming = True
+
+        elif opt == '-n':
+            repeat = int(arg)
+
+    documents   =   [doc.lines for doc in ReadDocuments(doc_file_name)]
+    stem_cache  =   StemCache()
+    stemmer     =   None
+
+    if stemming:
+        from nltk.stem import PorterStemmer
+        stemmer = PorterStemmer()
+
+    tokenizer   =   Tokenizer(stop_words, stem_cache.Stem if stemming else None)
+    token_count =   sum(len(tokenizer.Split(''.join(lines))) for lines in documents)
+
+    if stemming:                                        ###     The stem cache is filled first, as an indexing run with a saved stem cache would find it.
+        for lines in documents:
+            tokenizer.TokenList(''.join(lines))
+
+    legacy_time, legacy_result  =   Measure(documents, lambda lines: LegacyTokenList(lines, stop_words, stemmer), repeat)
+    bulk_time, bulk_result      =   Measure(documents, lambda lines: tokenizer.TokenList(''.join(lines)), repeat)
+
+    if legacy_result != bulk_result:
+        print ('ERROR: the tokenizers produce different terms')
+        exit(1)
+
+    print ('documents   : %d' % len(documents))
+    print ('tokens      : %d' % token_count)
+    print ('legacy      : %.3f s  %12.0f tokens/s' % (legacy_time, token_count / legacy_time))
+    print ('tokenizer   : %.3f s  %12.0f tokens/s' % (bulk_time, token_count / bulk_time))
+    print ('speedup     : %.2fx' % (legacy_time / bulk_time))
+
+if __name__ == "__main__":
+    main()
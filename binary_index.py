@@ -0,0 +1,350 @@
+import mmap, struct, sys
+from array import array
+from postings_codec import CODECS, DEFAULT_CODEC, EncodePostings, DecodePostings, StreamPostings
+
+##########      Layout of the binary index file (all integers are little-endian).        ##########
+###
+###     header      :   magic, version, postings codec, document count, term count, query count, offsets of the sections below
+###     terms       :   one fixed size record per term sorted by term, so that a term is found by binary search
+###     strings     :   utf-8 bytes of the terms and of the query tokens
+###     postings    :   postings list of each term in document order, encoded with the postings codec (see postings_codec.py)
+###     documents   :   one (offset, count) record per document followed by (term id, term frequency) pairs
+###     queries     :   one (offset, count) record per query followed by (string offset, string length, frequency) triples
+###     idf         :   squared idf weight of each term as a double, in term id order
+###     norms       :   magnitude of each document vector as a double, for each weighting type in WEIGHTING_TYPES order
+###     weights     :   (optional) final weight of each posting as a double, in postings order
+
+MAGIC           =   b'DRSINDEX'
+VERSION         =   3
+WEIGHTING_TYPES =   ('binary', 'frequency', 'tf.idf')
+
+HEADER          =   struct.Struct('<8sIIIIIQQQQQQQQ')
+TERM            =   struct.Struct('<IIIQII')        ###     string offset, string length, document frequency, postings offset, postings count, index of the first posting
+VECTOR          =   struct.Struct('<QI')            ###     entries offset, entry count
+DOC_ENTRY       =   struct.Struct('<II')            ###     term id, term frequency
+QRY_ENTRY       =   struct.Struct('<III')           ###     string offset, string length, term frequency
+
+##########      Function that is used to check whether a file is a binary index file.        ##########
+
+def IsBinaryIndexFile(path):
+
+    with open(path, 'rb') as input_fs:
+        return input_fs.read(len(MAGIC)) == MAGIC
+
+##########      Function that is used to write the binary index file.        ##########
+
+### Input   :   path: filename(including or not path) of the index file
+###             document_count: count of documents contained in the collection
+###             colct_tkn_idx: dictionary of document frequency of each term
+###             doc_tkn_idx: list of term frequency dictionary of each document
+###             qry_tkn_idx: list of term frequency dictionary of each query
+###             inv_tkn_idx: dictionary of postings list of each term
+###             idf_weights: dictionary of squared idf weight of each term
+###             doc_norms: dictionary of list of document magnitudes of each weighting type
+###             posting_weights: dictionary of list of weights of the postings of each term (None means that posting weights are not stored)
+###             codec: name of the codec of the postings lists
+def WriteBinaryIndexFile(path, document_count, colct_tkn_idx, doc_tkn_idx, qry_tkn_idx, inv_tkn_idx, idf_weights, doc_norms, posting_weights = None, codec = DEFAULT_CODEC):
+
+    terms       =   sorted(colct_tkn_idx, key = lambda token: token.encode('utf-8'))
+    term_ids    =   {}
+
+    strings     =   bytearray()
+    string_ids  =   {}                                  ###     Offset and length of each string already stored in the string section.
+
+    def AddString(token):
+
+        if token not in string_ids:
+
+            encoded = token.encode('utf-8')
+            string_ids[token] = (len(strings), len(encoded))
+            strings.extend(encoded)
+
+        return string_ids[token]
+
+    term_table  =   bytearray()
+    postings    =   bytearray()
+    idf         =   array('d')
+    weights     =   array('d')
+    posting_count = 0
+
+    for token in terms:
+
+        term_ids[token] = len(term_ids)
+        offset, length = AddString(token)
+        token_postings = inv_tkn_idx.get(token, [])
+
+        term_table.extend(TERM.pack(offset, length, colct_tkn_idx[token], len(postings), len(token_postings), posting_count))
+        idf.append(idf_weights[token])
+
+        postings.extend(EncodePostings(codec, token_postings))
+        posting_count += len(token_postings)
+
+        if posting_weights is not None:
+            weights.extend(posting_weights[token])
+
+    norms       =   array('d')
+
+    for weighting_type in WEIGHTING_TYPES:
+        norms.extend(doc_norms[weighting_type])
+
+    ###     Document vectors keep the original token order, so document magnitudes are summed exactly as before.
+
+    documents   =   bytearray()
+    entries     =   bytearray()
+    entry_base  =   VECTOR.size * len(doc_tkn_idx)
+
+    for token_list in doc_tkn_idx:
+
+        documents.extend(VECTOR.pack(entry_base + len(entries), len(token_list)))
+
+        for token, frequency in token_list.items():
+            entries.extend(DOC_ENTRY.pack(term_ids[token], frequency))
+
+    documents.extend(entries)
+
+    queries     =   bytearray()
+    entries     =   bytearray()
+    entry_base  =   VECTOR.size * len(qry_tkn_idx)
+
+    for token_list in qry_tkn_idx:
+
+        queries.extend(VECTOR.pack(entry_base + len(entries), len(token_list)))
+
+        for token, frequency in token_list.items():
+
+            offset, length = AddString(token)
+            entries.extend(QRY_ENTRY.pack(offset, length, frequency))
+
+    queries.extend(entries)
+
+    terms_offset        =   HEADER.size
+    strings_offset      =   terms_offset + len(term_table)
+    postings_offset     =   strings_offset + len(strings)
+    documents_offset    =   postings_offset + len(postings)
+    queries_offset      =   documents_offset + len(documents)
+    idf_offset          =   queries_offset + len(queries)
+    norms_offset        =   idf_offset + idf.itemsize * len(idf)
+    weights_offset      =   norms_offset + norms.itemsize * len(norms) if posting_weights is not None else 0
+
+    if sys.byteorder != 'little':                       ###     Doubles are always stored in little-endian order.
+
+        idf.byteswap()
+        norms.byteswap()
+        weights.byteswap()
+
+    with open(path, 'wb') as f:
+
+        f.write(HEADER.pack(MAGIC, VERSION, CODECS.index(codec), document_count, len(terms), len(qry_tkn_idx), terms_offset, strings_offset, postings_offset, documents_offset, queries_offset, idf_offset, norms_offset, weights_offset))
+        f.write(term_table)
+        f.write(strings)
+        f.write(postings)
+        f.write(documents)
+        f.write(queries)
+        f.write(idf.tobytes())
+        f.write(norms.tobytes())
+        f.write(weights.tobytes())
+
+##########      Class that is used to read the binary index file through mmap.        ##########
+
+### Sections are decoded only when they are accessed, so opening the index does not parse the whole file.
+class ReadBinaryIndexFile:
+    def __init__(self, file):
+        self.collection_file = file
+        self.input_fs = open(file, 'rb')
+        self.buffer = mmap.mmap(self.input_fs.fileno(), 0, access = mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self.buffer, 0)
+        if header[0] != MAGIC:
+            raise Exception('ERROR: not a binary index file:<%s>' % file)
+        if header[1] != VERSION:
+            raise Exception('ERROR: unsupported binary index version %d:<%s>' % (header[1], file))
+        self.codec = CODECS[header[2]]
+        (self.document_count, self.term_count, self.query_count, self.terms_offset, self.strings_offset, self.postings_offset,
+            self.documents_offset, self.queries_offset, self.idf_offset, self.norms_offset, self.weights_offset) = header[3:]
+        self.term_ids = {}
+
+    def Load(self, sections = None):
+        pass                                            ###     Sections of the binary index are mapped, so nothing has to be loaded in advance.
+
+    def Close(self):
+        self.buffer.close()
+        self.input_fs.close()
+
+    def String(self, offset, length):
+        start = self.strings_offset + offset
+        return self.buffer[start:start + length].decode('utf-8')
+
+    def Term(self, term_id):
+        return TERM.unpack_from(self.buffer, self.terms_offset + term_id * TERM.size)
+
+    def TermString(self, term_id):
+        offset, length = self.Term(term_id)[:2]
+        return self.String(offset, length)
+
+    def FindTerm(self, token):
+        if token in self.term_ids:
+            return self.term_ids[token]
+        encoded = token.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length = self.Term(middle)[:2]
+            start = self.strings_offset + offset
+            probe = self.buffer[start:start + length]
+            if probe < encoded:
+                low = middle + 1
+            elif probe > encoded:
+                high = middle
+            else:
+                self.term_ids[token] = middle
+                return middle
+        return -1                                       ###     Misses are not cached, so words of queries that are not terms do not fill the cache.
+
+    def PostingsData(self, term_id):
+        offset, count = self.Term(term_id)[3:5]
+        if term_id + 1 < self.term_count:
+            end = self.Term(term_id + 1)[3]
+        else:
+            end = self.documents_offset - self.postings_offset
+        return self.buffer[self.postings_offset + offset:self.postings_offset + end], count
+
+    def Postings(self, term_id):
+        return DecodePostings(self.codec, *self.PostingsData(term_id))
+
+    def StreamPostings(self, term_id):
+        return StreamPostings(self.codec, *self.PostingsData(term_id))
+
+    def Doubles(self, offset, count):
+        values = array('d')
+        values.frombytes(self.buffer[offset:offset + count * values.itemsize])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values
+
+    def IdfWeight(self, term_id):
+        return struct.unpack_from('<d', self.buffer, self.idf_offset + term_id * 8)[0]
+
+    def PostingWeights(self, term_id):
+        count, first = self.Term(term_id)[4:]
+        return self.Doubles(self.weights_offset + first * 8, count)
+
+    def Vector(self, section_offset, index, entry):
+        offset, count = VECTOR.unpack_from(self.buffer, section_offset + index * VECTOR.size)
+        start = section_offset + offset
+        return entry.iter_unpack(self.buffer[start:start + count * entry.size])
+
+    def ReadDocumentCount(self):
+        return self.document_count
+
+    def ReadCollectionIndex(self):
+        return BinaryCollectionIndex(self)
+
+    def ReadInvertedIndex(self):
+        return BinaryInvertedIndex(self)
+
+    def ReadDocumentIndex(self):
+        return BinaryDocumentIndex(self)
+
+    def ReadIdfWeights(self):
+        return BinaryIdfWeights(self)
+
+    def ReadDocumentNorms(self):
+        return BinaryDocumentNorms(self)
+
+    def ReadPostingWeights(self):
+        if self.weights_offset == 0:
+            return {}                                   ###     Posting weights are not stored, so they are calculated on demand.
+        return BinaryPostingWeights(self)
+
+    def ReadQueryIndex(self):
+        index = []
+        for query_index in range(self.query_count):
+            doc_index = {}
+            for offset, length, frequency in self.Vector(self.queries_offset, query_index, QRY_ENTRY):
+                doc_index[self.String(offset, length)] = frequency
+            index.append(doc_index)
+        return index
+
+##########      Read-only views of the binary index that behave like the in-memory index structures.        ##########
+
+class BinaryCollectionIndex:
+    def __init__(self, index):
+        self.index = index
+
+    def __contains__(self, token):
+        return self.index.FindTerm(token) >= 0
+
+    def __getitem__(self, token):
+        term_id = self.index.FindTerm(token)
+        if term_id < 0:
+            raise KeyError(token)
+        return self.index.Term(term_id)[2]
+
+    def get(self, token, default = None):
+        return self[token] if token in self else default
+
+    def __len__(self):
+        return self.index.term_count
+
+    def __iter__(self):
+        for term_id in range(self.index.term_count):
+            yield self.index.TermString(term_id)
+
+class BinaryInvertedIndex(BinaryCollectionIndex):
+    def __getitem__(self, token):
+        term_id = self.index.FindTerm(token)
+        if term_id < 0:
+            raise KeyError(token)
+        return self.index.Postings(term_id)
+
+    def Stream(self, token):                            ###     Postings are decoded as they are read, and the list is not held.
+        term_id = self.index.FindTerm(token)
+        if term_id < 0:
+            raise KeyError(token)
+        return self.index.StreamPostings(term_id)
+
+class BinaryIdfWeights(BinaryCollectionIndex):
+    def __getitem__(self, token):
+        term_id = self.index.FindTerm(token)
+        if term_id < 0:
+            raise KeyError(token)
+        return self.index.IdfWeight(term_id)
+
+class BinaryPostingWeights(BinaryCollectionIndex):
+    def __getitem__(self, token):
+        term_id = self.index.FindTerm(token)
+        if term_id < 0:
+            raise KeyError(token)
+        return self.index.PostingWeights(term_id)
+
+class BinaryDocumentNorms:
+    def __init__(self, index):
+        self.index = index
+        self.norms = {}
+
+    def __getitem__(self, weighting_type):
+        if weighting_type not in self.norms:
+            position = WEIGHTING_TYPES.index(weighting_type)
+            self.norms[weighting_type] = self.index.Doubles(self.index.norms_offset + position * self.index.document_count * 8, self.index.document_count)
+        return self.norms[weighting_type]
+
+class BinaryDocumentIndex:
+    def __init__(self, index):
+        self.index = index
+        self.term_strings = {}
+
+    def __len__(self):
+        return self.index.document_count
+
+    def __getitem__(self, doc_index):
+        if doc_index < 0 or doc_index >= self.index.document_count:
+            raise IndexError(doc_index)
+        doc_index_terms = {}
+        for term_id, frequency in self.index.Vector(self.index.documents_offset, doc_index, DOC_ENTRY):
+            if term_id not in self.term_strings:
+                self.term_strings[term_id] = self.index.TermString(term_id)
+            doc_index_terms[self.term_strings[term_id]] = frequency
+        return doc_index_terms
+
+    def __iter__(self):
+        for doc_index in range(self.index.document_count):
+            yield self[doc_index]
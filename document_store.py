@@ -0,0 +1,168 @@
+import os, mmap, struct
+from read_documents import DecodeText
+
+##########      Layout of the document store file (all integers are little-endian).        ##########
+###
+###     The document store records where the text of each document of the index is in its collection file, so that a document is
+###     read with one seek instead of a scan of the collection. It is written next to the index, in <index>.docs:
+###
+###     header      :   magic, version, document count, length of the file list
+###     files       :   utf-8 lines "generation path" of each collection file, in the order the documents were indexed.
+###                     A directory is recorded as its files. Paths are relative to the directory of the index, so that the index and
+###                     its collection can be moved together.
+###     documents   :   one (file number, docid, byte offset, byte length) record per document, in document index order
+###
+###     The text of a document is the lines between its <document> and </document> lines, as ReadDocuments yields them. The records are
+###     taken from the documents while they are tokenized, so the collection is not read again to write the store.
+###     The generation of a collection file changes whenever it is rewritten, so a store of an older collection is never used.
+
+MAGIC           =   b'DRSDOCST'
+VERSION         =   1
+
+HEADER          =   struct.Struct('<8sIII')
+RECORD          =   struct.Struct('<IIQI')          ###     file number, docid, byte offset, byte length
+
+NO_OFFSET       =   (1 << 64) - 1                   ###     Offset of the documents of a compressed file, which are not read from the store.
+
+TITLE_LENGTH    =   80                              ###     Count of characters of a title that are shown.
+SNIPPET_WORDS   =   24                              ###     Count of words of a snippet.
+
+def DocumentStorePath(index_path):
+    return index_path + '.docs'
+
+def IsDocumentStore(index_path):
+    return os.path.exists(DocumentStorePath(index_path))
+
+def IndexDirectory(index_path):
+    return os.path.dirname(os.path.abspath(index_path))
+
+def FileGeneration(path):
+    status = os.stat(path)
+    return '%d:%d' % (status.st_mtime_ns, status.st_size)
+
+##########      Class that is used to write the document store of an index.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+###             store: ReadDocumentStore whose documents are kept before the added ones (None means that a new store is written)
+### Documents are added in document index order. A compressed file has no byte offsets to read its documents from, so its documents
+### are recorded with NO_OFFSET.
+class DocumentStoreWriter:
+    def __init__(self, index_path, store = None):
+        self.index_path = index_path
+        self.files = []
+        self.numbers = {}
+        self.records = bytearray()
+        self.count = 0
+        if store is not None:                       ###     Records of the store are copied as they are, and only the added documents are new.
+            for path in store.files:
+                self.File(path)
+            self.records.extend(store.records)
+            self.count = len(store)
+
+    ### Output  :   file number of the collection file
+    def File(self, path):
+        if path not in self.numbers:
+            self.numbers[path] = len(self.files)
+            self.files.append('%s %s' % (FileGeneration(path), os.path.relpath(os.path.abspath(path), IndexDirectory(self.index_path))))
+        return self.numbers[path]
+
+    ### Input   :   document: Document yielded by ReadDocuments
+    def Add(self, document):
+        offset = document.offset if document.offset is not None else NO_OFFSET
+        self.records.extend(RECORD.pack(self.File(document.path), document.docid, offset, document.length))
+        self.count += 1
+
+    def Write(self):
+        file_list = '\n'.join(self.files).encode('utf-8')
+        with open(DocumentStorePath(self.index_path), 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.count, len(file_list)))
+            f.write(file_list)
+            f.write(self.records)
+
+##########      Class that is used to read documents through the document store.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+### Collection files are mapped when a document of them is first read.
+class ReadDocumentStore:
+    def __init__(self, index_path):
+        path = DocumentStorePath(index_path)
+        with open(path, 'rb') as input_fs:
+            data = input_fs.read()
+        magic, version, self.document_count, file_list_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise Exception('ERROR: not a document store file:<%s>' % path)
+        if version != VERSION:
+            raise Exception('ERROR: unsupported document store version %d:<%s>' % (version, path))
+        self.files = []
+        for line in data[HEADER.size:HEADER.size + file_list_length].decode('utf-8').split('\n'):
+            generation, collection_path = line.split(' ', 1)
+            collection_path = os.path.normpath(os.path.join(IndexDirectory(index_path), collection_path))
+            if not os.path.exists(collection_path) or FileGeneration(collection_path) != generation:
+                raise Exception('ERROR: the collection has changed since it was indexed, rebuild the index with -i option:<%s>' % collection_path)
+            self.files.append(collection_path)
+        self.records = data[HEADER.size + file_list_length:]
+        self.buffers = {}
+
+    def __len__(self):
+        return self.document_count
+
+    def Close(self):
+        for input_fs, buffer in self.buffers.values():
+            buffer.close()
+            input_fs.close()
+        self.buffers = {}
+
+    ### Output  :   (docid, text) of the document, or None if the document is not in the store
+    def Document(self, doc_index):
+        if doc_index < 0 or doc_index >= self.document_count:
+            return None
+        file_number, docid, offset, length = RECORD.unpack_from(self.records, doc_index * RECORD.size)
+        if offset == NO_OFFSET:
+            return None
+        if file_number not in self.buffers:
+            input_fs = open(self.files[file_number], 'rb')
+            self.buffers[file_number] = (input_fs, mmap.mmap(input_fs.fileno(), 0, access = mmap.ACCESS_READ))
+        buffer = self.buffers[file_number][1]
+        return docid, DecodeText(buffer[offset:offset + length])
+
+##########      Functions that are used to show a document in a result list.        ##########
+
+### Output  :   first non-empty line of the text
+def Title(text):
+
+    for line in text.split('\n'):
+
+        line = ' '.join(line.split())
+
+        if line:
+            return line if len(line) <= TITLE_LENGTH else line[:TITLE_LENGTH - 3] + '...'
+
+    return ''
+
+### Input   :   text: text of a document
+###             is_match: function that tells whether a word of the text is a query term
+### Output  :   the SNIPPET_WORDS words of the text that contain the most query terms, with the query terms marked as *word*
+def Snippet(text, is_match):
+
+    words = text.split()
+
+    if len(words) == 0:
+        return ''
+
+    matches = [1 if is_match(word) else 0 for word in words]
+    width = min(SNIPPET_WORDS, len(words))
+    best_start = 0
+    best_count = count = sum(matches[:width])
+
+    for start in range(1, len(words) - width + 1):          ###     Window slides one word at a time, so its count is updated in constant time.
+
+        count += matches[start + width - 1] - matches[start - 1]
+
+        if count > best_count:
+
+            best_start = start
+            best_count = count
+
+    snippet = ' '.join(['*%s*' % words[i] if matches[i] else words[i] for i in range(best_start, best_start + width)])
+
+    return ('... ' if best_start > 0 else '') + snippet + (' ...' if best_start + width < len(words) else '')
@@ -1,16 +1,25 @@
 """\
 --------------------------------------------------------------------------------
     USE: python <PROGNAME> (options) keyfile response
+         python <PROGNAME> -b (options) keyfile response1 response2 ...
     ACTION: computes IR system performance measures, given input files:
         * 'keyfile' - a "gold standard" indicating the documents that 
                       are relevant to each query, and 
         * 'response' - the documents retrieved for each query by the system.
+        In batch mode (-b), the keyfile is read once, many response files (or
+        directories of response files) are evaluated, and one table is printed
+        with a row per response file: precision, recall, F-measure, MAP,
+        R-precision, P@k, nDCG, nDCG@k and the interpolated precision averaged
+        over the recall points. Batch mode requires numpy.
     OPTIONS:
         -h : print this help message
         -n INT : only consider the first INT responses for each query
         -i INT : use INT recall points for interpolated precision (def=10)
         -q : print scores for each individual question (not just global averages)
         -f : print summary scores in \"flat\" mode (i.e. as numbers on single line)
+        -b : batch mode, evaluate every response file given after the keyfile
+        -j INT : evaluate the response files in INT worker processes (def=1, batch mode)
+        -k LIST : comma separated cutoffs of P@k and nDCG@k (def=5,10, batch mode)
     DATAFORMAT:
         In both input files, each line specifies two integers, in the manner:
          QID  DOCID
@@ -24,18 +33,42 @@
 --------------------------------------------------------------------------------
 """
 
-import sys, re
-import getopt
+import sys, re, os, copy
+import getopt, multiprocessing
+
+try:
+    import numpy
+except ImportError:                 # numpy is optional. It is only needed by the batch mode.
+    numpy = None
 
 class CommandLine:
     def __init__(self):
-        opts, args = getopt.getopt(sys.argv[1:],'hi:n:qf')
+        opts, args = getopt.getopt(sys.argv[1:],'hi:n:qfbj:k:')
         opts = dict(opts)
 
         if '-h' in opts:
             self.printHelp()
 
-        if len(args) == 2:
+        self.batch = '-b' in opts
+        self.workers = int(opts['-j']) if '-j' in opts else 1
+        self.cutoffs = [int(k) for k in opts['-k'].split(',')] if '-k' in opts else [5, 10]
+
+        if self.batch:
+            if len(args) < 2:
+                print ('\n*** ERROR: must specify a key file and at least 1 response file ***')
+                self.printHelp()
+            if numpy is None:
+                print ('\n*** ERROR: batch mode requires numpy ***')
+                exit(1)
+            self.keyfile = args[0]
+            self.responsefiles = []
+            for path in args[1:]:
+                # a directory stands for all the files in it
+                if os.path.isdir(path):
+                    self.responsefiles.extend([os.path.join(path, name) for name in sorted(os.listdir(path)) if os.path.isfile(os.path.join(path, name))])
+                else:
+                    self.responsefiles.append(path)
+        elif len(args) == 2:
             self.keyfile = args[0]
             self.responsefile = args[1]
         else:
@@ -103,20 +136,15 @@ class Key:
         return set(self.relevant.keys())
      
 class Response:
-    def __init__(self,config,key):
+    # pairs: (qid, docid) of each response in rank order, e.g. from rankings
+    # kept in memory. By default they are read from config.responsefile.
+    def __init__(self,config,key,pairs=None):
         seen = {}
         self.retrieved = {}
         self.rel_ranks = {}
-        skip = re.compile('^\s*($|#)')
-        response = open(config.responsefile,'r')
-        for line in response:
-            if skip.search(line): continue
-            vals = line.split()
-            if len(vals) != 2:
-                msg = 'ERROR: bad line in key file:<%s>' % line
-                raise Exception(msg)
-            qid = int(vals[0])
-            docid = int(vals[1])
+        if pairs is None:
+            pairs = self.readPairs(config)
+        for qid, docid in pairs:
             if qid not in seen:
                 seen[qid] = set()
                 self.retrieved[qid] = 0
@@ -129,6 +157,17 @@ class Response:
                 self.rel_ranks[qid].append(self.retrieved[qid])
             # duplicate entries are counted, but only *credited* at first occurrence. 
             seen[qid].add(docid)            
+
+    def readPairs(self,config):
+        skip = re.compile('^\s*($|#)')
+        response = open(config.responsefile,'r')
+        for line in response:
+            if skip.search(line): continue
+            vals = line.split()
+            if len(vals) != 2 and len(vals) != 3:   # third column is the match score written by DRSystem -o
+                msg = 'ERROR: bad line in key file:<%s>' % line
+                raise Exception(msg)
+            yield int(vals[0]), int(vals[1])
         response.close()
 
     def getRanks(self,qid):
@@ -277,8 +316,105 @@ class Score:
                     self.global_interpolation_points[i]))
         #print >> sys.stderr
 
+class BatchScore:
+    # All measures are computed at once from flat arrays of the relevant
+    # retrieved documents of every query: the rank of each one, its position
+    # among the relevant retrieved documents of its query, and the index of
+    # its query. Measures are averaged over the queries of the key and of the
+    # response, as Score does, so precision, recall and the interpolated
+    # precision are the same as Score computes.
+    def __init__(self,config,key,response):
+        queries = sorted(key.qids() | response.qids())
+        self.num_queries = len(queries)
+        self.interp_points = config.interp_points
+        self.cutoffs = config.cutoffs
+        self.total_relevant = sum([key.numRelevant(qid) for qid in queries])
+        self.total_retrieved = sum([response.numRetrieved(qid) for qid in queries])
+        self.total_relevant_retrieved = sum([response.numRelevantRetrieved(qid) for qid in queries])
+
+        rel = numpy.array([key.numRelevant(qid) for qid in queries], dtype=numpy.float64)
+        qidx = numpy.repeat(numpy.arange(self.num_queries), [response.numRelevantRetrieved(qid) for qid in queries])
+        ranks = numpy.array([rank for qid in queries for rank in response.getRanks(qid)], dtype=numpy.float64)
+        starts = numpy.cumsum([0] + [response.numRelevantRetrieved(qid) for qid in queries])[:-1]
+        pos = numpy.arange(1, len(ranks) + 1, dtype=numpy.float64) - starts[qidx]
+        count = max(self.num_queries, 1)
+        safe_rel = numpy.maximum(rel, 1.0)
+
+        def perQuery(weights):
+            return numpy.bincount(qidx, weights=weights, minlength=self.num_queries)
+
+        prec = pos / ranks
+        self.mean_average_precision = (perQuery(prec) / safe_rel).sum() / count
+        self.r_precision = (perQuery(ranks <= rel[qidx]) / safe_rel).sum() / count
+        self.precision_at = [perQuery(ranks <= k).sum() / k / count for k in self.cutoffs]
+
+        # binary gains: a relevant document at rank r adds 1/log2(r+1), and the
+        # ideal ranking has the relevant documents at ranks 1..rel
+        gains = 1.0 / numpy.log2(ranks + 1.0)
+        depth = int(max([rel.max() if self.num_queries > 0 else 0] + self.cutoffs))
+        ideal = numpy.concatenate([[0.0], numpy.cumsum(1.0 / numpy.log2(numpy.arange(2, depth + 2)))])
+        rel_int = rel.astype(numpy.int64)
+        self.ndcg = (perQuery(gains) / numpy.maximum(ideal[rel_int], 1e-300)).sum() / count
+        self.ndcg_at = [(perQuery(gains * (ranks <= k)) / numpy.maximum(ideal[numpy.minimum(rel_int, k)], 1e-300)).sum() / count for k in self.cutoffs]
+
+        points = numpy.zeros((self.num_queries, self.interp_points + 1))
+        ipt = ((pos * self.interp_points) / rel[qidx]).astype(numpy.int64)
+        numpy.maximum.at(points, (qidx, ipt), prec)
+        points = numpy.maximum.accumulate(points[:, ::-1], axis=1)[:, ::-1]
+        self.global_interpolation_points = list(points.sum(axis=0) / count)
+
+    def header(self):
+        return (['queries', 'retrieved', 'rel_retr', 'prec', 'recall', 'F', 'MAP', 'R-prec']
+                + ['P@%d' % k for k in self.cutoffs] + ['nDCG'] + ['nDCG@%d' % k for k in self.cutoffs] + ['int.prec'])
+
+    def row(self):
+        precision = float(self.total_relevant_retrieved) / self.total_retrieved if self.total_retrieved > 0 else 0.0
+        recall = float(self.total_relevant_retrieved) / self.total_relevant if self.total_relevant > 0 else 0.0
+        fmeasure = (2 * precision * recall) / (precision + recall) if precision + recall > 0 else 0.0
+        return ([self.num_queries, self.total_retrieved, self.total_relevant_retrieved, precision, recall, fmeasure,
+                 self.mean_average_precision, self.r_precision] + self.precision_at + [self.ndcg] + self.ndcg_at
+                + [sum(self.global_interpolation_points) / len(self.global_interpolation_points)])
+
+# The key and the configuration are set once before the worker processes are
+# forked, so each worker reads only its response files.
+batch_config = None
+batch_key = None
+
+def evaluateRun(responsefile):
+    config = copy.copy(batch_config)
+    config.responsefile = responsefile
+    scorer = BatchScore(config, batch_key, Response(config, batch_key))
+    return scorer.header(), scorer.row()
+
+def evaluateBatch(config):
+    global batch_config, batch_key
+    batch_config = config
+    batch_key = Key(config)
+    if config.workers > 1 and len(config.responsefiles) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context('fork').Pool(config.workers) as pool:
+            results = pool.map(evaluateRun, config.responsefiles)
+    else:
+        results = [evaluateRun(responsefile) for responsefile in config.responsefiles]
+    printTable(config, [(responsefile, row) for responsefile, (header, row) in zip(config.responsefiles, results)], results[0][0])
+
+def printTable(config, rows, header, title='response'):
+    def cell(value):
+        return '%d' % value if isinstance(value, int) else '%.4f' % value
+    if config.print_flat:
+        print (' '.join([title] + header))
+        for name, row in rows:
+            print (' '.join([name] + [cell(value) for value in row]))
+        return
+    width = max([len(title)] + [len(name) for name, row in rows])
+    print (' '.join(['%-*s' % (width, title)] + ['%9s' % column for column in header]))
+    for name, row in rows:
+        print (' '.join(['%-*s' % (width, name)] + ['%9s' % cell(value) for value in row]))
+
 if __name__ == '__main__':
     config = CommandLine()
+    if config.batch:
+        evaluateBatch(config)
+        exit()
     key = Key(config)
     response = Response(config,key)
     scorer = Score(config,key,response)
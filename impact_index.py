@@ -0,0 +1,204 @@
+import os, time, mmap, struct
+from postings_codec import VByteEncode, VByteDecode
+from result_cache import IndexGeneration
+
+##########      Layout of the impact-ordered index file (all integers are little-endian).        ##########
+###
+###     The impact of a posting is its contribution to the match score of its document before the query magnitude is divided out:
+###     the weight log(1 + tf) * idf weight of the posting divided by the magnitude of its document. It depends only on the index and on the
+###     weighting type, so it is computed once when the index is built with -I option, and quantized to IMPACT_LEVELS levels.
+###     The postings of each term are grouped by level into segments, and the segments are stored from the highest level down.
+###     The file is written next to the binary index, in <index>.impacts:
+###
+###     header      :   magic, version, count of levels, weighting type, term count, length of the generation, largest impact
+###     generation  :   generation of the index the impacts were computed from, so that impacts of an older index are never used
+###     terms       :   one fixed size record per term sorted by term, so that a term is found by binary search
+###     strings     :   utf-8 bytes of the terms
+###     segments    :   one (level, document count, postings offset, postings length) record per segment, from the highest level down
+###     postings    :   document indexes of each segment in document order, as variable-byte gaps counted from -1 (see postings_codec.py)
+
+MAGIC           =   b'DRSIMPCT'
+VERSION         =   1
+IMPACT_LEVELS   =   255                             ###     Impacts are quantized to 8 bits. Level 0 is never used, so every posting counts.
+WEIGHTING_TYPES =   ('binary', 'frequency', 'tf.idf')
+
+HEADER          =   struct.Struct('<8sIIIIId')
+TERM            =   struct.Struct('<IIII')          ###     string offset, string length, index of the first segment, segment count
+SEGMENT         =   struct.Struct('<IIQI')          ###     level, document count, postings offset, postings length
+
+def ImpactsPath(index_path):
+    return index_path + '.impacts'
+
+def IsImpactIndex(index_path):
+    return os.path.exists(ImpactsPath(index_path))
+
+##########      Function that is used to write the impact-ordered index.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file, which has to be written first
+###             inv_tkn_idx: dictionary of postings list of each term
+###             posting_weights: function that returns the list of final weights of the postings of a term
+###             doc_magnitudes: list of the magnitudes of the document vectors of the weighting type
+###             weighting_type: weighting type of the document magnitudes
+def WriteImpactIndex(index_path, inv_tkn_idx, posting_weights, doc_magnitudes, weighting_type):
+
+    impacts = {}
+
+    for token in inv_tkn_idx:
+        impacts[token] = [(weight / doc_magnitudes[doc_index], doc_index) for (doc_index, frequency), weight in zip(inv_tkn_idx[token], posting_weights(token))]
+
+    largest     =   max([impact for token in impacts for impact, doc_index in impacts[token]], default = 0.0)
+    terms       =   sorted(impacts, key = lambda token: token.encode('utf-8'))
+    generation  =   IndexGeneration(index_path).encode('utf-8')
+    term_table  =   bytearray()
+    strings     =   bytearray()
+    segments    =   bytearray()
+    postings    =   bytearray()
+    segment_count = 0
+
+    for token in terms:
+
+        levels = {}
+
+        for impact, doc_index in impacts[token]:                ###     Postings are visited in document order, so the documents of a segment stay sorted.
+
+            level = max(1, min(IMPACT_LEVELS, int(impact / largest * IMPACT_LEVELS + 0.5))) if largest > 0 else 1
+
+            if level not in levels:
+                levels[level] = []
+
+            levels[level].append(doc_index)
+
+        encoded = token.encode('utf-8')
+        term_table.extend(TERM.pack(len(strings), len(encoded), segment_count, len(levels)))
+        strings.extend(encoded)
+
+        for level in sorted(levels, reverse = True):
+
+            doc_indexes = levels[level]
+            data = VByteEncode([doc_indexes[0] + 1] + [doc_indexes[i] - doc_indexes[i - 1] for i in range(1, len(doc_indexes))])
+            segments.extend(SEGMENT.pack(level, len(doc_indexes), len(postings), len(data)))
+            postings.extend(data)
+            segment_count += 1
+
+    with open(ImpactsPath(index_path), 'wb') as f:
+
+        f.write(HEADER.pack(MAGIC, VERSION, IMPACT_LEVELS, WEIGHTING_TYPES.index(weighting_type), len(terms), len(generation), largest))
+        f.write(generation)
+        f.write(term_table)
+        f.write(strings)
+        f.write(segments)
+        f.write(postings)
+
+##########      Class that is used to read the impact-ordered index file through mmap.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+class ReadImpactIndex:
+    def __init__(self, index_path):
+        path = ImpactsPath(index_path)
+        self.input_fs = open(path, 'rb')
+        self.buffer = mmap.mmap(self.input_fs.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.levels, weighting_id, self.term_count, generation_length, self.largest = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise Exception('ERROR: not an impact-ordered index file:<%s>' % path)
+        if version != VERSION:
+            raise Exception('ERROR: unsupported impact-ordered index version %d:<%s>' % (version, path))
+        if self.buffer[HEADER.size:HEADER.size + generation_length].decode('utf-8') != IndexGeneration(index_path):
+            raise Exception('ERROR: the impacts are older than the index, rebuild them with -i and -I options:<%s>' % index_path)
+        self.weighting_type = WEIGHTING_TYPES[weighting_id]
+        self.terms_offset = HEADER.size + generation_length
+        self.strings_offset = self.terms_offset + self.term_count * TERM.size
+        string_length = 0
+        segment_count = 0
+        for term_id in range(self.term_count):
+            string_length += TERM.unpack_from(self.buffer, self.terms_offset + term_id * TERM.size)[1]
+            segment_count += TERM.unpack_from(self.buffer, self.terms_offset + term_id * TERM.size)[3]
+        self.segments_offset = self.strings_offset + string_length
+        self.postings_offset = self.segments_offset + segment_count * SEGMENT.size
+
+    def Close(self):
+        self.buffer.close()
+        self.input_fs.close()
+
+    def FindTerm(self, token):
+        encoded = token.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length = TERM.unpack_from(self.buffer, self.terms_offset + middle * TERM.size)[:2]
+            start = self.strings_offset + offset
+            probe = self.buffer[start:start + length]
+            if probe < encoded:
+                low = middle + 1
+            elif probe > encoded:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    ### Output  :   list of (level, document count, postings offset, postings length) of the segments of the term, from the highest level down
+    def Segments(self, token):
+        term_id = self.FindTerm(token)
+        if term_id < 0:
+            return []
+        first, count = TERM.unpack_from(self.buffer, self.terms_offset + term_id * TERM.size)[2:]
+        return [SEGMENT.unpack_from(self.buffer, self.segments_offset + (first + i) * SEGMENT.size) for i in range(count)]
+
+    ### Output  :   list of the document indexes of a segment in document order
+    def Documents(self, offset, length):
+        start = self.postings_offset + offset
+        doc_index = -1
+        doc_indexes = []
+        for gap in VByteDecode(self.buffer[start:start + length]):
+            doc_index += gap
+            doc_indexes.append(doc_index)
+        return doc_indexes
+
+##########      Function that is used to rank documents score-at-a-time.        ##########
+
+### Input   :   impact_index: ReadImpactIndex of the collection
+###             qry_token_list: dictionary of the terms contained in the query and their frequencies
+###             qry_magnitude: magnitude of the query vector
+###             count: count of documents retrieved (0 means that every document reached is ranked)
+###             budget: count of postings scored before the ranking stops (0 means no limit)
+###             deadline: milliseconds after which the ranking stops (0 means no limit)
+### Output  :   (list of [match_score, document id] in descending order, count of postings scored)
+###             Segments of all query terms are scored from the highest level down, so that the postings that add the most to the scores come first,
+###             and whatever ranking has been reached when the budget or the deadline runs out is returned. Match scores are the quantized
+###             cosine similarities. Without a budget and a deadline, they differ from the exact scores only by the quantization error.
+def ImpactRanking(impact_index, qry_token_list, qry_magnitude, count, budget = 0, deadline = 0):
+
+    stop_time   =   time.perf_counter() + deadline / 1000.0 if deadline > 0 else None
+    segments    =   []
+
+    for token in qry_token_list:                                ###     A query term counts once whatever its frequency, as in the exhaustive ranking.
+        segments.extend(impact_index.Segments(token))
+
+    segments.sort(key = lambda segment: segment[0], reverse = True)
+
+    accumulators    =   {}
+    posting_count   =   0
+
+    for level, doc_count, offset, length in segments:
+
+        doc_indexes = impact_index.Documents(offset, length)
+
+        if budget > 0 and posting_count + doc_count > budget:   ###     The last segment is scored only up to the budget.
+            doc_indexes = doc_indexes[:budget - posting_count]
+
+        for doc_index in doc_indexes:
+            accumulators[doc_index] = accumulators.get(doc_index, 0) + level
+
+        posting_count += len(doc_indexes)
+
+        if (budget > 0 and posting_count >= budget) or (stop_time is not None and time.perf_counter() >= stop_time):
+            break
+
+    scale = impact_index.largest / impact_index.levels / qry_magnitude if qry_magnitude > 0 else 0.0
+    match_scores = [[accumulators[doc_index] * scale, doc_index + 1] for doc_index in accumulators]
+    match_scores.sort()
+    match_scores.reverse()
+
+    if count > 0:
+        return match_scores[:count], posting_count
+
+    return match_scores, posting_count
@@ -0,0 +1,224 @@
+"""\
+--------------------------------------------------------------------------------
+    USE: python <PROGNAME> (options)
+    ACTION: Compares the configurations of DRSystem in one process. The document
+            collection and the query set are read and split into tokens once.
+            Stemming and the stopword list are applied as transforms of the
+            distinct tokens, which are cached, so each configuration only
+            recounts the terms of each document. One in-memory index is built
+            per stemming and stopword list setting, and it ranks the queries
+            with every weighting type. Each ranking is scored against the gold
+            standard in memory, and the configurations are printed as a table
+            ranked by MAP.
+    OPTIONS:
+        -h : print this help message
+        -d <filename> : name of the source document collection file.(default value is documents.txt)
+        -q <filename> : name of the source query file.(default value is queries.txt)
+        -s <filename> : name of the stopwords list file of the configurations with a stopword list.(default value is stop_list.txt)
+        -g <filename> : name of the gold standard file.(default value is cacm_gold_std.txt)
+        -w <weight_types> : comma separated weighting types.(default value is binary,frequency,tf.idf)
+        -n <count> : count of documents retrieved per query.(default value is 10)
+        -k <cutoffs> : comma separated cutoffs of P@k and nDCG@k.(default value is 5,10)
+        -f : print the table as plain space separated columns.
+--------------------------------------------------------------------------------
+"""
+
+import getopt, sys, time
+from collections import Counter
+from types import SimpleNamespace
+import DRSystem
+from read_documents import ReadDocuments
+from tokenizer import Tokenizer
+from stem_cache import StemCache
+from term_dictionary import TermDictionary, CollectionIndex, DocumentVectors
+from eval_ir_my import numpy, Key, Response, BatchScore, printTable
+
+WEIGHTING_TYPES =   ('binary', 'frequency', 'tf.idf')
+
+##########      Functions that are used to turn the cached token counts into terms.        ##########
+
+### Input   :   vocabulary: iterable of the distinct lowercased tokens of the documents and queries
+###             stem: function that returns the stem of a token (None means that stemming is not applied)
+###             stop_words: dictionary of the stopwords (empty means that no stopword is removed)
+### Output  :   dictionary of the term of each token, None if the term is a stopword. It is what Tokenizer.TokenList() does to each distinct token.
+def TermMap(vocabulary, stem, stop_words):
+
+    terms = {}
+
+    for token in vocabulary:
+
+        term = stem(token) if stem is not None else token
+        terms[token] = term if term not in stop_words else None
+
+    return terms
+
+### Input   :   counts: Counter of the lowercased tokens of a text, in order of first occurrence
+###             terms: dictionary returned by TermMap
+### Output  :   dictionary of the terms contained in the text and their frequencies, the same as Tokenizer.TokenList() of the text
+def TokenList(counts, terms):
+
+    token_list = {}
+
+    for token, count in counts.items():
+
+        term = terms[token]
+
+        if term is not None:
+            token_list[term] = token_list.get(term, 0) + count
+
+    return token_list
+
+##########      Function that is used to build the index of a configuration in DRSystem.        ##########
+
+### Input   :   doc_token_lists: list of term frequency dictionary of each document
+###             qry_token_lists: list of term frequency dictionary of each query
+### The index is built as Tokenize() and ComputeWeights() build it, so the magnitudes of all weighting types are computed once.
+def BuildIndex(doc_token_lists, qry_token_lists):
+
+    term_dictionary             =   TermDictionary()
+    DRSystem.term_dictionary    =   term_dictionary
+    DRSystem.colct_tkn_idx      =   CollectionIndex(term_dictionary)
+    DRSystem.doc_tkn_idx        =   DocumentVectors(term_dictionary)
+    DRSystem.qry_tkn_idx        =   DocumentVectors(term_dictionary)
+    DRSystem.inv_tkn_idx        =   {}
+    DRSystem.posting_weights    =   {}
+    DRSystem.term_upper_bounds  =   {}
+    DRSystem.document_count     =   0
+
+    shard_colct_tkn_idx = {}
+
+    for token_list in doc_token_lists:                  ###     The collection is merged as one shard, so term ids are given in the same order as a serial build.
+        for token in token_list:
+            shard_colct_tkn_idx[token] = shard_colct_tkn_idx.get(token, 0) + 1
+
+    DRSystem.MergeShard(doc_token_lists, shard_colct_tkn_idx, [])
+    DRSystem.ComputeWeights()
+
+    for token_list in qry_token_lists:
+        DRSystem.qry_tkn_idx.Append(token_list)
+
+##########      Function that is used to rank the query set and score it.        ##########
+
+### Output  :   BatchScore of the rankings of the queries with the weighting type
+def ScoreRankings(config, key, weighting_type, depth):
+
+    DRSystem.weighting_type = weighting_type
+    pairs = []
+
+    for qry_index in range(len(DRSystem.qry_tkn_idx)):
+
+        token_list = DRSystem.qry_tkn_idx[qry_index]
+
+        ###     Queries are ranked exhaustively and cut to the depth, as DRSystem writes the result file without -k option.
+
+        for match_score, doc_id in DRSystem.RankQuery(token_list, DRSystem.QueryMagnitude(token_list), 0)[:depth]:
+            pairs.append((qry_index + 1, doc_id))       ###     Queries are numbered from 1, as in the result file.
+
+    return BatchScore(config, key, Response(config, key, pairs))
+
+def main():
+
+    doc_file_name   =   'documents.txt'
+    qry_file_name   =   'queries.txt'
+    stop_list_name  =   'stop_list.txt'
+    gold_name       =   'cacm_gold_std.txt'
+    weighting_types =   list(WEIGHTING_TYPES)
+    depth           =   10
+    cutoffs         =   [5, 10]
+    print_flat      =   False
+
+    opts, args = getopt.getopt(sys.argv[1:], "hd:q:s:g:w:n:k:f")
+
+    for opt, arg in opts:
+
+        if opt == '-h':
+            print (__doc__.replace('<PROGNAME>', sys.argv[0], 1))
+            exit()
+
+        elif opt == '-d':
+            doc_file_name = arg
+
+        elif opt == '-q':
+            qry_file_name = arg
+
+        elif opt == '-s':
+            stop_list_name = arg
+
+        elif opt == '-g':
+            gold_name = arg
+
+        elif opt == '-w':
+            weighting_types = arg.split(',')
+
+        elif opt == '-n':
+            depth = int(arg)
+
+        elif opt == '-k':
+            cutoffs = [int(k) for k in arg.split(',')]
+
+        elif opt == '-f':
+            print_flat = True
+
+    for weighting_type in weighting_types:
+
+        if weighting_type not in WEIGHTING_TYPES:
+
+            print ("\nNo such weight type : Only \"binary\", \"frequency\", \"tf.idf\" are required.")
+            exit(1)
+
+    if numpy is None:
+
+        print ("\nThe configurations are scored by the batch mode of eval_ir_my.py, which requires numpy.")
+        exit(1)
+
+    if depth <= 0:
+
+        print ("\nThe count of documents retrieved per query has to be positive.")
+        exit(1)
+
+    start = time.perf_counter()
+
+    stop_words = {}
+
+    with open(stop_list_name) as input_fs:
+        for word in input_fs:
+            stop_words[word.split('\n')[0]] = 1
+
+    ###     Documents and queries are split once. Each configuration only maps the distinct tokens to terms and recounts them.
+
+    splitter    =   Tokenizer({})
+    doc_counts  =   [Counter(splitter.Split(doc.text)) for doc in ReadDocuments(doc_file_name)]
+    qry_counts  =   [Counter(splitter.Split(doc.text)) for doc in ReadDocuments(qry_file_name)]
+    vocabulary  =   set([token for counts in doc_counts + qry_counts for token in counts])
+    stem_cache  =   StemCache()
+    stems       =   None
+
+    config  =   SimpleNamespace(keyfile = gold_name, response_limit = None, interp_points = 10, cutoffs = cutoffs, print_flat = print_flat)
+    key     =   Key(config)
+    rows    =   []
+    header  =   None
+
+    for stemming in (False, True):
+
+        if stemming and stems is None:                  ###     Each distinct token is stemmed once for both stopword settings.
+            stems = TermMap(vocabulary, stem_cache.Stem, {})
+
+        for stop_list_use in (False, True):
+
+            terms = TermMap(vocabulary, stems.get if stemming else None, stop_words if stop_list_use else {})
+            BuildIndex([TokenList(counts, terms) for counts in doc_counts], [TokenList(counts, terms) for counts in qry_counts])
+
+            for weighting_type in weighting_types:
+
+                scorer = ScoreRankings(config, key, weighting_type, depth)
+                header = scorer.header()
+                rows.append(('%s%s%s' % (weighting_type, ' stem' if stemming else '', ' stop' if stop_list_use else ''), scorer.row()))
+
+    rows.sort(key = lambda row: row[1][header.index('MAP')], reverse = True)
+    printTable(config, rows, header, 'configuration')
+
+    if not print_flat:
+        print ('\n%d configurations in %.2f s' % (len(rows), time.perf_counter() - start))
+
+if __name__ == "__main__":
+    main()
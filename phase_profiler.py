@@ -0,0 +1,64 @@
+import sys, json, time, tracemalloc
+from contextlib import contextmanager
+
+##########      Class that is used to measure the phases of a run and to count the work done in them.        ##########
+
+### Nothing is measured until Enable() is called. While disabled, Phase() only yields and the callers check enabled before counting,
+### so the instrumentation costs one attribute lookup per phase or per query.
+class PhaseProfiler:
+    def __init__(self):
+        self.enabled = False
+        self.phases = []
+        self.counters = {}
+        self.stack = []
+
+    ### Peak memory is measured with tracemalloc, which slows allocations down while the profiler is enabled.
+    def Enable(self):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def Count(self, name, count = 1):
+        self.counters[name] = self.counters.get(name, 0) + count
+
+    ### Phases can be nested. The peak memory of a phase includes the peaks of the phases nested in it.
+    @contextmanager
+    def Phase(self, name):
+        if not self.enabled:
+            yield
+            return
+        if self.stack:
+            self.stack[-1]['peak'] = max(self.stack[-1].get('peak', 0), tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = {'phase': self.stack[-1]['phase'] + '/' + name if self.stack else name, 'wall_s': 0.0, 'peak_mb': 0.0}
+        self.phases.append(frame)                       ###     Phases are reported in the order they start, so a phase comes before the phases nested in it.
+        self.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            frame['wall_s'] = time.perf_counter() - start
+            peak = max(frame.pop('peak', 0), tracemalloc.get_traced_memory()[1])
+            frame['peak_mb'] = peak / 1e6
+            self.stack.pop()
+            if self.stack:
+                self.stack[-1]['peak'] = max(self.stack[-1].get('peak', 0), peak)
+            tracemalloc.reset_peak()
+
+    def Report(self):
+        lines = ['%-40s %10s %10s' % ('phase', 'wall s', 'peak MB')]
+        for phase in self.phases:
+            lines.append('%-40s %10.3f %10.1f' % ('  ' * phase['phase'].count('/') + phase['phase'].split('/')[-1], phase['wall_s'], phase['peak_mb']))
+        lines.append('')
+        lines.append('%-40s %10s' % ('counter', 'count'))
+        for name in sorted(self.counters):
+            lines.append('%-40s %10d' % (name, self.counters[name]))
+        return '\n'.join(lines)
+
+    ### Input   :   path: filename(including or not path) of the JSON report. '-' means that a text report is printed on stderr.
+    def Write(self, path):
+        if path == '-':
+            print (self.Report(), file = sys.stderr)
+            return
+        with open(path, 'w') as f:
+            json.dump({'phases': self.phases, 'counters': self.counters}, f, indent = 1)
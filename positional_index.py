@@ -0,0 +1,255 @@
+import os, re, mmap, struct, heapq
+from postings_codec import VByteEncode, VByteDecode
+from result_cache import IndexGeneration
+
+##########      Layout of the positional index file (all integers are little-endian).        ##########
+###
+###     The positions of the terms are written next to the binary index, in <index>.positions, when the index is built with -l option.
+###
+###     header      :   magic, version, document count, term count, length of the generation
+###     generation  :   generation of the index the positions were written from, so that positions of an older index are never used
+###     terms       :   one fixed size record per term sorted by term, so that a term is found by binary search
+###     strings     :   utf-8 bytes of the terms
+###     positions   :   positional postings of each term in document order, as variable-byte integers (see postings_codec.py):
+###                     document gap, count of positions and the gaps between the positions, for each document that contains the term.
+###                     Gaps are counted from -1, so every number is a positive integer.
+###
+###     Positions count every token of a document, stopwords included, so a phrase with a stopword in it still matches with the gap it leaves.
+
+MAGIC           =   b'DRSPOSIT'
+VERSION         =   1
+
+HEADER          =   struct.Struct('<8sIIII')
+TERM            =   struct.Struct('<IIQQ')          ###     string offset, string length, positions offset, positions length
+
+##########      Query syntax of the phrase and proximity clauses.        ##########
+###
+###     "time sharing system"       the terms occur next to each other in this order
+###     "time sharing system"~10    the terms occur in any order within a span of 10 positions
+
+CLAUSE          =   re.compile(r'"([^"\n]*)"(?:~(\d+))?')         ###     A clause never spans lines, so an unclosed quote is not paired with a quote of a later line.
+
+def PositionsPath(index_path):
+    return index_path + '.positions'
+
+def IsPositionalIndex(index_path):
+    return os.path.exists(PositionsPath(index_path))
+
+##########      Class that is used to collect the positional postings while the documents are tokenized.        ##########
+
+### Documents have to be added in document order. Positional postings are encoded as soon as a document is added,
+### so only the compressed positions are kept in memory.
+class PositionalIndexWriter:
+    def __init__(self):
+        self.postings = {}
+        self.previous = {}
+        self.document_count = 0
+
+    ### Input   :   doc_index: index of the document
+    ###             positions: dictionary of the positions of each term in the document
+    def Add(self, doc_index, positions):
+        for token, token_positions in positions.items():
+            if token not in self.postings:
+                self.postings[token] = bytearray()
+                self.previous[token] = -1
+            numbers = [doc_index - self.previous[token], len(token_positions)]
+            previous = -1
+            for position in token_positions:
+                numbers.append(position - previous)
+                previous = position
+            self.postings[token].extend(VByteEncode(numbers))
+            self.previous[token] = doc_index
+        self.document_count = max(self.document_count, doc_index + 1)
+
+    ### Input   :   index_path: filename(including or not path) of the index file, which has to be written first
+    def Write(self, index_path):
+        terms       =   sorted(self.postings, key = lambda token: token.encode('utf-8'))
+        generation  =   IndexGeneration(index_path).encode('utf-8')
+        term_table  =   bytearray()
+        strings     =   bytearray()
+        offset      =   0
+        for token in terms:
+            encoded = token.encode('utf-8')
+            term_table.extend(TERM.pack(len(strings), len(encoded), offset, len(self.postings[token])))
+            strings.extend(encoded)
+            offset += len(self.postings[token])
+        with open(PositionsPath(index_path), 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.document_count, len(terms), len(generation)))
+            f.write(generation)
+            f.write(term_table)
+            f.write(strings)
+            for token in terms:
+                f.write(self.postings[token])
+
+##########      Class that is used to read the positional index file through mmap.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+class ReadPositionalIndex:
+    def __init__(self, index_path):
+        path = PositionsPath(index_path)
+        self.input_fs = open(path, 'rb')
+        self.buffer = mmap.mmap(self.input_fs.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.document_count, self.term_count, generation_length = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise Exception('ERROR: not a positional index file:<%s>' % path)
+        if version != VERSION:
+            raise Exception('ERROR: unsupported positional index version %d:<%s>' % (version, path))
+        if self.buffer[HEADER.size:HEADER.size + generation_length].decode('utf-8') != IndexGeneration(index_path):
+            raise Exception('ERROR: the positions are older than the index, rebuild them with -i and -l options:<%s>' % index_path)
+        self.terms_offset = HEADER.size + generation_length
+        self.strings_offset = self.terms_offset + self.term_count * TERM.size
+        self.positions_offset = self.strings_offset + sum([TERM.unpack_from(self.buffer, self.terms_offset + term_id * TERM.size)[1] for term_id in range(self.term_count)])
+
+    def Close(self):
+        self.buffer.close()
+        self.input_fs.close()
+
+    def FindTerm(self, token):
+        encoded = token.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length = TERM.unpack_from(self.buffer, self.terms_offset + middle * TERM.size)[:2]
+            start = self.strings_offset + offset
+            probe = self.buffer[start:start + length]
+            if probe < encoded:
+                low = middle + 1
+            elif probe > encoded:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    ### Output  :   list of (document index, list of positions) in document order
+    def Postings(self, token):
+        term_id = self.FindTerm(token)
+        if term_id < 0:
+            return []
+        offset, length = TERM.unpack_from(self.buffer, self.terms_offset + term_id * TERM.size)[2:]
+        start = self.positions_offset + offset
+        numbers = VByteDecode(self.buffer[start:start + length])
+        postings = []
+        doc_index = -1
+        i = 0
+        while i < len(numbers):
+            doc_index += numbers[i]
+            count = numbers[i + 1]
+            positions = []
+            position = -1
+            for gap in numbers[i + 2:i + 2 + count]:
+                position += gap
+                positions.append(position)
+            postings.append((doc_index, positions))
+            i += 2 + count
+        return postings
+
+##########      Function that is used to parse the phrase and proximity clauses of a query.        ##########
+
+### Input   :   text: string of a query
+###             tokenizer: tokenizer of the index, so that the terms of a clause are stemmed and stopped as the documents are
+### Output  :   (text without the proximity operators, list of (window, list of (offset in the clause, term)))
+###             window is 0 for a phrase. A clause that is left with no term after stopword removal is dropped.
+def ParseQuery(text, tokenizer):
+    clauses = []
+    for match in CLAUSE.finditer(text):
+        offsets = sorted([(offset, token) for token, positions in tokenizer.Positions(match.group(1)).items() for offset in positions])
+        if len(offsets) > 0:
+            clauses.append((int(match.group(2)) if match.group(2) else 0, offsets))
+    return CLAUSE.sub(lambda match: ' ' + match.group(1) + ' ', text), clauses
+
+##########      Functions that are used to match the clauses against the positional postings.        ##########
+
+### Input   :   positional_index: ReadPositionalIndex of the collection
+###             clauses: list of (window, list of (offset in the clause, term)) returned by ParseQuery
+### Output  :   set of the indexes of the documents that match every clause
+def MatchClauses(positional_index, clauses):
+    documents = None
+    for window, offsets in clauses:
+        matched = MatchClause(positional_index, window, offsets, documents)
+        documents = matched if documents is None else documents & matched
+        if len(documents) == 0:
+            break
+    return documents if documents is not None else set()
+
+def MatchClause(positional_index, window, offsets, documents = None):
+    tokens = []
+    for offset, token in offsets:
+        if token not in tokens:
+            tokens.append(token)
+    postings = [positional_index.Postings(token) for token in tokens]
+    matched = set()
+    for doc_index, position_lists in IntersectPostings(postings):
+        if documents is not None and doc_index not in documents:
+            continue
+        positions = dict(zip(tokens, position_lists))
+        if window == 0:
+            found = PhraseMatches([(offset, positions[token]) for offset, token in offsets])
+        else:
+            found = MinimumSpan(position_lists) <= window
+        if found:
+            matched.add(doc_index)
+    return matched
+
+### Input   :   postings: list of positional postings lists in document order
+### Output  :   iterator of (document index, list of the positions lists) of the documents that are in every postings list, merged in document order
+def IntersectPostings(postings):
+    if len(postings) == 0 or min([len(posting_list) for posting_list in postings]) == 0:
+        return
+    cursors = [0] * len(postings)
+    doc_index = postings[0][0][0]
+    while True:
+        aligned = True
+        for i in range(len(postings)):
+            posting_list = postings[i]
+            while cursors[i] < len(posting_list) and posting_list[cursors[i]][0] < doc_index:
+                cursors[i] += 1
+            if cursors[i] == len(posting_list):
+                return
+            if posting_list[cursors[i]][0] > doc_index:
+                doc_index = posting_list[cursors[i]][0]
+                aligned = False
+                break
+        if aligned:
+            yield doc_index, [postings[i][cursors[i]][1] for i in range(len(postings))]
+            cursors[0] += 1
+            if cursors[0] == len(postings[0]):
+                return
+            doc_index = postings[0][cursors[0]][0]
+
+### Input   :   lists: list of (offset in the phrase, sorted positions of the term)
+### Output  :   whether a start position exists from which every term is found at its offset, by merge-intersecting the shifted positions lists
+def PhraseMatches(lists):
+    candidates = [position - lists[0][0] for position in lists[0][1]]
+    for offset, positions in lists[1:]:
+        shifted = []
+        i = j = 0
+        while i < len(candidates) and j < len(positions):
+            position = positions[j] - offset
+            if candidates[i] < position:
+                i += 1
+            elif candidates[i] > position:
+                j += 1
+            else:
+                shifted.append(position)
+                i += 1
+                j += 1
+        candidates = shifted
+        if len(candidates) == 0:
+            return False
+    return True
+
+### Input   :   lists: list of sorted positions lists
+### Output  :   smallest distance between the first and the last position of a window that holds one position of every list
+def MinimumSpan(lists):
+    heap = [(positions[0], i, 0) for i, positions in enumerate(lists)]
+    heapq.heapify(heap)
+    last = max([positions[0] for positions in lists])
+    span = last - heap[0][0]
+    while True:
+        position, i, cursor = heapq.heappop(heap)
+        span = min(span, last - position)
+        if cursor + 1 == len(lists[i]):
+            return span
+        following = lists[i][cursor + 1]
+        last = max(last, following)
+        heapq.heappush(heap, (following, i, cursor + 1))
@@ -0,0 +1,206 @@
+from itertools import accumulate, islice
+from struct import Struct
+
+##########      Codecs of the postings lists of the binary index.        ##########
+###
+###     A postings list is stored as (document gap, term frequency) pairs. The first gap is counted from document index -1, so every
+###     gap and every frequency is a positive integer:
+###
+###         raw     :   (document index, term frequency) pairs of 32-bit integers
+###         vbyte   :   variable-byte integers, 7 bits per byte from the lowest bits, the high bit set on all bytes but the last one
+###         gamma   :   Elias-gamma codes (n - 1 zero bits followed by the n bits of the integer), padded to a byte boundary
+###
+###     Postings lists are decoded one term at a time, directly from the buffer of the index, when the term is scored. DecodePostings()
+###     returns the whole list, and StreamPostings() yields the postings as they are decoded, so a scan of the list never holds it.
+
+CODECS          =   ('raw', 'vbyte', 'gamma')           ###     The position of a codec in this tuple is its id in the index header.
+DEFAULT_CODEC   =   'vbyte'
+
+RAW_POSTING     =   Struct('<II')                       ###     document index, term frequency
+
+##########      Functions that are used to turn postings into positive integers and back.        ##########
+
+### Input   :   postings: list of (document index, term frequency) in document order
+### Output  :   list of document gaps and term frequencies, interleaved
+def Gaps(postings):
+
+    numbers = []
+    previous = -1
+
+    for doc_index, frequency in postings:
+
+        numbers.append(doc_index - previous)
+        numbers.append(frequency)
+        previous = doc_index
+
+    return numbers
+
+### Input   :   numbers: list of document gaps and term frequencies, interleaved
+### Output  :   list of (document index, term frequency) in document order
+def Postings(numbers):
+
+    return list(zip(islice(accumulate(numbers[0::2], initial = -1), 1, None), numbers[1::2]))
+
+### Input   :   numbers: iterator of document gaps and term frequencies, interleaved
+### Output  :   iterator of (document index, term frequency) in document order
+def IterPostings(numbers):
+
+    doc_index = -1
+
+    for gap, frequency in zip(numbers, numbers):
+
+        doc_index += gap
+        yield doc_index, frequency
+
+##########      Variable-byte coding.        ##########
+
+def VByteEncode(numbers):
+
+    data = bytearray()
+
+    for number in numbers:
+
+        while number >= 128:
+            data.append(number & 127 | 128)
+            number >>= 7
+
+        data.append(number)
+
+    return bytes(data)
+
+def VByteDecode(data):
+
+    if max(data, default = 0) < 128:                    ###     Every number fits in one byte, as in most postings lists of common terms.
+        return list(data)
+
+    numbers = []
+    value = shift = 0
+
+    for byte in data:
+
+        if byte < 128:
+            numbers.append(value | byte << shift)
+            value = shift = 0
+
+        else:
+            value |= (byte & 127) << shift
+            shift += 7
+
+    return numbers
+
+def IterVByte(data):
+
+    value = shift = 0
+
+    for byte in data:
+
+        if byte < 128:
+            yield value | byte << shift
+            value = shift = 0
+
+        else:
+            value |= (byte & 127) << shift
+            shift += 7
+
+##########      Elias-gamma coding.        ##########
+
+def GammaEncode(numbers):
+
+    codes = []
+
+    for number in numbers:
+
+        bits = bin(number)[2:]
+        codes.append('0' * (len(bits) - 1))
+        codes.append(bits)
+
+    bits = ''.join(codes)
+    bits += '0' * (-len(bits) % 8)
+
+    return int(bits, 2).to_bytes(len(bits) // 8, 'big') if bits else b''
+
+def GammaDecode(data, count):
+
+    return list(IterGamma(data, count))
+
+def IterGamma(data, count):
+
+    window = bits = 0                                   ###     The unread bits are the lowest bits of a small integer, read with shifts.
+    position = 0
+
+    for i in range(count):
+
+        zeros = 0
+
+        while window == 0:                              ###     The zero bits of a code may span several bytes.
+
+            zeros += bits
+            window = data[position]
+            bits = 8
+            position += 1
+
+        length = window.bit_length()
+        zeros += bits - length
+        bits = length
+
+        while bits <= zeros:                            ###     The code is the leading 1 bit and the next zeros bits.
+
+            window = window << 8 | data[position]
+            bits += 8
+            position += 1
+
+        bits -= zeros + 1
+        yield window >> bits
+        window &= (1 << bits) - 1
+
+##########      Functions that are used to encode and decode the postings list of a term.        ##########
+
+### Input   :   codec: name of the codec in CODECS
+###             postings: list of (document index, term frequency) in document order
+### Output  :   bytes of the encoded postings list
+def EncodePostings(codec, postings):
+
+    if codec == 'raw':
+        return b''.join([RAW_POSTING.pack(doc_index, frequency) for doc_index, frequency in postings])
+
+    if codec == 'vbyte':
+        return VByteEncode(Gaps(postings))
+
+    if codec == 'gamma':
+        return GammaEncode(Gaps(postings))
+
+    raise Exception('ERROR: unknown postings codec:<%s>' % codec)
+
+### Input   :   codec: name of the codec in CODECS
+###             data: bytes of the encoded postings list
+###             count: count of postings in the list
+### Output  :   list of (document index, term frequency) in document order
+def DecodePostings(codec, data, count):
+
+    if codec == 'raw':
+        return list(RAW_POSTING.iter_unpack(data))
+
+    if codec == 'vbyte':
+        return Postings(VByteDecode(data))
+
+    if codec == 'gamma':
+        return Postings(GammaDecode(data, 2 * count))
+
+    raise Exception('ERROR: unknown postings codec:<%s>' % codec)
+
+### Input   :   codec: name of the codec in CODECS
+###             data: bytes of the encoded postings list
+###             count: count of postings in the list
+### Output  :   iterator of (document index, term frequency) in document order
+def StreamPostings(codec, data, count):
+
+    if codec == 'raw':
+        return RAW_POSTING.iter_unpack(data)
+
+    if codec == 'vbyte':
+        return IterPostings(IterVByte(data))
+
+    if codec == 'gamma':
+        return IterPostings(IterGamma(data, 2 * count))
+
+    raise Exception('ERROR: unknown postings codec:<%s>' % codec)
@@ -0,0 +1,116 @@
+import asyncio, sys
+from concurrent.futures import ThreadPoolExecutor
+
+##########      Long-running query server.        ##########
+###
+###     The index is loaded once by the caller and every request is ranked by the rank function. The protocol is line based:
+###     each request is one line of query text in utf-8, and the response is one "document_id score" line for each retrieved
+###     document followed by an empty line. A request that can not be ranked is answered by one "ERROR: message" line followed
+###     by an empty line, and the server goes on with the next request. Bytes that are not utf-8 are replaced, not rejected.
+###
+###     Requests are ranked one at a time in one worker thread, because the index caches of the caller are not thread safe.
+###     The event loop stays free while a query is ranked, so other clients are still read from and written to, but their
+###     queries wait for the query being ranked.
+
+##########      Function that is used to format the response of a query.        ##########
+
+### Input   :   match_scores: list of [match_score, document id] in descending order
+def FormatResponse(match_scores):
+
+    lines = ['%d %r\n' % (doc_id, match_score) for match_score, doc_id in match_scores]
+    lines.append('\n')
+
+    return ''.join(lines)
+
+##########      Function that is used to answer one request.        ##########
+
+### Input   :   line: bytes of the request line
+###             rank: function that returns the list of [match_score, document id] of a query string
+###             executor: single worker executor in which the queries are ranked
+### Output  :   response text of the request
+async def Answer(line, rank, executor):
+
+    text = line.decode('utf-8', errors = 'replace').rstrip('\r\n')
+
+    if text.strip() == '':                              ###     An empty request is answered with an empty result, without ranking.
+        return FormatResponse([])
+
+    try:
+        match_scores = await asyncio.get_running_loop().run_in_executor(executor, rank, text)
+
+    except Exception as error:                          ###     A failed request is reported to its client only.
+        return 'ERROR: %s\n\n' % ' '.join(str(error).split() or [type(error).__name__])
+
+    return FormatResponse(match_scores)
+
+##########      Function that is used to answer the requests of a connection.        ##########
+
+async def HandleConnection(reader, writer, rank, executor):
+
+    try:
+
+        while True:
+
+            line = await reader.readline()
+
+            if not line:
+                break
+
+            writer.write((await Answer(line, rank, executor)).encode('utf-8'))
+            await writer.drain()
+
+    finally:
+        writer.close()
+
+##########      Function that is used to serve queries on a local TCP port.        ##########
+
+### Each connection is handled by its own task, so several clients can be connected at once.
+async def ServeSocket(port, rank, executor, host = '127.0.0.1'):
+
+    server = await asyncio.start_server(lambda reader, writer: HandleConnection(reader, writer, rank, executor), host, port)
+
+    print ('Serving queries on %s:%d' % (host, port), file = sys.stderr)
+
+    async with server:
+        await server.serve_forever()
+
+##########      Function that is used to serve queries on stdin/stdout.        ##########
+
+async def ServeStdio(rank, executor):
+
+    loop    =   asyncio.get_running_loop()
+    reader  =   asyncio.StreamReader()
+
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+    while True:
+
+        line = await reader.readline()
+
+        if not line:
+            break
+
+        sys.stdout.write(await Answer(line, rank, executor))
+        sys.stdout.flush()
+
+##########      Function that is used to run the query server until it is stopped.        ##########
+
+### Input   :   address: local TCP port number, or '-' for the line protocol on stdin/stdout
+###             rank: function that returns the list of [match_score, document id] of a query string
+def Serve(address, rank):
+
+    executor = ThreadPoolExecutor(max_workers = 1)
+
+    try:
+
+        if address == '-':
+            asyncio.run(ServeStdio(rank, executor))
+
+        else:
+            asyncio.run(ServeSocket(int(address), rank, executor))
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        executor.shutdown()
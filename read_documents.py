@@ -1,110 +1,169 @@
+import re, sys, os, gzip, bz2, lzma
 
-import re, sys
+###     Document tags are found in large blocks of the collection with one pattern. Whitespace inside a tag never spans lines, so a tag is
+###     found on one line as the line by line search found it. The patterns are compiled for text and for bytes, so that the document store
+###     finds the byte offsets of the documents with the same parser.
+
+TAG_PATTERN     =   r'<document docid[^\S\n]*=[^\S\n]*(\d+)[^\S\n]*>|</document[^\S\n]*>'
+START_PATTERN   =   r'<document docid[^\S\n]*=[^\S\n]*(\d+)[^\S\n]*>'
+
+PATTERNS        =   {str: (re.compile(TAG_PATTERN), re.compile(START_PATTERN), '\n'),
+                     bytes: (re.compile(TAG_PATTERN.encode()), re.compile(START_PATTERN.encode()), b'\n')}
+
+BLOCK_SIZE      =   1 << 20                         ###     Count of characters (or bytes) read at once.
+COMPRESSED      =   {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open, '.lzma': lzma.open}
+
+### Output  :   list of the files of a collection: the file itself, or every file of a directory and its subdirectories in name order
+def CollectionFiles(path):
+    if not os.path.isdir(path):
+        return [path]
+    files = []
+    for directory, subdirectories, names in os.walk(path):
+        subdirectories.sort()
+        files.extend([os.path.join(directory, name) for name in sorted(names) if name[0] != '.'])
+    return files
+
+def IsCompressed(path):
+    return os.path.splitext(path)[1].lower() in COMPRESSED
+
+### Output  :   stream of a collection file, decompressed while it is read if it is compressed with gzip, bzip2 or xz
+def OpenCollection(path, mode = 'r'):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in COMPRESSED:
+        return COMPRESSED[extension](path, mode + 't' if mode == 'r' else mode)
+    return open(path, mode)
+
+### Output  :   text of the bytes of a document, with the line ends that a text stream reads
+def DecodeText(data):
+    return data.decode('utf-8', 'replace').replace('\r\n', '\n')
+
+### Input   :   stream: text or binary stream of a collection file
+### Output  :   iterator of (docid, offset, text) of each document. The text is the lines between the start tag line and the end tag line, sliced
+###             from the block, and offset is where it begins in the stream (in bytes for a binary stream).
+###             As in the line by line parser, the rest of a tag line is ignored, a start tag wins over an end tag on the same line, and a document
+###             without an end tag is dropped when the next document starts.
+def ParseCollection(stream, block_size = BLOCK_SIZE):
+    block = stream.read(block_size)
+    tags, start_tag, newline = PATTERNS[type(block)]
+    text = block[:0]
+    base = 0                                        ###     Offset of the first character of text in the stream.
+    scan = 0                                        ###     Position from which tags are searched. Lines before it are done.
+    reading = False
+    doc_start = 0
+    docid = 0
+    while True:
+        text += block
+        end = text.rfind(newline) + 1 if block else len(text)   ###     Only whole lines are searched until the last block.
+        for match in tags.finditer(text, scan, end):
+            if match.start() < scan:
+                continue
+            line_start = text.rfind(newline, 0, match.start()) + 1
+            line_end = text.find(newline, match.end(), end) + 1 or end
+            if match.group(1) is not None:
+                reading = True
+                docid = int(match.group(1))
+                doc_start = line_end
+            elif start_tag.search(text, match.end(), line_end):
+                continue
+            elif reading:
+                reading = False
+                yield docid, base + doc_start, text[doc_start:line_start]
+            scan = line_end
+        if not block:
+            break
+        scan = max(scan, end)
+        keep = doc_start if reading else scan       ###     Only the text of the open document and the unsearched lines are kept for the next block.
+        text = text[keep:]
+        base += keep
+        scan -= keep
+        doc_start -= keep
+        block = stream.read(block_size)
 
 class ReadDocuments:
     def __init__(self,file):
         self.collection_file = file
 
+    ###     A file that is not compressed is parsed in bytes, so each document also has the byte offset and length of its text in the file.
+
     def __iter__(self):
-        startdoc = re.compile('<document docid\s*=\s*(\d+)\s*>')
-        enddoc = re.compile('</document\s*>')
-        readingDoc = False
-        with open(self.collection_file) as input_fs:
-            for line in input_fs:
-                m = startdoc.search(line)
-                if m:
-                    readingDoc = True
-                    doc = Document()
-                    doc.docid = int(m.group(1))
-                elif enddoc.search(line):
-                    readingDoc = False
-                    yield doc
-                elif readingDoc:
-                    doc.lines.append(line)
+        for path in CollectionFiles(self.collection_file):
+            if IsCompressed(path):
+                with OpenCollection(path) as input_fs:
+                    for docid, offset, text in ParseCollection(input_fs):
+                        yield Document(docid, text, path)
+            else:
+                with open(path, 'rb') as input_fs:
+                    for docid, offset, data in ParseCollection(input_fs):
+                        yield Document(docid, DecodeText(data), path, offset, len(data))
 
 class ReadIndexFile:
+    SECTIONS = ('documentcount', 'collection', 'document', 'query')
+
     def __init__(self, file):
         self.collection_file = file
+        self.sections = {}
 
-    def ReadDocumentCount(self):
-        startdoc = re.compile('<documentcount>')
-        enddoc = re.compile('</documentcount>')
-        readingDoc = False
+    def Load(self, sections = SECTIONS):
+        wanted = [name for name in sections if name not in self.sections]
+        if len(wanted) == 0:
+            return
+        index = {'documentcount': 0, 'collection': {}, 'document': [], 'query': []}
+        counts = IntegerCache()
         with open(self.collection_file) as input_fs:
-            for line in input_fs:
-                m = startdoc.search(line)
-                if m:
-                    readingDoc = True
-                elif enddoc.search(line):
-                    readingDoc = False
-                elif readingDoc:
-                    return line
-        return 0
+            text = input_fs.read()
+        position = text.find('<')
+        while position >= 0:
+            tag_end = text.index('>', position)
+            name = text[position + 1:tag_end]
+            body_end = text.index('</' + name + '>', tag_end)
+            if name in wanted:
+                body = text[tag_end + 2:body_end - 1]
+                if name == 'documentcount':
+                    index[name] = int(body)
+                else:
+                    pairs = body.replace('\n', ' ').split(' ') if body else []
+                    section = dict(zip(pairs[0::2], map(counts.__getitem__, pairs[1::2])))
+                    if name == 'collection':
+                        index[name] = section
+                    else:
+                        index[name].append(section)
+            position = text.find('<', body_end + len(name) + 3)
+        for name in wanted:
+            self.sections[name] = index[name]
+
+    def ReadDocumentCount(self):
+        self.Load(['documentcount'])
+        return self.sections['documentcount']
 
     def ReadCollectionIndex(self):
-        startdoc = re.compile('<collection>')
-        enddoc = re.compile('</collection>')
-        readingDoc = False
-        index = {}
-        with open(self.collection_file) as input_fs:
-            for line in input_fs:
-                m = startdoc.search(line)
-                if m:
-                    readingDoc = True
-                elif enddoc.search(line):
-                    readingDoc = False
-                elif readingDoc:
-                    tokens = line.split(' ')
-                    index[tokens[0]] = (int)(tokens[1].split('\n')[0])
-        return index
+        self.Load(['collection'])
+        return self.sections['collection']
 
     def ReadDocumentIndex(self):
-        startdoc = re.compile('<document>')
-        enddoc = re.compile('</document>')
-        readingDoc = False
-        index = []
-        with open(self.collection_file) as input_fs:
-            doc_index = {}
-            for line in input_fs:
-                m = startdoc.search(line)
-                if m:
-                    readingDoc = True
-                    doc_index = {}
-                elif enddoc.search(line):
-                    readingDoc = False
-                    index.append(doc_index)
-                elif readingDoc:
-                    tokens = line.split(' ')
-                    doc_index[tokens[0].split('\n')[0]] = (int)(tokens[1].split('\n')[0])
-        return index
+        self.Load(['document'])
+        return self.sections['document']
 
     def ReadQueryIndex(self):
-        startdoc = re.compile('<query>')
-        enddoc = re.compile('</query>')
-        readingDoc = False
-        index = []
-        with open(self.collection_file) as input_fs:
-            doc_index = {}
-            for line in input_fs:
-                m = startdoc.search(line)
-                if m:
-                    readingDoc = True
-                    doc_index = {}
-                elif enddoc.search(line):
-                    readingDoc = False
-                    index.append(doc_index)
-                elif readingDoc:
-                    tokens = line.split(' ')
-                    doc_index[tokens[0].split('\n')[0]] = (int)(tokens[1].split('\n')[0])
-        return index
+        self.Load(['query'])
+        return self.sections['query']
+
+class IntegerCache(dict):
+    def __missing__(self, text):
+        value = self[text] = int(text)
+        return value
 
 class Document:
-    def __init__(self):
-        self.docid = 0
-        self.lines = []
+    def __init__(self, docid = 0, text = '', path = None, offset = None, length = 0):
+        self.docid = docid
+        self.text = text
+        self.path = path                            ###     Collection file of the document.
+        self.offset = offset                        ###     Byte offset of the text in the file (None if the file is compressed).
+        self.length = length                        ###     Byte length of the text.
 
-    def printDoc(self,out = sys.stdout):
-        print >> out, "\n[DOCID: %d]" % self.docid
-        for line in self.lines:
-            print >> out, line,
+    @property
+    def lines(self):                                ###     Lines are split from the text only when they are asked for.
+        return [line + '\n' for line in self.text.split('\n')[:-1]]
 
+    def printDoc(self,out = sys.stdout):
+        print ("\n[DOCID: %d]" % self.docid, file = out)
+        out.write(self.text)
@@ -0,0 +1,87 @@
+import os
+from collections import OrderedDict
+
+##########      Function that is used to get the generation of an index.        ##########
+###
+###     The generation changes whenever one of the files of the index is rewritten, so cached results of an older index are never used.
+
+def IndexGeneration(index_path):
+    generation = []
+    for path in (index_path, index_path + '.manifest', index_path + '.norms'):
+        if os.path.exists(path):
+            status = os.stat(path)
+            generation.append('%d:%d' % (status.st_mtime_ns, status.st_size))
+        else:
+            generation.append('-')
+    return ','.join(generation)
+
+##########      Class that is used to cache the rankings of queries with LRU eviction.        ##########
+
+### Input   :   capacity: count of rankings kept in the cache (the least recently used ranking is evicted first)
+###             generation: generation of the index whose rankings are cached
+### The key of a ranking is the normalized query: its sorted term frequency bag after stopword removal and stemming, together with
+### the weighting type and the count of documents retrieved. So queries that differ only in word order or stopwords share a ranking.
+class ResultCache:
+    def __init__(self, capacity, generation):
+        self.capacity = capacity
+        self.generation = generation
+        self.rankings = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.modified = False
+
+    def Key(self, token_list, weighting_type, count):
+        return (weighting_type, count, tuple(sorted(token_list.items())))
+
+    def Get(self, key):
+        ranking = self.rankings.get(key)
+        if ranking is None:
+            self.misses += 1
+            return None
+        self.rankings.move_to_end(key)
+        self.hits += 1
+        return ranking
+
+    def Put(self, key, ranking):
+        if self.capacity <= 0:
+            return
+        self.rankings[key] = ranking
+        self.rankings.move_to_end(key)
+        while len(self.rankings) > self.capacity:
+            self.rankings.popitem(last = False)
+        self.modified = True
+
+    ### The file stores the generation of the index in its first line and then two lines per ranking, from the least recently used:
+    ### "weighting_type count token frequency token frequency ..." and "document_id score document_id score ...".
+    def Load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, newline = '\n') as input_fs:
+            if input_fs.readline()[:-1] != self.generation:          ###     The index has changed since the rankings were cached.
+                self.modified = True
+                return
+            while True:
+                key_line = input_fs.readline()
+                ranking_line = input_fs.readline()
+                if not ranking_line:
+                    break
+                fields = key_line[:-1].split(' ')
+                terms = fields[2:]
+                values = ranking_line[:-1].split(' ') if ranking_line != '\n' else []
+                key = (fields[0], int(fields[1]), tuple([(terms[i], int(terms[i + 1])) for i in range(0, len(terms), 2)]))
+                self.rankings[key] = [[float(values[i + 1]), int(values[i])] for i in range(0, len(values), 2)]
+        while len(self.rankings) > self.capacity:
+            self.rankings.popitem(last = False)
+
+    def Save(self, path):
+        if not self.modified and os.path.exists(path):
+            return
+        with open(path, 'w', newline = '\n') as f:
+            f.write(self.generation)
+            f.write('\n')
+            for (weighting_type, count, terms), ranking in self.rankings.items():
+                f.write(' '.join([weighting_type, str(count)] + ['%s %d' % term for term in terms]))
+                f.write('\n')
+                f.write(' '.join(['%d %r' % (doc_id, match_score) for match_score, doc_id in ranking]))
+                f.write('\n')
+        self.modified = False
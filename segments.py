@@ -0,0 +1,407 @@
+import os, math
+from array import array
+from binary_index import ReadBinaryIndexFile, WriteBinaryIndexFile
+
+##########      Segment-based incremental index.        ##########
+###
+###     The index file written by an indexing run is the first segment. Documents that are added later are written in new segment
+###     files next to it, and deleted documents are recorded as tombstones. The manifest file lists the segments and the tombstones:
+###
+###         <segments>
+###         index.bin 0 3204                (file name, index of its first document, count of its documents)
+###         index.bin.1 3204 25
+###         </segments>
+###         <deleted>
+###         17                              (document id of a deleted document)
+###         </deleted>
+###
+###     Document ids never change. The tf.idf magnitudes of the documents depend on the statistics of the whole collection, so they
+###     are recalculated after each update and stored in the norms file.
+
+MAX_SEGMENTS    =   8                                   ###     Segments are merged automatically when an update makes more segments than this.
+
+def ManifestPath(index_path):
+    return index_path + '.manifest'
+
+def NormsPath(index_path):
+    return index_path + '.norms'
+
+def IsSegmentedIndex(index_path):
+    return os.path.exists(ManifestPath(index_path))
+
+##########      Class that is used to read and write the manifest of a segmented index.        ##########
+
+class Manifest:
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.directory = os.path.dirname(index_path)
+        self.segments = []
+        self.deleted = set()
+        if IsSegmentedIndex(index_path):
+            self.Read()
+        else:
+            index = ReadBinaryIndexFile(index_path)             ###     A plain index file is the only segment.
+            self.segments.append([os.path.basename(index_path), 0, index.document_count])
+            index.Close()
+
+    def Read(self):
+        reading = None
+        with open(ManifestPath(self.index_path)) as input_fs:
+            for line in input_fs:
+                line = line.split('\n')[0]
+                if line == '<segments>' or line == '<deleted>':
+                    reading = line
+                elif line[:2] == '</':
+                    reading = None
+                elif reading == '<segments>':
+                    name, base, count = line.split(' ')
+                    self.segments.append([name, int(base), int(count)])
+                elif reading == '<deleted>':
+                    self.deleted.add(int(line))
+
+    def Write(self):
+        with open(ManifestPath(self.index_path), 'w') as f:
+            f.write('<segments>\n')
+            for name, base, count in self.segments:
+                f.write('%s %d %d\n' % (name, base, count))
+            f.write('</segments>\n')
+            f.write('<deleted>\n')
+            for doc_id in sorted(self.deleted):
+                f.write('%d\n' % doc_id)
+            f.write('</deleted>\n')
+
+    def SegmentPath(self, name):
+        return os.path.join(self.directory, name)
+
+    def NewSegmentName(self):
+        names = set([name for name, base, count in self.segments])
+        number = len(self.segments)
+        while os.path.basename(self.index_path) + '.' + str(number) in names or os.path.exists(self.SegmentPath(os.path.basename(self.index_path) + '.' + str(number))):
+            number += 1
+        return os.path.basename(self.index_path) + '.' + str(number)
+
+    def DocumentCount(self):
+        if len(self.segments) == 0:
+            return 0
+        name, base, count = self.segments[-1]
+        return base + count
+
+##########      Function that is used to write a segment file from document vectors.        ##########
+
+### Input   :   path: filename(including or not path) of the segment file
+###             token_lists: list of term frequency dictionary of each document in the segment
+###             qry_tkn_idx: list of term frequency dictionary of each query (only the first segment stores queries)
+### The statistics of the segment itself are stored, so a segment file is also a complete binary index of its documents.
+def WriteSegmentFile(path, token_lists, qry_tkn_idx = []):
+
+    colct_tkn_idx   =   {}
+    inv_tkn_idx     =   {}
+    document_count  =   len(token_lists)
+
+    for doc_index in range(document_count):
+
+        for token in token_lists[doc_index]:
+
+            if token not in colct_tkn_idx:
+
+                colct_tkn_idx[token] = 0
+                inv_tkn_idx[token] = []
+
+            colct_tkn_idx[token] += 1
+            inv_tkn_idx[token].append((doc_index, token_lists[doc_index][token]))
+
+    live_count      =   len([token_list for token_list in token_lists if len(token_list) > 0])
+    idf_weights     =   {}
+
+    for token in colct_tkn_idx:
+        idf_weights[token] = math.pow(math.log(1 + live_count / colct_tkn_idx[token]), 2)
+
+    doc_norms = {'binary': [], 'frequency': [], 'tf.idf': []}
+
+    for token_list in token_lists:
+
+        doc_norms['binary'].append(math.sqrt(len(token_list)))
+        doc_norms['frequency'].append(math.sqrt(sum(token_list.values())))
+        doc_norms['tf.idf'].append(math.sqrt(TfIdfMagnitude(token_list, live_count, colct_tkn_idx)))
+
+    WriteBinaryIndexFile(path, document_count, colct_tkn_idx, token_lists, qry_tkn_idx, inv_tkn_idx, idf_weights, doc_norms)
+
+##########      Function that is used to calculate the squared tf.idf magnitude of a document vector.        ##########
+
+def TfIdfMagnitude(token_list, document_count, colct_tkn_idx):
+
+    magnitude = 0
+
+    for token in token_list:
+        magnitude += math.pow(math.log(1 + token_list[token]) * math.log(1 + document_count / colct_tkn_idx[token]), 2)
+
+    return magnitude
+
+##########      Class that is used to read a segmented index as one index.        ##########
+
+### It provides the same reading methods as ReadBinaryIndexFile. Statistics are those of the live documents of all segments.
+class ReadSegmentedIndex:
+    def __init__(self, file):
+        self.collection_file = file
+        self.manifest = Manifest(file)
+        self.segments = [(ReadBinaryIndexFile(self.manifest.SegmentPath(name)), base) for name, base, count in self.manifest.segments]
+        self.deleted = self.manifest.deleted
+        self.total_count = self.manifest.DocumentCount()
+        self.document_count = self.total_count - len(self.deleted)
+        self.deleted_colct = {}                                 ###     Document frequencies of the terms of the deleted documents.
+        for doc_id in self.deleted:
+            for token in self.DocumentVector(doc_id - 1):
+                self.deleted_colct[token] = self.deleted_colct.get(token, 0) + 1
+
+    def Load(self, sections = None):
+        pass
+
+    def Close(self):
+        for segment, base in self.segments:
+            segment.Close()
+
+    def Locate(self, doc_index):
+        for segment, base in self.segments:
+            if base <= doc_index < base + segment.document_count:
+                return segment, doc_index - base
+        raise IndexError(doc_index)
+
+    def DocumentVector(self, doc_index):
+        segment, local_index = self.Locate(doc_index)
+        return segment.ReadDocumentIndex()[local_index]
+
+    def DocumentFrequency(self, token):
+        frequency = 0
+        for segment, base in self.segments:
+            term_id = segment.FindTerm(token)
+            if term_id >= 0:
+                frequency += segment.Term(term_id)[2]
+        return frequency - self.deleted_colct.get(token, 0)
+
+    def Postings(self, token):
+        postings = []
+        for segment, base in self.segments:
+            term_id = segment.FindTerm(token)
+            if term_id >= 0:
+                postings.extend([(base + doc_index, frequency) for doc_index, frequency in segment.Postings(term_id) if base + doc_index + 1 not in self.deleted])
+        return postings
+
+    def StreamPostings(self, token):
+        for segment, base in self.segments:
+            term_id = segment.FindTerm(token)
+            if term_id >= 0:
+                for doc_index, frequency in segment.StreamPostings(term_id):
+                    if base + doc_index + 1 not in self.deleted:
+                        yield base + doc_index, frequency
+
+    def ReadDocumentCount(self):
+        return self.document_count
+
+    def ReadCollectionIndex(self):
+        return SegmentedCollectionIndex(self)
+
+    def ReadInvertedIndex(self):
+        return SegmentedInvertedIndex(self)
+
+    def ReadDocumentIndex(self):
+        return SegmentedDocumentIndex(self)
+
+    def ReadQueryIndex(self):
+        return self.segments[0][0].ReadQueryIndex()
+
+    def ReadIdfWeights(self):
+        return SegmentedIdfWeights(self)
+
+    def ReadDocumentNorms(self):
+        return SegmentedDocumentNorms(self)
+
+    def ReadPostingWeights(self):
+        return {}                                               ###     Stored posting weights use the statistics of one segment, so they are calculated on demand.
+
+    def ReadDeletedDocuments(self):
+        return self.deleted
+
+##########      Read-only views of the segmented index that behave like the in-memory index structures.        ##########
+
+class SegmentedCollectionIndex:
+    def __init__(self, index):
+        self.index = index
+        self.frequencies = {}
+
+    def Frequency(self, token):
+        if token not in self.frequencies:
+            self.frequencies[token] = self.index.DocumentFrequency(token)
+        return self.frequencies[token]
+
+    def __contains__(self, token):
+        return self.Frequency(token) > 0
+
+    def __getitem__(self, token):
+        if not token in self:
+            raise KeyError(token)
+        return self.Frequency(token)
+
+    def get(self, token, default = None):
+        return self[token] if token in self else default
+
+    def __iter__(self):
+        seen = set()
+        for segment, base in self.index.segments:
+            for token in segment.ReadCollectionIndex():
+                if token not in seen:
+                    seen.add(token)
+                    if token in self:
+                        yield token
+
+    def __len__(self):
+        return len([token for token in self])
+
+class SegmentedInvertedIndex(SegmentedCollectionIndex):
+    def __getitem__(self, token):
+        if not token in self:
+            raise KeyError(token)
+        return self.index.Postings(token)
+
+    def Stream(self, token):
+        if not token in self:
+            raise KeyError(token)
+        return self.index.StreamPostings(token)
+
+class SegmentedIdfWeights(SegmentedCollectionIndex):
+    def __getitem__(self, token):
+        if not token in self:
+            raise KeyError(token)
+        return math.pow(math.log(1 + self.index.document_count / self.Frequency(token)), 2)
+
+class SegmentedDocumentIndex:
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.total_count
+
+    def __getitem__(self, doc_index):
+        if doc_index + 1 in self.index.deleted:
+            return {}
+        return self.index.DocumentVector(doc_index)
+
+    def __iter__(self):
+        for doc_index in range(self.index.total_count):
+            yield self[doc_index]
+
+class SegmentedDocumentNorms:
+    def __init__(self, index):
+        self.index = index
+        self.norms = {}
+
+    def __getitem__(self, weighting_type):
+        if weighting_type not in self.norms:
+            norms = array('d')
+            if weighting_type == 'tf.idf':                      ###     tf.idf magnitudes depend on the whole collection, so they are read from the norms file.
+                with open(NormsPath(self.index.collection_file), 'rb') as input_fs:
+                    norms.frombytes(input_fs.read())
+            else:
+                for segment, base in self.index.segments:
+                    norms.extend(segment.ReadDocumentNorms()[weighting_type])
+            self.norms[weighting_type] = norms
+        return self.norms[weighting_type]
+
+##########      Function that is used to store the tf.idf magnitudes of all documents of a segmented index.        ##########
+
+def WriteNormsFile(index_path):
+
+    index           =   ReadSegmentedIndex(index_path)
+    colct_tkn_idx   =   index.ReadCollectionIndex()
+    norms           =   array('d')
+
+    for token_list in index.ReadDocumentIndex():
+        norms.append(math.sqrt(TfIdfMagnitude(token_list, index.document_count, colct_tkn_idx)))
+
+    index.Close()
+
+    with open(NormsPath(index_path), 'wb') as f:
+        f.write(norms.tobytes())
+
+##########      Function that is used to add documents to an index as a new segment.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+###             token_lists: list of term frequency dictionary of each new document
+### Output  :   list of document ids given to the new documents
+def AddSegment(index_path, token_lists):
+
+    manifest    =   Manifest(index_path)
+    base        =   manifest.DocumentCount()
+    name        =   manifest.NewSegmentName()
+
+    WriteSegmentFile(manifest.SegmentPath(name), token_lists)
+    manifest.segments.append([name, base, len(token_lists)])
+    manifest.Write()
+
+    if len(manifest.segments) > MAX_SEGMENTS:
+        MergeSegments(index_path)
+
+    else:
+        WriteNormsFile(index_path)
+
+    return list(range(base + 1, base + len(token_lists) + 1))
+
+##########      Function that is used to mark documents as deleted.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+###             doc_ids: list of document ids to delete
+def DeleteDocuments(index_path, doc_ids):
+
+    manifest = Manifest(index_path)
+
+    for doc_id in doc_ids:
+
+        if doc_id < 1 or doc_id > manifest.DocumentCount():
+            raise Exception('ERROR: no such document id:<%d>' % doc_id)
+
+        manifest.deleted.add(doc_id)
+
+    manifest.Write()
+    WriteNormsFile(index_path)
+
+##########      Function that is used to merge all segments into one segment.        ##########
+
+### Postings of the deleted documents are dropped. Deleted documents keep their ids as empty document vectors and stay in the tombstones.
+def MergeSegments(index_path):
+
+    index           =   ReadSegmentedIndex(index_path)
+    token_lists     =   [token_list for token_list in index.ReadDocumentIndex()]
+    qry_tkn_idx     =   index.ReadQueryIndex()
+    manifest        =   index.manifest
+
+    index.Close()
+
+    WriteSegmentFile(index_path + '.merging', token_lists, qry_tkn_idx)
+    os.replace(index_path + '.merging', index_path)
+
+    for name, base, count in manifest.segments:
+
+        if manifest.SegmentPath(name) != index_path and os.path.exists(manifest.SegmentPath(name)):
+            os.remove(manifest.SegmentPath(name))
+
+    manifest.segments = [[os.path.basename(index_path), 0, len(token_lists)]]
+    manifest.Write()
+    WriteNormsFile(index_path)
+
+##########      Function that is used to remove the segments of an index before it is rebuilt.        ##########
+
+def RemoveSegments(index_path):
+
+    if not IsSegmentedIndex(index_path):
+        return
+
+    manifest = Manifest(index_path)
+
+    for name, base, count in manifest.segments:
+
+        if manifest.SegmentPath(name) != index_path and os.path.exists(manifest.SegmentPath(name)):
+            os.remove(manifest.SegmentPath(name))
+
+    os.remove(ManifestPath(index_path))
+
+    if os.path.exists(NormsPath(index_path)):
+        os.remove(NormsPath(index_path))
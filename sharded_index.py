@@ -0,0 +1,162 @@
+import os, math, heapq
+from itertools import islice
+from binary_index import WriteBinaryIndexFile, WEIGHTING_TYPES
+from postings_codec import DEFAULT_CODEC
+from result_cache import IndexGeneration
+
+##########      Document-partitioned index.        ##########
+###
+###     The documents of an index are partitioned into contiguous ranges, and each range is written in its own shard file. A shard file
+###     is a complete binary index of its documents: its postings use local document indexes and its collection index stores local
+###     document frequencies, but its idf weights and document magnitudes are those of the whole collection, so a shard scores its
+###     documents exactly as the single index does. The shard manifest lists the shards:
+###
+###         <generation>
+###         1700000000000000000:1499252,-,-     (generation of the index the shards were written from)
+###         </generation>
+###         <shards>
+###         index.bin.shard0 0 1602             (file name, index of its first document, count of its documents)
+###         index.bin.shard1 1602 1602
+###         </shards>
+
+def ShardManifestPath(index_path):
+    return index_path + '.shards'
+
+def IsShardedIndex(index_path):
+    return os.path.exists(ShardManifestPath(index_path))
+
+##########      Function that is used to read the shard manifest.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file
+### Output  :   list of [shard file path, index of its first document, count of its documents]
+def ReadShardManifest(index_path):
+
+    shards      =   []
+    generation  =   None
+    reading     =   None
+    directory   =   os.path.dirname(index_path)
+
+    with open(ShardManifestPath(index_path)) as input_fs:
+
+        for line in input_fs:
+
+            line = line.split('\n')[0]
+
+            if line == '<generation>' or line == '<shards>':
+                reading = line
+
+            elif line[:2] == '</':
+                reading = None
+
+            elif reading == '<generation>':
+                generation = line
+
+            elif reading == '<shards>':
+
+                name, base, count = line.split(' ')
+                shards.append([os.path.join(directory, name), int(base), int(count)])
+
+    if generation != IndexGeneration(index_path):
+        raise Exception('ERROR: the shards are older than the index, rebuild them with -i and -P options:<%s>' % index_path)
+
+    return shards
+
+##########      Function that is used to write the shards of an index.        ##########
+
+### Input   :   index_path: filename(including or not path) of the index file, which has to be written first
+###             shard_count: count of shards
+###             doc_tkn_idx: list of term frequency dictionary of each document
+###             idf_weights: dictionary of squared idf weight of each term in the whole collection
+###             doc_norms: dictionary of list of document magnitudes of each weighting type
+###             weights_store: whether the final weight of each posting is also stored in the shards
+###             codec: name of the codec of the postings lists
+def WriteShards(index_path, shard_count, doc_tkn_idx, idf_weights, doc_norms, weights_store = False, codec = DEFAULT_CODEC):
+
+    RemoveShards(index_path)
+
+    document_count  =   len(doc_tkn_idx)
+    shard_size      =   max(1, -(-document_count // shard_count))
+    shards          =   []
+
+    for base in range(0, document_count, shard_size):
+
+        count           =   min(shard_size, document_count - base)
+        name            =   '%s.shard%d' % (os.path.basename(index_path), len(shards))
+        token_lists     =   [doc_tkn_idx[doc_index] for doc_index in range(base, base + count)]
+        colct_tkn_idx   =   {}
+        inv_tkn_idx     =   {}
+
+        for doc_index in range(count):
+
+            for token, frequency in token_lists[doc_index].items():
+
+                if token not in colct_tkn_idx:
+
+                    colct_tkn_idx[token] = 0
+                    inv_tkn_idx[token] = []
+
+                colct_tkn_idx[token] += 1
+                inv_tkn_idx[token].append((doc_index, frequency))
+
+        norms = {}
+
+        for weighting_type in WEIGHTING_TYPES:
+            norms[weighting_type] = doc_norms[weighting_type][base:base + count]
+
+        posting_weights = None
+
+        if weights_store:                                       ###     Weights are calculated in the same way as PostingWeights() does.
+
+            posting_weights = {}
+
+            for token in inv_tkn_idx:
+                posting_weights[token] = [math.log(1 + frequency) * idf_weights[token] for doc_index, frequency in inv_tkn_idx[token]]
+
+        WriteBinaryIndexFile(os.path.join(os.path.dirname(index_path), name), count, colct_tkn_idx, token_lists, [], inv_tkn_idx, idf_weights, norms, posting_weights, codec)
+        shards.append([name, base, count])
+
+    with open(ShardManifestPath(index_path), 'w') as f:
+
+        f.write('<generation>\n')
+        f.write(IndexGeneration(index_path))
+        f.write('\n</generation>\n')
+        f.write('<shards>\n')
+
+        for name, base, count in shards:
+            f.write('%s %d %d\n' % (name, base, count))
+
+        f.write('</shards>\n')
+
+##########      Function that is used to remove the shards of an index before it is rebuilt.        ##########
+
+def RemoveShards(index_path):
+
+    if not IsShardedIndex(index_path):
+        return
+
+    directory = os.path.dirname(index_path)
+
+    with open(ShardManifestPath(index_path)) as input_fs:
+
+        for line in input_fs:
+
+            fields = line.split('\n')[0].split(' ')
+
+            if len(fields) == 3 and os.path.exists(os.path.join(directory, fields[0])):
+                os.remove(os.path.join(directory, fields[0]))
+
+    os.remove(ShardManifestPath(index_path))
+
+##########      Function that is used to merge the rankings of the shards of a query.        ##########
+
+### Input   :   rankings: list of [match_score, document id] lists of each shard in descending order, with global document ids
+###             count: count of documents retrieved (0 means that all documents are kept)
+### Output  :   list of [match_score, document id] in descending order, the same as the ranking of the single index
+def MergeRankings(rankings, count):
+
+    merged = heapq.merge(*rankings, reverse = True)
+
+    if count > 0:
+        return list(islice(merged, count))
+
+    return list(merged)
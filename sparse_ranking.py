@@ -0,0 +1,117 @@
+try:
+    import numpy
+    from scipy import sparse
+except ImportError:                                     ###     numpy and scipy are optional. They are only needed by the sparse engine.
+    numpy = None
+    sparse = None
+
+##########      Function that is used to check whether the sparse engine can be used.        ##########
+
+def SparseEngineAvailable():
+
+    return numpy is not None and sparse is not None
+
+##########      Function that is used to build the document-term weight matrix.        ##########
+
+### Input   :   inv_tkn_idx: dictionary of postings list of each term
+###             posting_weights: function that returns the list of final weights of the postings of a term
+###             doc_magnitudes: list of the magnitudes of the document vectors
+### Output  :   (dictionary of column index of each term, CSR matrix of shape (term count, document count))
+###             Each element is the weight of a posting divided by the magnitude of its document.
+def BuildTermDocumentMatrix(inv_tkn_idx, posting_weights, doc_magnitudes):
+
+    term_ids        =   {}
+    indptr          =   [0]
+    doc_indices     =   []
+    weights         =   []
+
+    for token in inv_tkn_idx:
+
+        term_ids[token] = len(term_ids)
+
+        for doc_index, frequency in inv_tkn_idx[token]:
+            doc_indices.append(doc_index)
+
+        weights.extend(posting_weights(token))
+        indptr.append(len(doc_indices))
+
+    doc_indices     =   numpy.array(doc_indices, dtype = numpy.int64)
+    magnitudes      =   numpy.asarray(doc_magnitudes, dtype = numpy.float64)
+    data            =   numpy.array(weights, dtype = numpy.float64) / magnitudes[doc_indices]
+
+    return term_ids, sparse.csr_matrix((data, doc_indices, numpy.array(indptr, dtype = numpy.int64)), shape = (len(term_ids), len(magnitudes)))
+
+##########      Function that is used to build the sparse query matrix.        ##########
+
+### Input   :   qry_tkn_idx: list of term frequency dictionary of each query
+###             term_ids: dictionary of column index of each term
+### Output  :   CSR matrix of shape (query count, term count). A query term contributes once regardless of its frequency, as in DocumentRanking.
+def BuildQueryMatrix(qry_tkn_idx, term_ids):
+
+    indptr          =   [0]
+    term_indices    =   []
+
+    for token_list in qry_tkn_idx:
+
+        for token in token_list:
+
+            if token in term_ids:
+                term_indices.append(term_ids[token])
+
+        indptr.append(len(term_indices))
+
+    data = numpy.ones(len(term_indices), dtype = numpy.float64)
+
+    return sparse.csr_matrix((data, numpy.array(term_indices, dtype = numpy.int64), numpy.array(indptr, dtype = numpy.int64)), shape = (len(qry_tkn_idx), len(term_ids)))
+
+##########      Function that is used to rank documents for a batch of queries with sparse matrix products.        ##########
+
+### Input   :   qry_tkn_idx: list of term frequency dictionary of each query
+###             inv_tkn_idx: dictionary of postings list of each term
+###             posting_weights: function that returns the list of final weights of the postings of a term
+###             doc_magnitudes: list of the magnitudes of the document vectors
+###             qry_magnitudes: list of the magnitudes of the query vectors
+###             count: count of documents retrieved per query
+###             deleted_doc_ids: set of the ids of the deleted documents, which are never ranked
+###             batch_size: count of queries whose dense score rows are kept in memory at once
+###             matrix: (term_ids, term_doc_matrix) returned by BuildTermDocumentMatrix, so that the batches of a query stream share it (None means that it is built here)
+### Output  :   list of [match_score, document id] lists of each query in descending order. Ties are broken by descending document id as DocumentRanking does.
+def SparseDocumentRanking(qry_tkn_idx, inv_tkn_idx, posting_weights, doc_magnitudes, qry_magnitudes, count, deleted_doc_ids = (), batch_size = 256, matrix = None):
+
+    if not SparseEngineAvailable():
+        raise Exception('ERROR: the sparse engine requires numpy and scipy')
+
+    if matrix is None:
+        matrix = BuildTermDocumentMatrix(inv_tkn_idx, posting_weights, doc_magnitudes)
+
+    term_ids, term_doc_matrix = matrix
+    query_matrix    =   BuildQueryMatrix(qry_tkn_idx, term_ids)
+    magnitudes      =   numpy.asarray(qry_magnitudes, dtype = numpy.float64)
+    doc_count       =   term_doc_matrix.shape[1]
+    count           =   min(count, doc_count - len(deleted_doc_ids))
+    doc_ids         =   numpy.arange(1, doc_count + 1)
+    deleted_indices =   numpy.array(sorted(deleted_doc_ids), dtype = numpy.int64) - 1
+    sorted_doc_ids  =   []
+
+    for start in range(0, len(qry_tkn_idx), batch_size):
+
+        scores = (query_matrix[start:start + batch_size] @ term_doc_matrix).toarray()
+        batch_magnitudes = magnitudes[start:start + batch_size, None]
+        scores = numpy.divide(scores, batch_magnitudes, out = numpy.zeros_like(scores), where = batch_magnitudes != 0)
+
+        scores[:, deleted_indices] = -numpy.inf                 ###     Deleted documents are ranked after every live document and cut off.
+
+        for row in scores:
+
+            ###     argpartition selects the candidates in linear time. Documents tied with the k-th score are kept, so that ties can be broken by document id.
+
+            if count < doc_count - len(deleted_indices):
+                kth_score = row[numpy.argpartition(-row, count - 1)[count - 1]]
+                candidates = numpy.flatnonzero(row >= kth_score)
+            else:
+                candidates = numpy.flatnonzero(row > -numpy.inf)
+
+            order = numpy.lexsort((-doc_ids[candidates], -row[candidates]))[:count]
+            sorted_doc_ids.append([[float(row[doc_index]), int(doc_ids[doc_index])] for doc_index in candidates[order]])
+
+    return sorted_doc_ids
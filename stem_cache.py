@@ -0,0 +1,54 @@
+import os
+
+##########      Class that is used to memoize stemming of lowercased tokens.        ##########
+
+### nltk is imported only when a token that is not in the cache has to be stemmed.
+class StemCache:
+    def __init__(self, stems = None):
+        self.stems = dict(stems) if stems else {}
+        self.added = {}
+        self.modified = False
+        self.stemmer = None
+        self.computed = 0                               ###     Count of tokens stemmed by nltk, including the stems received from other processes.
+
+    def Stem(self, token):
+        if token in self.stems:
+            return self.stems[token]
+        if self.stemmer is None:
+            from nltk.stem import PorterStemmer
+            self.stemmer = PorterStemmer()
+        stem = self.stems[token] = self.added[token] = self.stemmer.stem(token)
+        self.modified = True
+        self.computed += 1
+        return stem
+
+    def TakeAdded(self):
+        added = self.added
+        self.added = {}
+        return added
+
+    def Update(self, stems):
+        for token in stems:
+            if token not in self.stems:
+                self.stems[token] = self.added[token] = stems[token]
+                self.modified = True
+                self.computed += 1
+
+    def Load(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, newline = '\n') as input_fs:
+            for line in input_fs:
+                token, stem = line[:-1].split(' ')
+                self.stems[token] = stem
+
+    def Save(self, path):
+        if not self.modified and os.path.exists(path):
+            return
+        with open(path, 'w', newline = '\n') as f:
+            for token in self.stems:
+                f.write(token)
+                f.write(' ')
+                f.write(self.stems[token])
+                f.write('\n')
+        self.modified = False
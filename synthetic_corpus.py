@@ -0,0 +1,166 @@
+"""\
+--------------------------------------------------------------------------------
+    USE: python <PROGNAME> (options)
+    ACTION: Writes a synthetic document collection and query set in the format
+            of documents.txt and queries.txt, at a multiple of the size of the
+            source collection and following its vocabulary distribution.
+    OPTIONS:
+        -h : print this help message
+        -d <filename> : name of the source document collection file.(default value is documents.txt)
+        -q <filename> : name of the source query file.(default value is queries.txt)
+        -x <scale> : count of documents as a multiple of the source collection.(default value is 1)
+        -n <count> : count of queries.(default value is the count of source queries)
+        -o <directory> : directory to which documents.txt and queries.txt are written.(default value is synthetic)
+        -r <seed> : seed of the random generator.(default value is 1)
+--------------------------------------------------------------------------------
+"""
+
+import getopt, sys, os, re, math, random
+from collections import Counter
+from read_documents import ReadDocuments
+
+RARE_COUNT      =   2                                   ###     Words that occur at most this many times in the source get spelling variants in larger collections.
+WORD_STEM       =   re.compile(r'^(\W*\w+)')             ###     Variant number is added after the first run of word characters, so that it stays in the same token.
+
+##########      Class that is used to hold the empirical distributions of a collection.        ##########
+
+### Input   :   documents: list of documents. Each document is the list of its lines.
+### Words are the whitespace separated strings of the lines, with their case and punctuation, so the tokenizer sees the same kind of text.
+class CorpusModel:
+    def __init__(self, documents):
+        words = Counter()
+        self.line_counts = []
+        self.line_lengths = []
+        for lines in documents:
+            self.line_counts.append(len(lines))
+            for line in lines:
+                line_words = line.split()
+                self.line_lengths.append(len(line_words))
+                words.update(line_words)
+        self.words = list(words)
+        self.rare = set([word for word in words if words[word] <= RARE_COUNT])
+        self.cum_weights = []
+        total = 0
+        for word in self.words:
+            total += words[word]
+            self.cum_weights.append(total)
+
+    ### Output  :   list of lines of a new document
+    ###             variants: count of spellings of each rare word. More variants make the vocabulary grow with the collection as Heaps' law predicts.
+    def Document(self, generator, variants = 1):
+        line_lengths = generator.choices(self.line_lengths, k = generator.choice(self.line_counts))
+        words = generator.choices(self.words, cum_weights = self.cum_weights, k = sum(line_lengths))
+        if variants > 1:
+            for i in range(len(words)):
+                if words[i] in self.rare:
+                    variant = generator.randrange(variants)
+                    if variant > 0:
+                        words[i] = WORD_STEM.sub(r'\g<1>' + str(variant), words[i], 1)
+        lines = []
+        position = 0
+        for line_length in line_lengths:
+            lines.append(' '.join(words[position:position + line_length]) + '\n')
+            position += line_length
+        return lines
+
+##########      Function that is used to write a collection file.        ##########
+
+### Input   :   path: filename(including or not path) of the collection file
+###             title: title of the collection
+###             documents: iterable of documents. Each document is the list of its lines.
+def WriteCollection(path, title, documents):
+
+    with open(path, 'w') as f:
+
+        f.write('<collection title=%s>\n\n' % title)
+
+        docid = 0
+
+        for lines in documents:
+
+            docid += 1
+            f.write('<document docid=%d>\n' % docid)
+            f.write(''.join(lines))
+            f.write('</document>\n\n')
+
+##########      Function that is used to generate a synthetic collection and query set.        ##########
+
+### Input   :   doc_file_name: name of the source document collection file
+###             qry_file_name: name of the source query file
+###             scale: count of documents as a multiple of the source collection
+###             directory: directory to which documents.txt and queries.txt are written
+###             query_count: count of queries (0 means the count of source queries)
+###             seed: seed of the random generator
+### Output  :   (path of the document collection file, path of the query file)
+def GenerateCorpus(doc_file_name, qry_file_name, scale, directory, query_count = 0, seed = 1):
+
+    generator       =   random.Random(seed)
+    documents       =   [doc.lines for doc in ReadDocuments(doc_file_name)]
+    queries         =   [doc.lines for doc in ReadDocuments(qry_file_name)]
+    doc_model       =   CorpusModel(documents)
+    qry_model       =   CorpusModel(queries)
+    variants        =   max(1, int(round(math.sqrt(scale))))
+    doc_count       =   int(round(len(documents) * scale))
+    title           =   'CACM_x%s' % ('%g' % scale)
+
+    if query_count <= 0:
+        query_count = len(queries)
+
+    os.makedirs(directory, exist_ok = True)
+
+    doc_path        =   os.path.join(directory, 'documents.txt')
+    qry_path        =   os.path.join(directory, 'queries.txt')
+
+    WriteCollection(doc_path, title, (doc_model.Document(generator, variants) for i in range(doc_count)))
+    WriteCollection(qry_path, title + '_queries', (qry_model.Document(generator) for i in range(query_count)))
+
+    return doc_path, qry_path
+
+def main():
+
+    doc_file_name   =   'documents.txt'
+    qry_file_name   =   'queries.txt'
+    scale           =   1
+    query_count     =   0
+    directory       =   'synthetic'
+    seed            =   1
+
+    opts, args = getopt.getopt(sys.argv[1:], "hd:q:x:n:o:r:")
+
+    for opt, arg in opts:
+
+        if opt == '-h':
+            print (__doc__.replace('<PROGNAME>', sys.argv[0], 1))
+            exit()
+
+        elif opt == '-d':
+            doc_file_name = arg
+
+        elif opt == '-q':
+            qry_file_name = arg
+
+        elif opt == '-x':
+
+            scale = float(arg)
+
+            if scale <= 0:
+
+                print ("\nScale must be a positive number.")
+                exit(1)
+
+        elif opt == '-n':
+            query_count = int(arg)
+
+        elif opt == '-o':
+            directory = arg
+
+        elif opt == '-r':
+            seed = int(arg)
+
+    doc_path, qry_path = GenerateCorpus(doc_file_name, qry_file_name, scale, directory, query_count, seed)
+
+    print ('Documents :', doc_path)
+    print ('Queries   :', qry_path)
+
+if __name__ == "__main__":
+    main()
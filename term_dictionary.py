@@ -0,0 +1,148 @@
+from array import array
+from bisect import bisect_left
+
+##########      Class that is used to map each term to an integer id.        ##########
+
+### Ids are given in order of first occurrence, so iterating the terms by id gives the same order as a dictionary keyed by term.
+class TermDictionary:
+    def __init__(self):
+        self.ids = {}
+        self.tokens = []
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def Id(self, token):
+        term_id = self.ids.get(token)
+        if term_id is None:
+            term_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return term_id
+
+    def Find(self, token):
+        return self.ids.get(token, -1)
+
+    def Token(self, term_id):
+        return self.tokens[term_id]
+
+##########      Class that is used to store the document frequency of each term by term id.        ##########
+
+### It behaves like the dictionary of document frequency of each term. Terms that only occur in queries are in the term dictionary
+### with document frequency 0, and they are not in the collection.
+class CollectionIndex:
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.frequencies = array('I')
+        self.term_count = 0
+
+    def Add(self, token, count):
+        term_id = self.dictionary.Id(token)
+        if term_id >= len(self.frequencies):
+            self.frequencies.extend([0] * (term_id + 1 - len(self.frequencies)))
+        if self.frequencies[term_id] == 0:
+            self.term_count += 1
+        self.frequencies[term_id] += count
+
+    def Frequency(self, term_id):
+        return self.frequencies[term_id] if term_id < len(self.frequencies) else 0
+
+    def __contains__(self, token):
+        term_id = self.dictionary.Find(token)
+        return term_id >= 0 and self.Frequency(term_id) > 0
+
+    def __getitem__(self, token):
+        term_id = self.dictionary.Find(token)
+        if term_id < 0 or self.Frequency(term_id) == 0:
+            raise KeyError(token)
+        return self.frequencies[term_id]
+
+    def get(self, token, default = None):
+        return self[token] if token in self else default
+
+    def __len__(self):
+        return self.term_count
+
+    def __iter__(self):
+        tokens = self.dictionary.tokens
+        for term_id in range(len(self.frequencies)):
+            if self.frequencies[term_id] > 0:
+                yield tokens[term_id]
+
+##########      Class that is used to view one document or query vector.        ##########
+
+### It behaves like the dictionary of the terms of the vector and their frequencies, in order of term id. A term is looked up by its id
+### with a binary search of the sorted term ids.
+class DocumentVector:
+    __slots__ = ('dictionary', 'term_ids', 'frequencies')
+
+    def __init__(self, dictionary, term_ids, frequencies):
+        self.dictionary = dictionary
+        self.term_ids = term_ids
+        self.frequencies = frequencies
+
+    def Find(self, token):
+        term_id = self.dictionary.Find(token)
+        if term_id < 0:
+            return -1
+        index = bisect_left(self.term_ids, term_id)
+        if index < len(self.term_ids) and self.term_ids[index] == term_id:
+            return index
+        return -1
+
+    def __contains__(self, token):
+        return self.Find(token) >= 0
+
+    def __getitem__(self, token):
+        index = self.Find(token)
+        if index < 0:
+            raise KeyError(token)
+        return self.frequencies[index]
+
+    def get(self, token, default = None):
+        index = self.Find(token)
+        return self.frequencies[index] if index >= 0 else default
+
+    def __len__(self):
+        return len(self.term_ids)
+
+    def __iter__(self):
+        tokens = self.dictionary.tokens
+        for term_id in self.term_ids:
+            yield tokens[term_id]
+
+    def items(self):
+        tokens = self.dictionary.tokens
+        return [(tokens[term_id], frequency) for term_id, frequency in zip(self.term_ids, self.frequencies)]
+
+##########      Class that is used to store document or query vectors in flat arrays.        ##########
+
+### The term ids and the frequencies of all vectors are stored one after another in two arrays of 32-bit integers, instead of one
+### dictionary keyed by term strings per vector. The term ids of each vector are kept sorted, so that a term is found in O(log n).
+class DocumentVectors:
+    def __init__(self, dictionary):
+        self.dictionary = dictionary
+        self.offsets = array('Q', [0])
+        self.term_ids = array('I')
+        self.frequencies = array('I')
+
+    def Append(self, token_list):
+        entries = sorted([(self.dictionary.Id(token), frequency) for token, frequency in token_list.items()])
+        for term_id, frequency in entries:
+            self.term_ids.append(term_id)
+            self.frequencies.append(frequency)
+        self.offsets.append(len(self.term_ids))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError(index)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return DocumentVector(self.dictionary, self.term_ids[start:end], self.frequencies[start:end])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
@@ -0,0 +1,51 @@
+import re
+from collections import Counter
+
+##########      Pattern that defines token boundaries for documents and queries.        ##########
+###
+###     It is the pattern that DRSystem has always used. Note that '?|~' is one three-character separator, so '?' and '~' alone are not separators.
+###     Newline is a separator, so splitting a whole text gives the same tokens as splitting each of its lines.
+
+SEPARATORS = re.compile(r'\-|\,|\&|\ |\"|\(|\)|\:|\;|\=|\/|\?\|\~|\`|\!|\@|\#|\$|\^|\*|\[|\]|\{|\}|\'|\<|\>|\/|\n|\.')
+
+##########      Class that is used to turn a text into terms.        ##########
+
+### Input   :   stop_words: dictionary of the stopwords
+###             stem: function that returns the stem of a lowercased token (None means that stemming is not applied)
+class Tokenizer:
+    def __init__(self, stop_words, stem = None):
+        self.stop_words = stop_words
+        self.stem = stem
+
+    ### Output  :   list of lowercased tokens in text order (before stemming and stopword removal)
+    def Split(self, text):
+        return [token for token in SEPARATORS.split(text.lower()) if token]
+
+    ### Output  :   dictionary of the terms contained in the text and their frequencies, in order of first occurrence
+    def TokenList(self, text):
+        token_list = {}
+        stop_words = self.stop_words
+        stem = self.stem
+        for token, count in Counter(self.Split(text)).items():          ###     Each distinct token is stemmed and checked against the stopwords only once.
+            if stem is not None:
+                token = stem(token)
+            if token not in stop_words:
+                token_list[token] = token_list.get(token, 0) + count
+        return token_list
+
+    ### Output  :   dictionary of the terms contained in the text and the list of their positions, in order of first occurrence
+    ###             Positions count every token of the text, stopwords included. The frequency of a term is the length of its list, as in TokenList().
+    def Positions(self, text):
+        positions = {}
+        terms = {}
+        stop_words = self.stop_words
+        stem = self.stem
+        for position, token in enumerate(self.Split(text)):
+            term = terms.get(token)
+            if term is None:                                            ###     Each distinct token is stemmed only once.
+                term = terms[token] = stem(token) if stem is not None else token
+            if term not in stop_words:
+                if term not in positions:
+                    positions[term] = []
+                positions[term].append(position)
+        return positions